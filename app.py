@@ -1,9 +1,19 @@
 # app.py - Enhanced Flask App with Langchain Integration
 
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session, make_response, send_file
 import os
+import hmac
+import uuid
+import functools
 from werkzeug.utils import secure_filename
-from resume_analyzer import ResumeAnalyzer
+from itsdangerous import BadSignature, URLSafeSerializer
+from resume_analyzer import OPTIONAL_OUTPUTS, ResumeAnalyzer
+from jd_index import get_shared_jd_index
+from llm_limiter import get_llm_limiter, track_rejections
+from profiling import get_request_profiler
+from metrics import process_gauges, render_prometheus
+from extractors import UnsupportedFormat, get_extractors
+from candidate_index import get_candidate_index
 import logging
 
 # Set up logging
@@ -15,20 +25,17 @@ app = Flask(__name__)
 
 # Configuration
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'your-secret-key-change-this-in-production')
-app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 
-# Allowed file extensions
-ALLOWED_EXTENSIONS = {'pdf', 'doc', 'docx', 'txt'}
-
-# Create uploads directory if it doesn't exist
-os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+# Allowed file extensions; the actual format is sniffed from the content
+# (extractors.py) and uploads are analyzed in memory, never saved to disk
+ALLOWED_EXTENSIONS = {'pdf', 'doc', 'docx', 'txt', 'rtf', 'odt', 'html', 'htm'}
 
 # Initialize the resume analyzer
 try:
     analyzer = ResumeAnalyzer()
     logger.info("Resume analyzer initialized successfully")
-    if analyzer.llm:
+    if analyzer.ai_configured:
         logger.info("AI-powered analysis is available")
     else:
         logger.warning("AI-powered analysis is not available - falling back to rule-based analysis")
@@ -36,6 +43,38 @@ except Exception as e:
     logger.error(f"Failed to initialize resume analyzer: {e}")
     analyzer = None
 
+def warm_up():
+    """Load heavy dependencies and models now instead of on the first request.
+
+    Called from gunicorn_preload.py in the gunicorn master (with --preload) so
+    workers share the loaded pages copy-on-write after fork.
+    """
+    if not analyzer:
+        return {}
+    import gc
+    status = analyzer.warm_up()
+    # Move everything loaded so far out of the GC's tracked generations so
+    # collections in the workers don't touch (and un-share) those pages.
+    gc.collect()
+    if hasattr(gc, 'freeze'):
+        gc.freeze()
+    logger.info(f"Warm-up complete: {status}")
+    return status
+
+def profiled(view):
+    """Profile the request when PROFILE_SAMPLE_RATE picks it or it carries
+    `X-Profile: <PROFILE_TOKEN>`; the id comes back in X-Profile-Id."""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        profiler = get_request_profiler()
+        if not profiler.should_profile(request.headers.get('X-Profile')):
+            return view(*args, **kwargs)
+        with profiler.profile(label=request.path) as profile_id:
+            response = make_response(view(*args, **kwargs))
+        response.headers['X-Profile-Id'] = profile_id
+        return response
+    return wrapper
+
 def allowed_file(filename):
     """Check if uploaded file has an allowed extension."""
     return '.' in filename and \
@@ -58,10 +97,11 @@ def internal_error(error):
 def index():
     """Home page - displays upload form."""
     # Check if AI is available and pass to template
-    ai_available = analyzer is not None and analyzer.llm is not None
+    ai_available = analyzer is not None and analyzer.ai_configured
     return render_template('index.html', ai_available=ai_available)
 
 @app.route('/upload', methods=['POST'])
+@profiled
 def upload_resume():
     """Handle resume file upload and job description text."""
     
@@ -91,10 +131,15 @@ def upload_resume():
                 flash('Invalid filename. Please rename your file and try again.', 'warning')
                 return redirect(url_for('index'))
             
-            # Save the file
-            filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            file.save(filepath)
-            logger.info(f"File saved: {filepath}")
+            # Read the upload and reject unparseable formats (e.g. legacy
+            # .doc) before any analysis work
+            data = file.read()
+            try:
+                fmt = get_extractors().check(data)
+            except UnsupportedFormat as e:
+                flash(str(e), 'warning')
+                return redirect(url_for('index'))
+            logger.info(f"File received: {filename} ({fmt}, {len(data)} bytes)")
             
             # Get the job description text from the form
             job_description = request.form.get('job_description', '').strip()
@@ -103,15 +148,13 @@ def upload_resume():
             else:
                 logger.info("No job description provided - performing general analysis")
             
-            # Analyze the resume
-            analysis_result = analyzer.analyze_resume(filepath, job_description)
-            
-            # Clean up the uploaded file
-            try:
-                os.remove(filepath)
-                logger.info(f"Temporary file cleaned up: {filepath}")
-            except Exception as e:
-                logger.warning(f"Could not clean up file {filepath}: {e}")
+            # Analyze the resume; the RAG index is kept server-side under this
+            # browser session's chat id so /chat can answer follow-ups, and a
+            # re-upload of an edited resume reuses the unchanged parts
+            chat_id = session.get('chat_id') or uuid.uuid4().hex
+            session['chat_id'] = chat_id
+            analysis_result = analyzer.analyze_bytes(data, job_description, session_id=chat_id,
+                                                     profile=False, filename=filename)
             
             # Check if analysis was successful
             if not analysis_result.get('success', False):
@@ -119,7 +162,7 @@ def upload_resume():
                 return redirect(url_for('index'))
             
             # Add AI availability info to results
-            analysis_result['ai_available'] = analyzer.llm is not None
+            analysis_result['ai_available'] = analyzer.ai_configured
             
             # Render results
             return render_template('results.html', result=analysis_result)
@@ -127,17 +170,10 @@ def upload_resume():
         except Exception as e:
             logger.error(f"Error processing file: {e}")
             
-            # Clean up file if it exists
-            try:
-                if 'filepath' in locals() and os.path.exists(filepath):
-                    os.remove(filepath)
-            except:
-                pass
-            
             flash(f'An error occurred while processing your file: {str(e)}', 'danger')
             return redirect(url_for('index'))
     else:
-        flash('Invalid file type. Please upload PDF, DOC, DOCX, or TXT files only.', 'warning')
+        flash('Invalid file type. Please upload PDF, DOCX, ODT, RTF, HTML or TXT files only.', 'warning')
         return redirect(url_for('index'))
 
 @app.route('/health')
@@ -146,33 +182,272 @@ def health_check():
     return jsonify({
         'status': 'healthy',
         'analyzer_available': analyzer is not None,
-        'ai_available': analyzer.llm is not None if analyzer else False,
-        'huggingface_configured': os.getenv('HUGGINGFACE_API_TOKEN') is not None
+        'ai_available': analyzer.ai_configured if analyzer else False,
+        'huggingface_configured': os.getenv('HUGGINGFACE_API_TOKEN') is not None,
+        'jd_index': get_shared_jd_index().stats(),
+        'llm_limiter': get_llm_limiter().stats(),
+        'cpu_pool': analyzer.cpu_pool.stats() if analyzer else None,
+        'extraction': {**get_extractors().stats(),
+                       'cache': analyzer.extracted.stats()} if analyzer else None,
+        'candidate_index': get_candidate_index().stats() if get_candidate_index() else None,
     })
+
+@app.route('/metrics')
+def metrics_route():
+    """Prometheus gauges for this worker: RSS, GC activity and the size of
+    the per-process stores that hold state between requests."""
+    gauges = process_gauges()
+    if analyzer:
+        rag = analyzer.rag_sessions.stats()
+        txt = analyzer.texts.stats()
+        ext = analyzer.extracted.stats()
+        mem = analyzer.memos.stats()
+        gauges.update({
+            'rag_sessions':            rag['sessions'],
+            'rag_sessions_bytes':      rag['approx_bytes'],
+            'text_handles':            txt['handles'],
+            'text_handles_bytes':      txt['approx_bytes'],
+            'extract_cache_entries':   ext['entries'],
+            'extract_cache_bytes':     ext['approx_bytes'],
+            'incremental_memo_users':  mem['users'],
+            'incremental_memo_bytes':  mem['approx_bytes'],
+        })
+    for fmt, st in get_extractors().stats().items():
+        gauges[f'extract_{fmt}_total']       = st['total']
+        gauges[f'extract_{fmt}_p95_seconds'] = st['p95']
+    limiter = get_llm_limiter().stats()
+    gauges['llm_inflight'] = limiter['inflight']
+    gauges['llm_queued']   = limiter['queued']
+    response = make_response(render_prometheus(gauges))
+    response.headers['Content-Type'] = 'text/plain; version=0.0.4'
+    return response
+
 # In app.py, add this new route
 
 @app.route('/generate-cover-letter', methods=['POST'])
 def generate_cover_letter_route():
-    if not analyzer or not analyzer.llm:
+    if not analyzer or not analyzer.ai_configured:
         return jsonify({'success': False, 'error': 'AI features are not available.'}), 503
 
-    data = request.get_json()
+    data = request.get_json(silent=True) or {}
     resume_text = data.get('resume_text')
     jd_text = data.get('jd_text')
 
+    # Prefer the server-side handle from /upload or /api/analyze over the
+    # client posting the whole resume back; resume_text is still accepted.
+    text_id = data.get('text_id')
+    if text_id and not resume_text:
+        stored = analyzer.get_text(text_id)
+        if stored is None:
+            return jsonify({'success': False, 'error': 'Unknown or expired text_id. Please analyze the resume again.'}), 404
+        resume_text = stored.resume_text
+        jd_text = jd_text or stored.jd_text
+
     if not resume_text:
-        return jsonify({'success': False, 'error': 'Resume text is required.'}), 400
+        return jsonify({'success': False, 'error': 'Resume text or text_id is required.'}), 400
 
     try:
-        cover_letter = analyzer.generate_cover_letter(resume_text, jd_text)
+        with track_rejections() as rejected:
+            cover_letter = analyzer.generate_cover_letter(resume_text, jd_text)
         if cover_letter:
             return jsonify({'success': True, 'cover_letter': cover_letter})
+        elif rejected:
+            return jsonify({'success': False, 'error': 'The AI service is busy. Please try again shortly.'}), 503
         else:
             return jsonify({'success': False, 'error': 'Failed to generate cover letter.'}), 500
     except Exception as e:
         logger.error(f"Cover letter generation failed: {e}")
         return jsonify({'success': False, 'error': 'An internal error occurred.'}), 500
 
+# API sessions: the server issues the id and hands the client a signed,
+# opaque token for it, so a caller can only resume sessions it was given.
+def _api_session_tokens():
+    return URLSafeSerializer(app.config['SECRET_KEY'], salt='api-session')
+
+def _new_api_session():
+    """(session id, token for the client)."""
+    session_id = f"api-{uuid.uuid4().hex}"
+    return session_id, _api_session_tokens().dumps(session_id)
+
+def _api_session_id(token):
+    """Session id for a token issued by _new_api_session(), or None."""
+    try:
+        return _api_session_tokens().loads(token)
+    except BadSignature:
+        return None
+
+@app.route('/api/analyze', methods=['POST'])
+@profiled
+def api_analyze():
+    """JSON analysis for integration clients: no HTML render, no full_text.
+
+    Multipart form: `resume` (file), optional `job_description`, optional
+    `session_id` (incremental re-analysis and /chat: "new" on the first
+    call, then the token returned as `session_id`), optional `include` —
+    comma-separated extras from OPTIONAL_OUTPUTS (ai_feedback,
+    enhanced_bullets, rag_insights, full_text). Extras that are not requested
+    are not computed. The response's text_id works with /generate-cover-letter.
+    """
+    if not analyzer:
+        return jsonify({'success': False, 'error': 'Resume analyzer is unavailable.'}), 503
+
+    file = request.files.get('resume')
+    if not file or file.filename == '':
+        return jsonify({'success': False, 'error': 'A resume file is required.'}), 400
+    if not allowed_file(file.filename):
+        return jsonify({'success': False, 'error': 'Unsupported file type. Use PDF, DOCX, ODT, RTF, HTML or TXT.'}), 400
+
+    include = {f.strip() for f in request.form.get('include', '').split(',') if f.strip()}
+    unknown = include - set(OPTIONAL_OUTPUTS)
+    if unknown:
+        return jsonify({'success': False, 'error': f"Unknown include field(s): {', '.join(sorted(unknown))}"}), 400
+
+    token = request.form.get('session_id', '').strip() or None
+    session_id = None
+    if token == 'new':
+        session_id, token = _new_api_session()
+    elif token:
+        session_id = _api_session_id(token)
+        if session_id is None:
+            return jsonify({'success': False, 'error': 'Unknown session_id. Send session_id=new to start a session.'}), 403
+
+    data = file.read()
+    try:
+        get_extractors().check(data)
+    except UnsupportedFormat as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    result = analyzer.analyze_bytes(
+        data,
+        request.form.get('job_description', '').strip(),
+        session_id=session_id,
+        include=include,
+        profile=False,      # the request itself is profiled by @profiled
+        filename=secure_filename(file.filename),
+    )
+    if not result.get('success'):
+        return jsonify(result), 422
+    if result.get('job_comparison'):
+        result['job_comparison'].pop('jd_text', None)   # the client sent it
+    if token:
+        result['session_id'] = token
+    return jsonify(result)
+
+@app.route('/chat', methods=['POST'])
+def chat_route():
+    """Answer a question about the most recently analyzed resume.
+
+    Uses the RAG index kept from /upload under this browser session's
+    chat id, read only from the signed session cookie, or from /api/analyze
+    under the session_id token it returned. Ids are never taken as given
+    from the request, so one client cannot query another's index.
+    """
+    if not analyzer:
+        return jsonify({'success': False, 'error': 'Resume analyzer is unavailable.'}), 503
+
+    data = request.get_json(silent=True) or {}
+    question = (data.get('question') or '').strip()
+    if not question:
+        return jsonify({'success': False, 'error': 'Question is required.'}), 400
+
+    token = data.get('session_id')
+    if token:
+        session_id = _api_session_id(token)
+        if session_id is None:
+            return jsonify({'success': False, 'error': 'Unknown session_id.'}), 403
+    else:
+        session_id = session.get('chat_id')
+    if not session_id:
+        return jsonify({'success': False, 'error': 'No analyzed resume for this session. Please upload it first.'}), 404
+    try:
+        result = analyzer.ask_resume(session_id, question)
+    except Exception as e:
+        logger.error(f"Chat failed: {e}")
+        return jsonify({'success': False, 'error': 'An internal error occurred.'}), 500
+
+    if result is None:
+        return jsonify({
+            'success': False,
+            'error': 'No analyzed resume for this session (it may have expired). Please upload it again.',
+        }), 404
+    if result.get('mode') == 'busy':
+        return jsonify({'success': False, 'error': result.get('answer')}), 503
+    if result.get('mode') == 'error':
+        return jsonify({'success': False, 'error': result.get('answer')}), 500
+    return jsonify({'success': True, **result})
+
+def _profiles_allowed():
+    profiler = get_request_profiler()
+    if not profiler.enabled:
+        return False
+    return not profiler.token or request.headers.get('X-Profile') == profiler.token
+
+@app.route('/profiles')
+def list_profiles():
+    """Recent request profiles, newest first (needs PROFILE_ENABLED, and the
+    X-Profile token header when PROFILE_TOKEN is set)."""
+    if not _profiles_allowed():
+        return jsonify({'success': False, 'error': 'Not found.'}), 404
+    return jsonify({'success': True, 'profiles': get_request_profiler().list()})
+
+@app.route('/profiles/<profile_id>')
+def download_profile(profile_id):
+    """One profile: the JSON summary (top functions), or with
+    ?format=collapsed the collapsed stacks for flamegraph.pl / speedscope."""
+    if not _profiles_allowed():
+        return jsonify({'success': False, 'error': 'Not found.'}), 404
+    kind = request.args.get('format', 'json')
+    path = get_request_profiler().path_for(profile_id, kind)
+    if path is None:
+        return jsonify({'success': False, 'error': 'Unknown or expired profile.'}), 404
+    if kind == 'collapsed':
+        return send_file(os.path.abspath(path), mimetype='text/plain', as_attachment=True,
+                         download_name=f"{profile_id}.collapsed")
+    return send_file(os.path.abspath(path), mimetype='application/json')
+
+def _candidates_allowed():
+    # the corpus holds every candidate's filename, skills and scores, so the
+    # routes stay closed unless CANDIDATE_INDEX_TOKEN is set and presented
+    if not analyzer or get_candidate_index() is None:
+        return False
+    token = os.getenv('CANDIDATE_INDEX_TOKEN')
+    if not token:
+        logger.warning("Candidate search refused — CANDIDATE_INDEX_TOKEN is not set")
+        return False
+    return hmac.compare_digest(request.headers.get('X-Candidate-Token', ''), token)
+
+@app.route('/api/candidates/search')
+def search_candidates():
+    """Search all analyzed candidates (needs CANDIDATE_INDEX=1,
+    CANDIDATE_INDEX_TOKEN and a matching X-Candidate-Token header).
+
+    Query string: `skills` (comma-separated, all required), `any_skills`
+    (at least one), `min_score`, `q` (free text, ranks by semantic
+    similarity; otherwise by score), `k` (default 20, max 100).
+    """
+    if not _candidates_allowed():
+        return jsonify({'success': False, 'error': 'Not found.'}), 404
+    split = lambda name: [t for t in request.args.get(name, '').split(',') if t.strip()]
+    try:
+        min_score = int(request.args['min_score']) if request.args.get('min_score') else None
+        k = max(1, min(100, int(request.args.get('k', 20))))
+    except ValueError:
+        return jsonify({'success': False, 'error': 'min_score and k must be integers.'}), 400
+    result = analyzer.search_candidates(
+        skills=split('skills'), any_skills=split('any_skills'),
+        min_score=min_score, query=request.args.get('q', '').strip() or None, k=k,
+    )
+    return jsonify(result), 200 if result.get('success') else 503
+
+@app.route('/api/candidates/<int:candidate_id>', methods=['DELETE'])
+def forget_candidate(candidate_id):
+    """Remove one candidate from the search corpus (same token as search)."""
+    if not _candidates_allowed():
+        return jsonify({'success': False, 'error': 'Not found.'}), 404
+    if not get_candidate_index().forget(candidate_id):
+        return jsonify({'success': False, 'error': 'Unknown candidate.'}), 404
+    return jsonify({'success': True})
+
 # This should be the last part of your file
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5001)
\ No newline at end of file
@@ -0,0 +1,11 @@
+# benchmarks/
+# Reproducible, offline benchmark suite for Resume.AI
+#
+#   corpus.py    : deterministic synthetic resumes / JDs (PDF, DOCX, TXT)
+#   stub_llm.py  : local stand-in for the HF chat_completion endpoint
+#   scenarios.py : request drivers for /upload and /generate-cover-letter
+#   run.py       : CLI — `python -m benchmarks.run --help`
+#   compare.py   : diff two JSON reports — `python -m benchmarks.compare a.json b.json`
+#
+# Nothing here talks to the network: the app is pointed at the stub server via
+# HF_INFERENCE_ENDPOINT before it is imported.
@@ -0,0 +1,137 @@
+# benchmarks/candidate_search.py
+# Candidate index: build cost and filtered top-k query latency at scale.
+#
+# Writes `--candidates` synthetic candidates (default 100,000) into a fresh
+# CandidateIndex: skills drawn Zipf-like from the skill_matcher taxonomy,
+# scores 30–100, and 384-d unit vectors scattered around `--clusters`
+# centres (so the IVF lists are meaningful). Reports:
+#   insert_s / load_s / ivf_build_s : SQLite bulk insert, loading the arrays
+#                                     in a fresh process-like instance, IVF
+#   queries                          : p50/p95 latency and mean matches for
+#                                      skill AND filters, + min_score, pure
+#                                      semantic, semantic + skill filter
+#   ann_recall_at_k                  : overlap of IVF results with exact
+#                                      brute-force top-k (semantic only)
+#
+#   python -m benchmarks.candidate_search --candidates 100000 [--output cs.json]
+
+import os
+import sys
+import json
+import time
+import shutil
+import random
+import argparse
+import tempfile
+from typing import Dict, List, Optional
+
+from metrics import current_rss_bytes, summarize
+
+MB = 1024 * 1024
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(description="Candidate index build and query latency")
+    p.add_argument("--candidates", type=int, default=100000)
+    p.add_argument("--queries", type=int, default=200)
+    p.add_argument("--clusters", type=int, default=256)
+    p.add_argument("--dim", type=int, default=384)
+    p.add_argument("--k", type=int, default=20)
+    p.add_argument("--probe", type=int, default=16, help="CANDIDATE_ANN_PROBE")
+    p.add_argument("--seed", type=int, default=1234)
+    p.add_argument("--output")
+    args = p.parse_args(argv)
+
+    import numpy as np
+    from candidate_index import CandidateIndex
+    from skill_matcher import SkillMatcher
+    from benchmarks.corpus import SKILLS
+
+    rng    = random.Random(args.seed)
+    nrng   = np.random.default_rng(args.seed)
+    terms  = SkillMatcher.default(SKILLS).terms
+    # Zipf-like popularity: a few skills (python, sql, …) appear everywhere
+    weights = [1.0 / (r + 1) ** 0.8 for r in range(len(terms))]
+    centres = nrng.standard_normal((args.clusters, args.dim)).astype(np.float32)
+    centres /= np.linalg.norm(centres, axis=1, keepdims=True)
+
+    def vectors(n: int):
+        v = centres[nrng.integers(0, args.clusters, n)] + 0.08 * nrng.standard_normal((n, args.dim)).astype(np.float32)
+        return v / np.linalg.norm(v, axis=1, keepdims=True)
+
+    directory = tempfile.mkdtemp(prefix="resumeai-cand-")
+    rss0 = current_rss_bytes()
+    try:
+        writer = CandidateIndex(directory, ann_min=10 ** 12)
+        t0 = time.perf_counter()
+        batch = 5000
+        for start in range(0, args.candidates, batch):
+            n    = min(batch, args.candidates - start)
+            vecs = vectors(n)
+            writer.add_many([
+                (f"bench-{start + i}", f"resume-{start + i}.pdf", rng.randint(30, 100), None,
+                 set(rng.choices(terms, weights, k=rng.randint(5, 15))), vecs[i])
+                for i in range(n)
+            ])
+        insert_s = time.perf_counter() - t0
+
+        index = CandidateIndex(directory, ann_min=10 ** 12, ann_probe=args.probe)
+        t0 = time.perf_counter()
+        index.refresh()
+        load_s = time.perf_counter() - t0
+        index.ann_min = 1
+        t0 = time.perf_counter()
+        index.refresh()
+        ivf_build_s = time.perf_counter() - t0
+
+        popular = terms[:12]
+        kinds: Dict[str, List[dict]] = {"skills_and": [], "skills_and_min_score": [],
+                                        "semantic": [], "semantic_and_skill": []}
+        recall: List[float] = []
+        for _ in range(args.queries):
+            two  = rng.sample(popular, 2)
+            qvec = vectors(1)[0]
+            kinds["skills_and"].append(index.search(skills_all=two, k=args.k))
+            kinds["skills_and_min_score"].append(index.search(skills_all=two, min_score=80, k=args.k))
+            sem = index.search(qvec=qvec, k=args.k)
+            kinds["semantic"].append(sem)
+            kinds["semantic_and_skill"].append(index.search(skills_all=two[:1], qvec=qvec, k=args.k))
+
+            sims  = index._vecs[: index._n] @ qvec          # brute force, for recall
+            exact = {index._ids[int(i)] for i in np.argpartition(-sims, args.k)[: args.k]}
+            recall.append(len(exact & {c["id"] for c in sem["candidates"]}) / args.k)
+
+        db_mb = sum(os.path.getsize(os.path.join(directory, f)) for f in os.listdir(directory)) / MB
+        report = {
+            "candidates":      args.candidates,
+            "k":               args.k,
+            "probe":           args.probe,
+            "insert_s":        insert_s,
+            "load_s":          load_s,
+            "ivf_build_s":     ivf_build_s,
+            "db_mb":           db_mb,
+            "rss_growth_mb":   (current_rss_bytes() - rss0) / MB,
+            "ann_recall_at_k": sum(recall) / len(recall) if recall else 0.0,
+            "queries": {
+                name: {
+                    "latency_ms":   summarize([r["took_ms"] for r in rs]),
+                    "mean_matched": sum(r["matched"] for r in rs) / len(rs),
+                    "methods":      sorted({r["method"] for r in rs}),
+                } for name, rs in kinds.items() if rs
+            },
+            "index": index.stats(),
+        }
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    out = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(out + "\n")
+    else:
+        print(out)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
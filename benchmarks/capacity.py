@@ -0,0 +1,453 @@
+# benchmarks/capacity.py
+# Capacity report for the gunicorn deployment profile.
+#
+# For every server configuration (workers x threads : worker class) and RAG
+# mode, starts the app under gunicorn on a free local port, pointed at an
+# in-process stub inference server, and ramps client concurrency against one
+# scenario (default `upload`). Each step is a closed loop of
+# `--requests-per-client` requests per client; while it runs, the gunicorn
+# workers are sampled from /proc (CPU time and RSS, including any CPU-pool
+# children). Per configuration the report gives:
+#   max_rps_at_slo : best throughput of a step whose p95 latency is within
+#                    --slo-p95-ms and whose error rate is within --max-error-rate
+#   saturation     : the first step after which adding clients raises
+#                    throughput by less than --min-gain (or breaks the SLO)
+#   per_worker     : CPU (% of one core) and peak RSS per worker at that step
+#
+#   python -m benchmarks.capacity --configs 1x4,2x4,4x2:gthread,4x1:sync \
+#       --concurrency 1,2,4,8,16,32 --slo-p95-ms 3000 [--output capacity.json]
+#
+# Linux only (worker sampling reads /proc). The load generator and the stub
+# share this process; on small hosts give gunicorn fewer workers than cores.
+
+import os
+import sys
+import json
+import time
+import shutil
+import signal
+import socket
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+import urllib.request
+import importlib.util
+from typing import Dict, List, Optional, Tuple
+
+from metrics import summarize
+from benchmarks.corpus import SIZES, FORMATS, build_corpus
+from benchmarks.run import run_scenario
+from benchmarks.scenarios import SCENARIOS, HttpTransport
+from benchmarks.stub_llm import StubInferenceServer
+
+MB        = 1024 * 1024
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# load_app() points Flask at the templates next to app.py, as the other
+# benchmarks do; gunicorn calls it as an app factory.
+APP_TARGET = "benchmarks.scenarios:load_app()"
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+_CLK_TCK   = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+
+def parse_configs(spec: str) -> List[Dict]:
+    """"2x4,4x1:sync" -> [{workers: 2, threads: 4, worker_class: "gthread"}, …]"""
+    configs = []
+    for part in filter(None, (s.strip() for s in spec.split(","))):
+        shape, _, worker_class = part.partition(":")
+        workers, _, threads = shape.lower().partition("x")
+        try:
+            w, t = int(workers), int(threads or 1)
+        except ValueError:
+            raise ValueError(f"bad config {part!r}: expected WORKERSxTHREADS[:CLASS]")
+        if w < 1 or t < 1:
+            raise ValueError(f"bad config {part!r}: workers and threads must be >= 1")
+        configs.append({"workers": w, "threads": t,
+                        "worker_class": worker_class or ("gthread" if t > 1 else "sync")})
+    return configs
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# /proc sampling
+# ─────────────────────────────────────────────────────────────────────────────
+def _proc_table() -> Dict[int, Tuple[int, int, int]]:
+    """pid -> (ppid, cpu ticks incl. reaped children, rss bytes)."""
+    table = {}
+    for name in os.listdir("/proc"):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{name}/stat") as f:
+                rest = f.read().rsplit(")", 1)[1].split()
+            with open(f"/proc/{name}/statm") as f:
+                rss = int(f.read().split()[1]) * _PAGE_SIZE
+        except (OSError, IndexError, ValueError):
+            continue                                  # exited while we looked
+        # fields after "(comm)": state ppid … utime(11) stime(12) cutime(13) cstime(14)
+        table[int(name)] = (int(rest[1]), sum(int(x) for x in rest[11:15]), rss)
+    return table
+
+
+def _descendants(table: Dict[int, Tuple[int, int, int]], root: int) -> List[int]:
+    children: Dict[int, List[int]] = {}
+    for pid, (ppid, _, _) in table.items():
+        children.setdefault(ppid, []).append(pid)
+    out, stack = [], [root]
+    while stack:
+        for child in children.get(stack.pop(), []):
+            out.append(child)
+            stack.append(child)
+    return out
+
+
+def worker_usage(master_pid: int) -> Tuple[Dict[int, Tuple[int, int]], int]:
+    """({worker pid: (cpu ticks, rss bytes)}, master rss); each worker's
+    figures include its own children (e.g. the CPU pool)."""
+    table   = _proc_table()
+    workers = {}
+    for pid, (ppid, ticks, rss) in table.items():
+        if ppid != master_pid:
+            continue
+        for d in _descendants(table, pid):
+            ticks += table[d][1]
+            rss   += table[d][2]
+        workers[pid] = (ticks, rss)
+    master = table.get(master_pid, (0, 0, 0))[2]
+    return workers, master
+
+
+class WorkerSampler:
+    """Samples the gunicorn workers in the background for one ramp step."""
+
+    def __init__(self, master_pid: int, interval: float = 0.5):
+        self.master_pid = master_pid
+        self.interval   = interval
+        self._stop      = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._first: Dict[int, int] = {}
+        self._last:  Dict[int, int] = {}
+        self._peak:  Dict[int, int] = {}
+        self._master_peak = 0
+
+    def _sample(self):
+        workers, master = worker_usage(self.master_pid)
+        for pid, (ticks, rss) in workers.items():
+            self._first.setdefault(pid, ticks)
+            self._last[pid] = ticks
+            self._peak[pid] = max(self._peak.get(pid, 0), rss)
+        self._master_peak = max(self._master_peak, master)
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __enter__(self) -> "WorkerSampler":
+        self._sample()
+        self._initial = set(self._first)
+        self._t0      = time.perf_counter()
+        self._thread  = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+        self.wall = time.perf_counter() - self._t0
+
+    def report(self) -> Dict:
+        wall = self.wall or 1e-9
+        cpu  = [100.0 * (self._last[p] - self._first[p]) / _CLK_TCK / wall for p in self._first]
+        rss  = [self._peak[p] / MB for p in self._first]
+        return {
+            "workers_seen":     len(self._first),
+            "worker_restarts":  len(set(self._first) - self._initial),
+            "cpu_percent":      summarize(cpu),      # per worker, % of one core
+            "cpu_percent_total": sum(cpu),
+            "rss_mb":           summarize(rss),      # per worker, peak in the step
+            "master_rss_mb":    self._master_peak / MB,
+        }
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# gunicorn
+# ─────────────────────────────────────────────────────────────────────────────
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class GunicornServer:
+    """One gunicorn master on 127.0.0.1; stopped with SIGTERM (then SIGKILL)."""
+
+    def __init__(self, config: Dict, env: Dict[str, str], preload: bool, log_path: str,
+                 timeout: int = 120):
+        self.config   = config
+        self.port     = _free_port()
+        self.url      = f"http://127.0.0.1:{self.port}"
+        self.log_path = log_path
+        cmd = [sys.executable, "-m", "gunicorn"]
+        if preload:
+            cmd += ["-c", os.path.join(REPO_ROOT, "gunicorn_preload.py")]
+        # command-line settings override the profile's env-driven defaults
+        cmd += [
+            "--bind",         f"127.0.0.1:{self.port}",
+            "--workers",      str(config["workers"]),
+            "--threads",      str(config["threads"]),
+            "--worker-class", config["worker_class"],
+            "--timeout",      str(timeout),
+            "--chdir",        REPO_ROOT,
+            APP_TARGET,
+        ]
+        self.cmd  = cmd
+        self.env  = env
+        self.proc: Optional[subprocess.Popen] = None
+
+    def start(self, startup_timeout: float) -> float:
+        self._log = open(self.log_path, "wb")
+        t0 = time.perf_counter()
+        self.proc = subprocess.Popen(self.cmd, env=self.env, cwd=REPO_ROOT,
+                                     stdout=self._log, stderr=subprocess.STDOUT)
+        while time.perf_counter() - t0 < startup_timeout:
+            if self.proc.poll() is not None:
+                raise RuntimeError(f"gunicorn exited with {self.proc.returncode}:\n{self.log_tail()}")
+            try:
+                with urllib.request.urlopen(self.url + "/health", timeout=5) as r:
+                    if r.status == 200 and self._all_workers_up():
+                        return time.perf_counter() - t0
+            except OSError:
+                pass
+            time.sleep(0.25)
+        raise RuntimeError(f"gunicorn not healthy after {startup_timeout:.0f}s:\n{self.log_tail()}")
+
+    def _all_workers_up(self) -> bool:
+        workers, _ = worker_usage(self.proc.pid)
+        return len(workers) >= self.config["workers"]
+
+    def log_tail(self, chars: int = 2000) -> str:
+        try:
+            with open(self.log_path, "rb") as f:
+                return f.read().decode(errors="replace")[-chars:]
+        except OSError:
+            return ""
+
+    def stop(self):
+        if self.proc and self.proc.poll() is None:
+            self.proc.send_signal(signal.SIGTERM)
+            try:
+                self.proc.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+                self.proc.wait()
+        if getattr(self, "_log", None):
+            self._log.close()
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Ramp + capacity
+# ─────────────────────────────────────────────────────────────────────────────
+def within_slo(step: Dict, slo_p95_ms: float, max_error_rate: float) -> bool:
+    return (step["latency"]["p95"] * 1000 <= slo_p95_ms
+            and step["error_rate"] <= max_error_rate)
+
+
+def capacity(steps: List[Dict], slo_p95_ms: float, max_error_rate: float, min_gain: float) -> Dict:
+    """Max RPS within the SLO and the saturation point of one ramp."""
+    ok   = [s for s in steps if s["within_slo"]]
+    best = max(ok, key=lambda s: s["throughput_rps"]) if ok else None
+
+    saturation = steps[-1] if steps else None
+    for prev, cur in zip(steps, steps[1:]):
+        if not cur["within_slo"] or cur["throughput_rps"] < prev["throughput_rps"] * (1 + min_gain):
+            saturation = prev
+            break
+
+    def point(s: Optional[Dict]) -> Optional[Dict]:
+        if s is None:
+            return None
+        return {
+            "concurrency":    s["concurrency"],
+            "throughput_rps": s["throughput_rps"],
+            "p95_ms":         s["latency"]["p95"] * 1000,
+            "error_rate":     s["error_rate"],
+            "per_worker":     s["workers"],
+        }
+
+    return {
+        "slo_p95_ms":     slo_p95_ms,
+        "max_error_rate": max_error_rate,
+        "max_rps_at_slo": best["throughput_rps"] if best else 0.0,
+        "at_slo":         point(best),
+        "saturation":     point(saturation),
+        "saturated":      saturation is not None and saturation is not steps[-1],
+    }
+
+
+def ramp(server: GunicornServer, stub: StubInferenceServer, items, args) -> List[Dict]:
+    transport  = HttpTransport(server.url, timeout=args.request_timeout)
+    steps      = []
+    violations = 0
+    for concurrency in args.concurrency:
+        requests = max(args.min_requests, concurrency * args.requests_per_client)
+        stub.reset_stats()
+        with WorkerSampler(server.proc.pid, args.sample_interval) as sampler:
+            res = run_scenario(transport, args.scenario, items, requests, concurrency, warmup=0)
+        step = {
+            "concurrency":    concurrency,
+            "requests":       requests,
+            "wall_seconds":   res["wall_seconds"],
+            "throughput_rps": res["throughput_rps"],
+            "latency":        res["latency"],
+            "errors":         res["errors"],
+            "error_rate":     res["errors"] / requests,
+            "status_counts":  res["status_counts"],
+            "workers":        sampler.report(),
+            "stub_llm":       stub.stats(),
+        }
+        step["within_slo"] = within_slo(step, args.slo_p95_ms, args.max_error_rate)
+        steps.append(step)
+        print(f"  c={concurrency:<4d} {step['throughput_rps']:7.2f} rps  "
+              f"p95={step['latency']['p95'] * 1000:8.1f} ms  errors={res['errors']}",
+              file=sys.stderr)
+        violations = 0 if step["within_slo"] else violations + 1
+        if violations >= args.stop_after:
+            break
+    return steps
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(description="gunicorn capacity: max RPS at a latency SLO per configuration")
+    p.add_argument("--configs", default="1x4,2x4,4x2,4x1:sync",
+                   help="comma-separated WORKERSxTHREADS[:CLASS] (class defaults to gthread, or sync for 1 thread)")
+    p.add_argument("--rag", default="on,off", help="RAG modes to sweep: on, off or both")
+    p.add_argument("--scenario", choices=sorted(SCENARIOS), default="upload")
+    p.add_argument("--concurrency", default="1,2,4,8,16,32", help="client concurrency ramp")
+    p.add_argument("--requests-per-client", type=int, default=8)
+    p.add_argument("--min-requests", type=int, default=20)
+    p.add_argument("--warmup", type=int, default=0, help="requests before the ramp (default: 2 per worker)")
+    p.add_argument("--slo-p95-ms", type=float, default=3000.0)
+    p.add_argument("--max-error-rate", type=float, default=0.01)
+    p.add_argument("--min-gain", type=float, default=0.05,
+                   help="throughput gain below which the next step counts as saturated")
+    p.add_argument("--stop-after", type=int, default=2,
+                   help="end a ramp after this many consecutive steps outside the SLO")
+    p.add_argument("--no-preload", action="store_true", help="run without gunicorn_preload.py")
+    p.add_argument("--startup-timeout", type=float, default=180.0)
+    p.add_argument("--request-timeout", type=float, default=120.0)
+    p.add_argument("--sample-interval", type=float, default=0.5)
+    p.add_argument("--corpus-size", type=int, default=12)
+    p.add_argument("--sizes", default=",".join(SIZES))
+    p.add_argument("--formats", default=",".join(FORMATS))
+    p.add_argument("--seed", type=int, default=1234)
+    p.add_argument("--stub-latency-ms", type=float, default=200.0)
+    p.add_argument("--stub-jitter-ms", type=float, default=0.0)
+    p.add_argument("--stub-tokens", type=int, default=80)
+    p.add_argument("--llm-rate", type=float, default=0.0,
+                   help="LLM_RATE_PER_SEC for the workers (0 = unlimited)")
+    p.add_argument("--output")
+    args = p.parse_args(argv)
+
+    try:
+        configs = parse_configs(args.configs)
+        args.concurrency = sorted({int(c) for c in args.concurrency.split(",") if c.strip()})
+    except ValueError as e:
+        p.error(str(e))
+    rag_modes = [m.strip() for m in args.rag.split(",") if m.strip()]
+    if not configs or not args.concurrency or any(m not in ("on", "off") for m in rag_modes):
+        p.error("need at least one config, one concurrency level and --rag from on,off")
+
+    if importlib.util.find_spec("gunicorn") is None:
+        print(json.dumps({"configs": [], "notes": "unavailable: gunicorn not installed (pip install -r requirements.txt)"}))
+        return 0
+    if not os.path.isdir("/proc"):
+        print(json.dumps({"configs": [], "notes": "unavailable: worker sampling needs /proc (Linux)"}))
+        return 0
+
+    stub = StubInferenceServer(
+        latency_ms=args.stub_latency_ms,
+        jitter_ms=args.stub_jitter_ms,
+        tokens_per_reply=args.stub_tokens,
+        seed=args.seed,
+    ).start()
+    workdir = tempfile.mkdtemp(prefix="resumeai-capacity-")
+    results = []
+    try:
+        items = build_corpus(
+            os.path.join(workdir, "corpus"), count=args.corpus_size,
+            sizes=args.sizes.split(","), formats=args.formats.split(","), seed=args.seed,
+        )
+        for mode in rag_modes:
+            for config in configs:
+                env = dict(os.environ)
+                env["HF_INFERENCE_ENDPOINT"] = stub.url
+                env.setdefault("HUGGINGFACE_API_TOKEN", "hf_stub_token")
+                env["RAG_ENABLED"]      = "1" if mode == "on" else "0"
+                env["LLM_RATE_PER_SEC"] = str(args.llm_rate)
+                env["PYTHONPATH"]       = os.pathsep.join(filter(None, [REPO_ROOT, env.get("PYTHONPATH")]))
+
+                label  = f"{config['workers']}x{config['threads']}:{config['worker_class']} rag={mode}"
+                server = GunicornServer(config, env, preload=not args.no_preload,
+                                        log_path=os.path.join(workdir, f"gunicorn-{len(results)}.log"))
+                entry  = {"config": dict(config, rag=mode, preload=not args.no_preload)}
+                print(f"{label}", file=sys.stderr)
+                try:
+                    entry["startup_s"] = server.start(args.startup_timeout)
+                    warmup = args.warmup or 2 * config["workers"]
+                    run_scenario(HttpTransport(server.url, timeout=args.request_timeout),
+                                 args.scenario, items, warmup, min(warmup, config["workers"] * config["threads"]),
+                                 warmup=0)
+                    entry["steps"]    = ramp(server, stub, items, args)
+                    entry["capacity"] = capacity(entry["steps"], args.slo_p95_ms,
+                                                 args.max_error_rate, args.min_gain)
+                except RuntimeError as e:
+                    entry["error"] = str(e)
+                    print(f"  failed: {str(e).splitlines()[0]}", file=sys.stderr)
+                finally:
+                    server.stop()
+                results.append(entry)
+    finally:
+        stub.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    summary = []
+    for r in results:
+        cap = r.get("capacity") or {}
+        sat = cap.get("saturation") or {}
+        at  = cap.get("at_slo") or {}
+        summary.append({
+            "config":                 "{workers}x{threads}:{worker_class}".format(**r["config"]),
+            "rag":                    r["config"]["rag"],
+            "max_rps_at_slo":         cap.get("max_rps_at_slo", 0.0),
+            "concurrency_at_slo":     at.get("concurrency"),
+            "saturation_concurrency": sat.get("concurrency"),
+            "saturation_rps":         sat.get("throughput_rps"),
+            "cpu_percent_per_worker": (at.get("per_worker") or {}).get("cpu_percent", {}).get("mean"),
+            "rss_mb_per_worker":      (at.get("per_worker") or {}).get("rss_mb", {}).get("max"),
+            "error":                  r.get("error"),
+        })
+
+    report = {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "environment": {
+            "python":   sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpus":     os.cpu_count(),
+        },
+        "config":  vars(args),
+        "summary": sorted(summary, key=lambda s: (s["rag"], -s["max_rps_at_slo"])),
+        "results": results,
+    }
+    out = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(out + "\n")
+    else:
+        print(out)
+    return 0 if all("error" not in r for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,60 @@
+# benchmarks/compare.py
+# Compare two reports from benchmarks.run and print per-scenario deltas.
+#
+#   python -m benchmarks.compare baseline.json candidate.json [--fail-over 10]
+#
+# --fail-over N exits non-zero when any p95 latency regresses by more than N%.
+
+import sys
+import json
+import argparse
+from typing import Dict, List, Optional
+
+
+def _pct(old: float, new: float) -> float:
+    return (new - old) / old * 100.0 if old else 0.0
+
+
+def compare(base: Dict, cand: Dict) -> List[Dict]:
+    by_name = {r["scenario"]: r for r in base.get("results", [])}
+    rows = []
+    for r in cand.get("results", []):
+        b = by_name.get(r["scenario"])
+        if b is None:
+            continue
+        rows.append({
+            "scenario":       r["scenario"],
+            "throughput_pct": _pct(b["throughput_rps"], r["throughput_rps"]),
+            "p50_pct":        _pct(b["latency"]["p50"], r["latency"]["p50"]),
+            "p95_pct":        _pct(b["latency"]["p95"], r["latency"]["p95"]),
+            "p99_pct":        _pct(b["latency"]["p99"], r["latency"]["p99"]),
+            "rss_after_pct":  _pct(b["rss_bytes"]["after"], r["rss_bytes"]["after"]),
+            "stages_p50_pct": {
+                k: _pct(b["stages"][k]["p50"], v["p50"])
+                for k, v in r.get("stages", {}).items() if k in b.get("stages", {})
+            },
+        })
+    return rows
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(description="Diff two benchmark reports")
+    p.add_argument("baseline")
+    p.add_argument("candidate")
+    p.add_argument("--fail-over", type=float, help="max allowed p95 regression in percent")
+    args = p.parse_args(argv)
+
+    with open(args.baseline) as f:
+        base = json.load(f)
+    with open(args.candidate) as f:
+        cand = json.load(f)
+
+    rows = compare(base, cand)
+    print(json.dumps(rows, indent=2))
+    if args.fail_over is not None and any(r["p95_pct"] > args.fail_over for r in rows):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+# benchmarks/context_packing.py
+# Prompt context: fixed character prefixes vs token-budgeted packing.
+#
+# For each synthetic resume/JD pair and each prompt type, compares the old
+# blind prefixes (text[:1500]; resume[:800] + jd[:800]; resume[:2000] +
+# jd[:1500]) with context_packer.pack_for():
+#   tokens         : resume + JD context tokens (LLM_TOKENIZER, or "approx")
+#   skill_coverage : share of the resume's JD-relevant skills that made it
+#                    into the resume context
+#   header_share   : share of resume context tokens spent on the header /
+#                    contact block
+#   pack_ms        : time to build the packed context
+#
+#   python -m benchmarks.context_packing --docs 30 [--output ctx.json]
+
+import sys
+import json
+import time
+import argparse
+from typing import Dict, List, Optional
+
+from metrics import summarize
+from context_packer import count_tokens, get_token_counter, pack_for
+from resume_segmenter import segment_resume
+from benchmarks.corpus import job_description, resume_text
+
+OLD_CAPS = {"feedback": (1500, None), "job_match": (800, 800), "cover_letter": (2000, 1500)}
+
+
+def _header_share(context: str, header: str) -> float:
+    total = count_tokens(context)
+    if not total or not header:
+        return 0.0
+    lines = {l.strip() for l in header.split("\n") if l.strip()}
+    spent = sum(count_tokens(l) for l in context.split("\n") if l.strip() in lines)
+    return spent / total
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(description="Prefix truncation vs token-budgeted context packing")
+    p.add_argument("--docs", type=int, default=30)
+    p.add_argument("--seed", type=int, default=1234)
+    p.add_argument("--output")
+    args = p.parse_args(argv)
+
+    from resume_analyzer import ResumeAnalyzer
+    analyzer = ResumeAnalyzer()
+
+    rows: Dict[str, Dict[str, Dict[str, List[float]]]] = {}
+    for i in range(args.docs):
+        size   = ("small", "medium", "large")[i % 3]
+        resume = resume_text(args.seed + i, size)
+        jd     = job_description(args.seed + i)
+        structure = segment_resume(resume)
+        header = "\n".join(s.text for s in structure.sections if s.kind in ("header", "contact"))
+        jd_skills = analyzer.extract_jd_skills(jd)["technical"]
+        relevant  = [s for s in jd_skills if s in analyzer.extract_skills(resume)["technical"]]
+
+        for prompt, (rcap, jcap) in OLD_CAPS.items():
+            use_jd = prompt != "feedback"
+            old_r = resume[:rcap]
+            old_j = jd[:jcap] if use_jd else ""
+            t0 = time.perf_counter()
+            ctx = pack_for(prompt, resume, jd if use_jd else None, structure,
+                           jd_query=" ".join(jd_skills))
+            pack_ms = (time.perf_counter() - t0) * 1000
+            new_r = ctx["resume"].text
+            new_j = ctx["jd"].text if use_jd else ""
+
+            for label, r, j in (("prefix", old_r, old_j), ("packed", new_r, new_j)):
+                m = rows.setdefault(prompt, {}).setdefault(label, {
+                    "tokens": [], "skill_coverage": [], "header_share": [], "pack_ms": []})
+                m["tokens"].append(count_tokens(r) + count_tokens(j))
+                if relevant:
+                    got = analyzer.extract_skills(r)["technical"]
+                    m["skill_coverage"].append(sum(s in got for s in relevant) / len(relevant))
+                m["header_share"].append(_header_share(r, header))
+                if label == "packed":
+                    m["pack_ms"].append(pack_ms)
+
+    report = {
+        "docs": args.docs,
+        "tokenizer": get_token_counter().name,
+        "results": {
+            prompt: {
+                label: {k: summarize(v) if k in ("tokens", "pack_ms") else
+                        (sum(v) / len(v) if v else 0.0) for k, v in metrics.items() if v}
+                for label, metrics in by_label.items()
+            } for prompt, by_label in rows.items()
+        },
+    }
+    out = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(out + "\n")
+    else:
+        print(out)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,257 @@
+# benchmarks/corpus.py
+# Deterministic synthetic resume / job-description generator.
+#
+# Every document is derived from random.Random(seed), so two runs with the same
+# seed produce byte-identical TXT/PDF files and text-identical DOCX files.
+
+import os
+import random
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+FIRST_NAMES = ["Aarav", "Maya", "Jordan", "Priya", "Lucas", "Sofia", "Kenji", "Amara", "Noah", "Elena"]
+LAST_NAMES  = ["Sharma", "Chen", "Okafor", "Garcia", "Novak", "Tanaka", "Rossi", "Patel", "Kim", "Silva"]
+TITLES      = ["Software Engineer", "Data Scientist", "Backend Developer", "ML Engineer",
+               "DevOps Engineer", "Data Analyst", "Full Stack Developer", "Platform Engineer"]
+COMPANIES   = ["Acme Corp", "Globex", "Initech", "Umbrella Labs", "Stark Systems",
+               "Wayne Analytics", "Hooli", "Vandelay Industries", "Cyberdyne", "Soylent Data"]
+SKILLS      = ["Python", "Java", "JavaScript", "React", "Node.js", "SQL", "PostgreSQL", "MongoDB",
+               "Docker", "Kubernetes", "AWS", "Azure", "Terraform", "Jenkins", "Kafka", "Spark",
+               "Redis", "GraphQL", "Flask", "Django", "TensorFlow", "PyTorch", "LangChain",
+               "Machine Learning", "Microservices", "Linux", "Git", "Elasticsearch"]
+SOFT        = ["leadership", "communication", "teamwork", "problem solving", "mentoring",
+               "collaboration", "time management", "critical thinking"]
+VERBS       = ["Developed", "Designed", "Built", "Implemented", "Led", "Improved", "Reduced",
+               "Automated", "Optimized", "Migrated", "Scaled", "Deployed", "Streamlined"]
+OBJECTS     = ["a REST API serving", "an ETL pipeline processing", "a recommendation service for",
+               "CI/CD workflows for", "a data warehouse used by", "monitoring dashboards for",
+               "a microservice handling", "an internal tool adopted by"]
+OUTCOMES    = ["{n}% lower latency", "{n} users", "{n} clients", "{n}% cost reduction",
+               "{n} hours saved per month", "{n} projects", "{n}x throughput"]
+MONTHS      = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+SCHOOLS     = ["State University", "Institute of Technology", "City College", "National University"]
+DEGREES     = ["Bachelor of Science in Computer Science", "B.Tech in Information Technology",
+               "Master of Science in Data Science", "M.Tech in Software Engineering"]
+
+# size name → (jobs, bullets per job, projects)
+SIZES: Dict[str, tuple] = {
+    "small":  (1, 3, 1),
+    "medium": (3, 4, 2),
+    "large":  (8, 6, 4),
+}
+
+FORMATS = ("txt", "pdf", "docx")
+ALL_FORMATS = FORMATS + ("rtf", "html", "odt")
+
+
+@dataclass
+class CorpusItem:
+    name:   str      # stable id, e.g. "medium-0003"
+    size:   str
+    fmt:    str
+    path:   str
+    text:   str
+    jd:     str
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Text generation
+# ─────────────────────────────────────────────────────────────────────────────
+def _date_range(rng: random.Random, end_year: int) -> str:
+    start = end_year - rng.randint(1, 3)
+    return f"{rng.choice(MONTHS)} {start} - {rng.choice(MONTHS)} {end_year}"
+
+
+def _bullet(rng: random.Random) -> str:
+    outcome = rng.choice(OUTCOMES).format(n=rng.randint(2, 95))
+    return f"- {rng.choice(VERBS)} {rng.choice(OBJECTS)} {outcome} using {rng.choice(SKILLS)}"
+
+
+def resume_text(seed: int, size: str = "medium") -> str:
+    jobs, bullets, projects = SIZES[size]
+    rng   = random.Random(seed)
+    first = rng.choice(FIRST_NAMES)
+    last  = rng.choice(LAST_NAMES)
+    skills = rng.sample(SKILLS, k=min(len(SKILLS), 6 + 2 * jobs))
+
+    lines: List[str] = [
+        f"{first} {last}",
+        f"{first.lower()}.{last.lower()}@example.com | +1 555-{rng.randint(100, 999)}-{rng.randint(1000, 9999)}",
+        f"linkedin.com/in/{first.lower()}{last.lower()} | github.com/{first.lower()}{rng.randint(1, 99)}",
+        "",
+        "Summary",
+        f"{rng.choice(TITLES)} with {jobs + 1} years of experience in "
+        f"{', '.join(skills[:3])}. Known for {rng.choice(SOFT)} and {rng.choice(SOFT)}.",
+        "",
+        "Work Experience",
+    ]
+    year = 2025
+    for _ in range(jobs):
+        lines.append(f"{rng.choice(TITLES)} - {rng.choice(COMPANIES)} ({_date_range(rng, year)})")
+        lines.extend(_bullet(rng) for _ in range(bullets))
+        lines.append("")
+        year -= rng.randint(1, 3)
+
+    lines.append("Projects")
+    for i in range(projects):
+        lines.append(f"Project {i + 1}: {rng.choice(OBJECTS).capitalize()} {rng.randint(10, 500)} users")
+        lines.append(_bullet(rng))
+    lines.append("")
+
+    lines.append("Technical Skills")
+    lines.append(", ".join(skills))
+    lines.append("Soft skills: " + ", ".join(rng.sample(SOFT, k=3)))
+    lines.append("")
+
+    lines.append("Education")
+    lines.append(f"{rng.choice(DEGREES)}, {rng.choice(SCHOOLS)}, {year - 1}  GPA {rng.randint(30, 40) / 10:.1f}")
+    lines.append("")
+    lines.append("Certifications")
+    lines.append(f"AWS Certified Developer ({year})")
+    return "\n".join(lines)
+
+
+def job_description(seed: int) -> str:
+    rng    = random.Random(seed * 7919 + 17)
+    title  = rng.choice(TITLES)
+    must   = rng.sample(SKILLS, k=6)
+    nice   = rng.sample([s for s in SKILLS if s not in must], k=3)
+    return "\n".join([
+        f"{title} at {rng.choice(COMPANIES)}",
+        "",
+        "About the role",
+        f"We are looking for a {title.lower()} to join a team building data-heavy products.",
+        "",
+        "Requirements",
+        *[f"- {rng.randint(2, 6)}+ years with {s}" for s in must],
+        f"- Strong {rng.choice(SOFT)} and {rng.choice(SOFT)}",
+        "",
+        "Nice to have",
+        *[f"- Experience with {s}" for s in nice],
+    ])
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Writers
+# ─────────────────────────────────────────────────────────────────────────────
+def _pdf_escape(line: str) -> str:
+    line = line.encode("latin-1", "replace").decode("latin-1")
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(text: str, path: str, lines_per_page: int = 55):
+    """Minimal single-font PDF writer (no third-party dependency)."""
+    lines = text.split("\n")
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)] or [[]]
+
+    objects: List[bytes] = []
+    # 1: catalog, 2: pages, 3: font, then (page, content) pairs
+    page_ids = [4 + 2 * i for i in range(len(pages))]
+    objects.append(b"<< /Type /Catalog /Pages 2 0 R >>")
+    kids = " ".join(f"{pid} 0 R" for pid in page_ids)
+    objects.append(f"<< /Type /Pages /Kids [{kids}] /Count {len(pages)} >>".encode())
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    for pid, page_lines in zip(page_ids, pages):
+        body = "BT /F1 10 Tf 12 TL 50 790 Td\n" + "".join(
+            f"({_pdf_escape(l)}) Tj T*\n" for l in page_lines
+        ) + "ET"
+        stream = body.encode("latin-1")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {pid + 1} 0 R >>".encode()
+        )
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % i + obj + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % off for off in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, "wb") as f:
+        f.write(bytes(out))
+
+
+def write_docx(text: str, path: str):
+    import docx
+    document = docx.Document()
+    for line in text.split("\n"):
+        document.add_paragraph(line)
+    document.save(path)
+
+
+def write_txt(text: str, path: str):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def write_rtf(text: str, path: str):
+    def esc(line: str) -> str:
+        line = line.replace("\\", "\\\\").replace("{", "\\{").replace("}", "\\}")
+        return "".join(c if ord(c) < 128 else f"\\u{ord(c) if ord(c) < 32768 else ord(c) - 65536}?"
+                       for c in line)
+    body = "".join(f"{esc(line)}\\par\n" for line in text.split("\n"))
+    with open(path, "w", encoding="ascii") as f:
+        f.write("{\\rtf1\\ansi\\ansicpg1252\\deff0{\\fonttbl{\\f0 Helvetica;}}\n\\f0\\fs20 " + body + "}")
+
+
+def write_html(text: str, path: str):
+    import html
+    body = "".join(f"<p>{html.escape(line)}</p>\n" for line in text.split("\n"))
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f"<!DOCTYPE html>\n<html><head><title>Resume</title><style>p{{margin:0}}</style></head>"
+                f"<body>\n{body}</body></html>\n")
+
+
+def write_odt(text: str, path: str):
+    import html
+    import zipfile
+    ns = 'xmlns:office="urn:oasis:names:tc:opendocument:xmlns:office:1.0" ' \
+         'xmlns:text="urn:oasis:names:tc:opendocument:xmlns:text:1.0"'
+    paras = "".join(f"<text:p>{html.escape(line)}</text:p>" for line in text.split("\n"))
+    content = (f'<?xml version="1.0" encoding="UTF-8"?><office:document-content {ns} office:version="1.2">'
+               f"<office:body><office:text>{paras}</office:text></office:body></office:document-content>")
+    manifest = ('<?xml version="1.0" encoding="UTF-8"?><manifest:manifest '
+                'xmlns:manifest="urn:oasis:names:tc:opendocument:xmlns:manifest:1.0" manifest:version="1.2">'
+                '<manifest:file-entry manifest:full-path="/" '
+                'manifest:media-type="application/vnd.oasis.opendocument.text"/>'
+                '<manifest:file-entry manifest:full-path="content.xml" manifest:media-type="text/xml"/>'
+                '</manifest:manifest>')
+    with zipfile.ZipFile(path, "w") as z:
+        # the mimetype member comes first and uncompressed, per the ODF spec
+        z.writestr("mimetype", "application/vnd.oasis.opendocument.text", compress_type=zipfile.ZIP_STORED)
+        z.writestr("META-INF/manifest.xml", manifest, compress_type=zipfile.ZIP_DEFLATED)
+        z.writestr("content.xml", content, compress_type=zipfile.ZIP_DEFLATED)
+
+
+WRITERS = {"txt": write_txt, "pdf": write_pdf, "docx": write_docx,
+           "rtf": write_rtf, "html": write_html, "odt": write_odt}
+
+
+def build_corpus(
+    out_dir: str,
+    count: int = 12,
+    sizes: Optional[List[str]] = None,
+    formats: Optional[List[str]] = None,
+    seed: int = 1234,
+) -> List[CorpusItem]:
+    """Write `count` resumes to out_dir, cycling through sizes × formats."""
+    sizes   = sizes or list(SIZES)
+    formats = formats or list(FORMATS)
+    os.makedirs(out_dir, exist_ok=True)
+
+    items: List[CorpusItem] = []
+    combos = [(s, f) for s in sizes for f in formats]
+    for i in range(count):
+        size, fmt = combos[i % len(combos)]
+        doc_seed  = seed + i
+        name      = f"{size}-{i:04d}"
+        text      = resume_text(doc_seed, size)
+        path      = os.path.join(out_dir, f"{name}.{fmt}")
+        WRITERS[fmt](text, path)
+        items.append(CorpusItem(name=name, size=size, fmt=fmt, path=path,
+                                text=text, jd=job_description(doc_seed)))
+    return items
@@ -0,0 +1,94 @@
+# benchmarks/cpu_pool.py
+# Throughput of the CPU stages (extract + segment + skills + score) run in
+# the request threads vs in a CPUPool of N processes.
+#
+# Drives ResumeAnalyzer.cpu_features over the synthetic corpus (PDF, DOCX,
+# TXT) from `--threads` request threads, once per `--workers` value
+# (0 = in-thread, the default app configuration), and reports docs/s and
+# latency percentiles per setting alongside the machine's core count.
+#
+#   python -m benchmarks.cpu_pool --workers 0,1,2,4 --threads 8 --requests 200
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from metrics import current_rss_bytes, summarize
+from benchmarks.corpus import FORMATS, SIZES, build_corpus
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(description="CPU stage throughput: threads vs process pool")
+    p.add_argument("--workers", default="0,1,2,4", help="comma-separated CPU_POOL_WORKERS values")
+    p.add_argument("--threads", type=int, default=8, help="concurrent request threads")
+    p.add_argument("--requests", type=int, default=200)
+    p.add_argument("--max-tasks", type=int, default=50)
+    p.add_argument("--corpus-size", type=int, default=12)
+    p.add_argument("--seed", type=int, default=1234)
+    p.add_argument("--output")
+    args = p.parse_args(argv)
+
+    from resume_analyzer import ResumeAnalyzer
+    from cpu_pool import CPUPool
+
+    analyzer   = ResumeAnalyzer()
+    corpus_dir = tempfile.mkdtemp(prefix="resumeai-cpu-")
+    results    = []
+    try:
+        items = build_corpus(corpus_dir, count=args.corpus_size, sizes=list(SIZES),
+                             formats=list(FORMATS), seed=args.seed)
+        payloads = []
+        for item in items:
+            with open(item.path, "rb") as f:
+                payloads.append(f.read())
+
+        for workers in [int(w) for w in args.workers.split(",")]:
+            pool = CPUPool(workers=workers, max_tasks=args.max_tasks, timeout=120)
+            # start the processes and import the parsers before timing
+            for data in payloads[: max(1, workers)]:
+                pool.features(analyzer, data)
+            lat: List[float] = []
+
+            def one(i: int):
+                data = payloads[i % len(payloads)]
+                t0 = time.perf_counter()
+                out = pool.features(analyzer, data)
+                lat.append(time.perf_counter() - t0)
+                return "error" not in out
+
+            t0 = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=args.threads) as tp:
+                ok = sum(tp.map(one, range(args.requests)))
+            wall = time.perf_counter() - t0
+            results.append({
+                "workers":        workers,
+                "threads":        args.threads,
+                "requests":       args.requests,
+                "ok":             ok,
+                "throughput_dps": args.requests / wall if wall else 0.0,
+                "latency_s":      summarize(lat),
+                "parent_rss":     current_rss_bytes(),
+                "pool":           pool.stats(),
+            })
+            pool.shutdown()
+    finally:
+        shutil.rmtree(corpus_dir, ignore_errors=True)
+
+    report = {"cpu_count": os.cpu_count(), "results": results}
+    out = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(out + "\n")
+    else:
+        print(out)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
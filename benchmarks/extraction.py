@@ -0,0 +1,95 @@
+# benchmarks/extraction.py
+# Per-format text extraction: cold parse vs extract-cache hit.
+#
+# Writes the synthetic corpus in every supported format (PDF, DOCX, ODT,
+# RTF, HTML, TXT) and, for each file, times:
+#   sniff_ms   : ExtractorRegistry.check() on the raw bytes
+#   cold_ms    : full extraction (what an upload paid before the cache)
+#   cached_ms  : file_hash() + extract-cache lookup (a re-upload)
+# and checks the sniffed format matches the written one and how much of the
+# source text survived (word recall).
+#
+#   python -m benchmarks.extraction --docs 6 --repeat 5 [--output ext.json]
+
+import re
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+from typing import Dict, List, Optional
+
+from metrics import summarize
+from extractors import file_hash, get_extractors
+from session_store import StoredText, extract_cache_from_env
+from benchmarks.corpus import ALL_FORMATS, SIZES, build_corpus
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def _word_recall(source: str, extracted: str) -> float:
+    want = _WORD_RE.findall(source.lower())
+    got  = set(_WORD_RE.findall(extracted.lower()))
+    return sum(w in got for w in want) / len(want) if want else 1.0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(description="Per-format extraction latency, cold vs cached")
+    p.add_argument("--docs", type=int, default=6, help="documents per format")
+    p.add_argument("--repeat", type=int, default=5, help="timed runs per document")
+    p.add_argument("--seed", type=int, default=1234)
+    p.add_argument("--output")
+    args = p.parse_args(argv)
+
+    registry   = get_extractors()
+    cache      = extract_cache_from_env()
+    corpus_dir = tempfile.mkdtemp(prefix="resumeai-ext-")
+    rows: Dict[str, Dict[str, List[float]]] = {}
+    mismatches = 0
+    try:
+        items = build_corpus(corpus_dir, count=args.docs * len(ALL_FORMATS), sizes=list(SIZES),
+                             formats=list(ALL_FORMATS), seed=args.seed)
+        for item in items:
+            with open(item.path, "rb") as f:
+                data = f.read()
+            m = rows.setdefault(item.fmt, {"sniff_ms": [], "cold_ms": [], "cached_ms": [],
+                                           "word_recall": []})
+            for _ in range(args.repeat):
+                t0 = time.perf_counter()
+                fmt = registry.check(data)
+                m["sniff_ms"].append((time.perf_counter() - t0) * 1000)
+
+                t0 = time.perf_counter()
+                extraction = registry.extract(data)
+                m["cold_ms"].append((time.perf_counter() - t0) * 1000)
+                cache.put(file_hash(data), StoredText(extraction.text, None))
+
+                t0 = time.perf_counter()
+                hit = cache.get(file_hash(data))
+                m["cached_ms"].append((time.perf_counter() - t0) * 1000)
+            mismatches += fmt != item.fmt or hit is None
+            m["word_recall"].append(_word_recall(item.text, extraction.text))
+    finally:
+        shutil.rmtree(corpus_dir, ignore_errors=True)
+
+    report = {
+        "docs_per_format": args.docs,
+        "repeat":          args.repeat,
+        "mismatches":      mismatches,
+        "results": {
+            fmt: {k: summarize(v) if k.endswith("_ms") else sum(v) / len(v) for k, v in m.items()}
+            for fmt, m in rows.items()
+        },
+    }
+    out = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(out + "\n")
+    else:
+        print(out)
+    return 0 if not mismatches else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
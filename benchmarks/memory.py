@@ -0,0 +1,140 @@
+# benchmarks/memory.py
+# Leak regression: RSS growth over many analyses in one process.
+#
+# Runs `--analyses` synthetic analyze_resume() calls (default 1,000) against
+# the stub LLM, cycling through `--sessions` session ids so the incremental
+# memos, RAG sessions and text handles are exercised. The first `--warmup`
+# calls fill those bounded stores; after that RSS should be flat. RSS is
+# sampled (after gc.collect()) every `--sample-every` calls and the report
+# gives the growth after warm-up and its least-squares slope per analysis.
+# Exits 1 when growth exceeds `--max-growth-mb`, so it can gate CI.
+#
+#   python -m benchmarks.memory --analyses 1000 --max-growth-mb 16 [--tracemalloc]
+#
+# --tracemalloc also lists the top allocation sites that grew after warm-up.
+
+import gc
+import os
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+import tracemalloc
+from typing import List, Optional
+
+from metrics import current_rss_bytes, peak_rss_bytes
+from benchmarks.corpus import FORMATS, SIZES, build_corpus
+from benchmarks.stub_llm import StubInferenceServer
+
+MB = 1024 * 1024
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _repo_frame(traceback) -> Optional[str]:
+    """Innermost frame in this repository (the code that kept the memory)."""
+    for frame in reversed(traceback):
+        if frame.filename.startswith(REPO_ROOT) and "benchmarks" not in frame.filename:
+            return f"{os.path.relpath(frame.filename, REPO_ROOT)}:{frame.lineno}"
+    return None
+
+
+def _slope(points: List[tuple]) -> float:
+    """Least-squares slope of (x, y) points."""
+    n = len(points)
+    if n < 2:
+        return 0.0
+    mx = sum(x for x, _ in points) / n
+    my = sum(y for _, y in points) / n
+    var = sum((x - mx) ** 2 for x, _ in points)
+    return sum((x - mx) * (y - my) for x, y in points) / var if var else 0.0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(description="RSS growth over repeated analyses")
+    p.add_argument("--analyses", type=int, default=1000)
+    p.add_argument("--warmup", type=int, default=200, help="calls before the baseline sample")
+    p.add_argument("--sessions", type=int, default=50, help="distinct session ids to cycle through")
+    p.add_argument("--text-handles", type=int, default=100, help="TEXT_HANDLE_MAX for the run")
+    p.add_argument("--sample-every", type=int, default=100)
+    p.add_argument("--max-growth-mb", type=float, default=16.0)
+    p.add_argument("--corpus-size", type=int, default=12)
+    p.add_argument("--seed", type=int, default=1234)
+    p.add_argument("--rag", action="store_true", help="include the RAG pipeline (RAG_ENABLED=1)")
+    p.add_argument("--tracemalloc", action="store_true")
+    p.add_argument("--output")
+    args = p.parse_args(argv)
+
+    stub = StubInferenceServer(latency_ms=0, seed=args.seed).start()
+    os.environ["HF_INFERENCE_ENDPOINT"] = stub.url
+    os.environ.setdefault("HUGGINGFACE_API_TOKEN", "hf_stub_token")
+    os.environ["RAG_ENABLED"]      = "1" if args.rag else "0"
+    os.environ["LLM_RATE_PER_SEC"] = "0"
+    os.environ["TEXT_HANDLE_MAX"]  = str(args.text_handles)
+
+    from resume_analyzer import ResumeAnalyzer
+    analyzer   = ResumeAnalyzer()
+    corpus_dir = tempfile.mkdtemp(prefix="resumeai-mem-")
+    samples: List[tuple] = []
+    failures = 0
+    top_growth = []
+    try:
+        items = build_corpus(corpus_dir, count=args.corpus_size, sizes=list(SIZES),
+                             formats=list(FORMATS), seed=args.seed)
+        before = None
+        for i in range(args.analyses):
+            if i == args.warmup and args.tracemalloc:
+                tracemalloc.start(16)
+                before = tracemalloc.take_snapshot()
+            item   = items[i % len(items)]
+            result = analyzer.analyze_resume(item.path, item.jd, session_id=f"mem-{i % args.sessions}")
+            failures += not result.get("success")
+            del result
+            if i + 1 >= args.warmup and (i + 1 - args.warmup) % args.sample_every == 0:
+                gc.collect()
+                samples.append((i + 1, current_rss_bytes()))
+        gc.collect()
+        samples.append((args.analyses, current_rss_bytes()))
+        if before is not None:
+            diff = tracemalloc.take_snapshot().compare_to(before, "traceback")
+            top_growth = [
+                {"site": f"{d.traceback[-1].filename}:{d.traceback[-1].lineno}",
+                 "via":  _repo_frame(d.traceback),
+                 "size_diff_kib": d.size_diff / 1024, "count_diff": d.count_diff}
+                for d in diff[:10]
+            ]
+            tracemalloc.stop()
+    finally:
+        shutil.rmtree(corpus_dir, ignore_errors=True)
+        stub.stop()
+        analyzer.rag_sessions.clear()
+
+    growth = samples[-1][1] - samples[0][1] if samples else 0
+    report = {
+        "analyses":       args.analyses,
+        "warmup":         args.warmup,
+        "failures":       failures,
+        "rss_samples":    [{"after": n, "rss_mb": rss / MB} for n, rss in samples],
+        "growth_mb":      growth / MB,
+        "slope_kib_per_analysis": _slope(samples) / 1024,
+        "peak_rss_mb":    peak_rss_bytes() / MB,
+        "max_growth_mb":  args.max_growth_mb,
+        "stores": {
+            "rag_sessions": analyzer.rag_sessions.stats(),
+            "text_handles": analyzer.texts.stats(),
+            "memos":        analyzer.memos.stats(),
+        },
+        "top_growth":     top_growth,
+        "passed":         growth / MB <= args.max_growth_mb and not failures,
+    }
+    out = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(out + "\n")
+    else:
+        print(out)
+    return 0 if report["passed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+# benchmarks/rag_context.py
+# RAG prompt context: plain top-k vs MMR + overlap merging.
+#
+# Indexes each synthetic resume + JD the way build_vectorstore() does (section
+# chunks for the resume, the overlapping splitter for the JD) and runs the
+# labelled keyword queries from retrieval_recall against two stores that
+# differ only in RAG_DEDUP ("off" / "mmr"). Per mode and k:
+#   tokens             : context tokens sent to the LLM (LLM_TOKENIZER)
+#   unique_token_ratio : distinct / total tokens in the context
+#   hit_rate           : queries whose context still contains a relevant chunk
+#   retrieve_ms        : retrieve() latency
+#
+#   python -m benchmarks.rag_context --docs 20 [--output ctx.json]
+
+import sys
+import json
+import time
+import argparse
+from typing import Dict, List, Optional
+
+from metrics import summarize
+from resume_segmenter import segment_resume
+from benchmarks.corpus import job_description, resume_text
+from benchmarks.retrieval_recall import _queries
+
+KS   = (3, 4, 6)
+MODES = ("off", "mmr")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(description="Plain top-k vs MMR-deduplicated RAG context")
+    p.add_argument("--docs", type=int, default=20)
+    p.add_argument("--seed", type=int, default=1234)
+    p.add_argument("--output")
+    args = p.parse_args(argv)
+
+    from rag_engine import ChunkDoc, ChromaVectorStore, ResumeRAGEngine
+
+    engine = ResumeRAGEngine(hf_api_token="")   # splitter + embeddings only
+    if not engine._embeddings.ready:
+        print(json.dumps({"docs": 0, "notes": "unavailable: sentence-transformers embeddings not loaded"}))
+        return 0
+
+    rows: Dict[str, Dict[int, Dict[str, List[float]]]] = {
+        mode: {k: {"tokens": [], "unique_token_ratio": [], "hit": [], "retrieve_ms": []} for k in KS}
+        for mode in MODES
+    }
+    for i in range(args.docs):
+        size   = ("small", "medium", "large")[i % 3]
+        resume = resume_text(args.seed + i, size)
+        docs   = engine._resume_documents(resume, segment_resume(resume))
+        docs  += [ChunkDoc(c.strip(), {"source": "job_description"})
+                  for c in engine._splitter.split_text(job_description(args.seed + i)) if c.strip()]
+        chunks  = [d.page_content for d in docs]
+        queries = _queries(chunks)
+        for mode in MODES:
+            store = ChromaVectorStore(docs, engine._embeddings, dedup=mode)
+            try:
+                for query, relevant in queries:
+                    for k in KS:
+                        t0 = time.perf_counter()
+                        got, report = store.retrieve(query, k=k)
+                        elapsed = (time.perf_counter() - t0) * 1000
+                        context = "\n\n".join(d.page_content for d in got)
+                        m = rows[mode][k]
+                        m["tokens"].append(report["tokens"])
+                        m["unique_token_ratio"].append(report["unique_token_ratio"])
+                        m["hit"].append(float(any(chunks[r] in context for r in relevant)))
+                        m["retrieve_ms"].append(elapsed)
+            finally:
+                store.cleanup()
+
+    report = {
+        "docs": args.docs,
+        "results": {
+            mode: {
+                str(k): {
+                    "tokens":             summarize(m["tokens"]),
+                    "unique_token_ratio": sum(m["unique_token_ratio"]) / len(m["hit"]) if m["hit"] else 0.0,
+                    "hit_rate":           sum(m["hit"]) / len(m["hit"]) if m["hit"] else 0.0,
+                    "retrieve_ms":        summarize(m["retrieve_ms"]),
+                } for k, m in by_k.items()
+            } for mode, by_k in rows.items()
+        },
+    }
+    out = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(out + "\n")
+    else:
+        print(out)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+# benchmarks/retrieval_recall.py
+# Offline recall / latency comparison of dense, BM25 and hybrid retrieval.
+#
+# Builds chunks from the synthetic corpus exactly as build_vectorstore() does,
+# derives labelled keyword queries (skills, employers, years — the queries
+# dense-only search tends to miss), and reports for k = 1..5:
+#   hit_rate : fraction of queries with ≥1 relevant chunk in the top k
+#   recall   : mean |relevant ∩ top-k| / min(|relevant|, k)
+#   context_chars : mean characters of retrieved context (prompt size proxy)
+# plus per-query latency.
+#
+#   python -m benchmarks.retrieval_recall --docs 20 [--output recall.json]
+
+import sys
+import json
+import time
+import argparse
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from metrics import summarize
+from retrieval import BM25Index
+from benchmarks.corpus import COMPANIES, SKILLS, job_description, resume_text
+
+KS = (1, 2, 3, 4, 5)
+
+
+def _queries(chunks: Sequence[str]) -> List[Tuple[str, Set[int]]]:
+    lowered = [c.lower() for c in chunks]
+    out = []
+    terms  = [(s, f"Experience with {s}") for s in SKILLS]
+    terms += [(c, f"What did the candidate do at {c}?") for c in COMPANIES]
+    terms += [(str(y), f"Which role was held in {y}?") for y in range(2015, 2026)]
+    for term, query in terms:
+        relevant = {i for i, c in enumerate(lowered) if term.lower() in c}
+        if relevant:
+            out.append((query, relevant))
+    return out
+
+
+def _score(ranked: List[int], relevant: Set[int], k: int) -> Tuple[float, float]:
+    top = set(ranked[:k])
+    hit = 1.0 if top & relevant else 0.0
+    return hit, len(top & relevant) / min(len(relevant), k)
+
+
+def evaluate(searchers: Dict[str, object], docs_queries) -> Dict:
+    report: Dict[str, Dict] = {}
+    for name, make in searchers.items():
+        hits   = {k: [] for k in KS}
+        recall = {k: [] for k in KS}
+        ctx    = {k: [] for k in KS}
+        lat: List[float] = []
+        for chunks, queries in docs_queries:
+            search = make(chunks)
+            for query, relevant in queries:
+                t0 = time.perf_counter()
+                ranked = search(query, max(KS))
+                lat.append(time.perf_counter() - t0)
+                for k in KS:
+                    h, r = _score(ranked, relevant, k)
+                    hits[k].append(h)
+                    recall[k].append(r)
+                    ctx[k].append(sum(len(chunks[i]) for i in ranked[:k]))
+        report[name] = {
+            "queries": len(lat),
+            "latency_s": summarize(lat),
+            "by_k": {
+                str(k): {
+                    "hit_rate":      sum(hits[k]) / len(hits[k]) if hits[k] else 0.0,
+                    "recall":        sum(recall[k]) / len(recall[k]) if recall[k] else 0.0,
+                    "context_chars": sum(ctx[k]) / len(ctx[k]) if ctx[k] else 0.0,
+                } for k in KS
+            },
+        }
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(description="Dense vs BM25 vs hybrid retrieval recall")
+    p.add_argument("--docs", type=int, default=20)
+    p.add_argument("--seed", type=int, default=1234)
+    p.add_argument("--output")
+    args = p.parse_args(argv)
+
+    from rag_engine import ChunkDoc, ResumeRAGEngine, ChromaVectorStore
+
+    engine = ResumeRAGEngine(hf_api_token="")   # splitter + embeddings only
+    docs_queries = []
+    for i in range(args.docs):
+        size = ("small", "medium", "large")[i % 3]
+        chunks = [c.strip() for c in engine._splitter.split_text(resume_text(args.seed + i, size)) if c.strip()]
+        chunks += [c.strip() for c in engine._splitter.split_text(job_description(args.seed + i)) if c.strip()]
+        docs_queries.append((chunks, _queries(chunks)))
+
+    searchers = {
+        "bm25": lambda chunks: (lambda q, k, ix=BM25Index(chunks): [i for i, _ in ix.search(q, k)]),
+    }
+    notes  = {}
+    stores: List[ChromaVectorStore] = []
+    if engine._embeddings.ready:
+        def _store(mode):
+            def make(chunks):
+                store = ChromaVectorStore(
+                    [ChunkDoc(c, {"source": "resume"}) for c in chunks],
+                    engine._embeddings, retrieval=mode,
+                )
+                stores.append(store)
+                index = {c: n for n, c in enumerate(chunks)}
+                if mode == "dense":
+                    return lambda q, k: store.dense_ids(q, k)
+                return lambda q, k: [index[d.page_content] for d in store.hybrid_search(q, k)]
+            return make
+        searchers["dense"]  = _store("dense")
+        searchers["hybrid"] = _store("hybrid")
+    else:
+        notes["dense"] = "unavailable: sentence-transformers embeddings not loaded"
+
+    try:
+        report = {"docs": args.docs, "notes": notes, "results": evaluate(searchers, docs_queries)}
+    finally:
+        for store in stores:
+            store.cleanup()
+
+    out = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(out + "\n")
+    else:
+        print(out)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,179 @@
+# benchmarks/run.py
+# Drive Resume.AI routes at fixed concurrency and emit a JSON report.
+#
+#   python -m benchmarks.run --scenario upload --concurrency 4 --requests 60 \
+#       --stub-latency-ms 250 --output bench_upload.json
+#
+# Report fields: throughput (req/s), latency p50/p95/p99 (seconds), process RSS
+# before/after/peak, and mean/p50/p95 per pipeline stage (in-process runs only).
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from metrics import StageRecorder, current_rss_bytes, peak_rss_bytes, summarize
+from benchmarks.corpus import SIZES, FORMATS, build_corpus
+from benchmarks.stub_llm import StubInferenceServer
+from benchmarks.scenarios import SCENARIOS, HttpTransport, InProcessTransport, load_app
+
+
+def run_scenario(
+    transport,
+    scenario: str,
+    items,
+    requests: int,
+    concurrency: int,
+    warmup: int = 2,
+) -> Dict:
+    fn     = SCENARIOS[scenario]
+    local  = threading.local()
+    lock   = threading.Lock()
+    lat:    List[float] = []
+    stages: Dict[str, List[float]] = {}
+    counters: Dict[str, List[float]] = {}
+    status_counts: Dict[str, int]  = {}
+    errors = 0
+
+    def one(i: int, record: bool = True):
+        nonlocal errors
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = transport.client()
+        item = items[i % len(items)]
+        with StageRecorder() as rec:
+            t0 = time.perf_counter()
+            try:
+                ok, status = fn(client, item, i)
+            except Exception:
+                ok, status = False, -1
+            elapsed = time.perf_counter() - t0
+        if not record:
+            return
+        with lock:
+            lat.append(elapsed)
+            status_counts[str(status)] = status_counts.get(str(status), 0) + 1
+            if not ok:
+                errors += 1
+            for name, secs in rec.timings.items():
+                stages.setdefault(name, []).append(secs)
+            for name, value in rec.counters.items():
+                counters.setdefault(name, []).append(value)
+
+    for i in range(warmup):
+        one(i, record=False)
+
+    rss_before = current_rss_bytes()
+    t_start    = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(requests)))
+    wall = time.perf_counter() - t_start
+
+    return {
+        "scenario":       scenario,
+        "requests":       requests,
+        "concurrency":    concurrency,
+        "wall_seconds":   wall,
+        "throughput_rps": requests / wall if wall else 0.0,
+        "errors":         errors,
+        "status_counts":  status_counts,
+        "latency":        summarize(lat),
+        "stages":         {k: summarize(v) for k, v in sorted(stages.items())},
+        # per-request totals, e.g. prompt_tokens / llm_calls
+        "counters":       {k: summarize(v) for k, v in sorted(counters.items())},
+        "rss_bytes": {
+            "before": rss_before,
+            "after":  current_rss_bytes(),
+            "peak":   peak_rss_bytes(),
+        },
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(description="Offline Resume.AI benchmark")
+    p.add_argument("--scenario", choices=sorted(SCENARIOS) + ["all"], default="all")
+    p.add_argument("--requests", type=int, default=30)
+    p.add_argument("--concurrency", type=int, default=4)
+    p.add_argument("--warmup", type=int, default=2)
+    p.add_argument("--corpus-size", type=int, default=12, help="distinct documents to generate")
+    p.add_argument("--sizes", default=",".join(SIZES))
+    p.add_argument("--formats", default=",".join(FORMATS))
+    p.add_argument("--seed", type=int, default=1234)
+    p.add_argument("--stub-latency-ms", type=float, default=200.0)
+    p.add_argument("--stub-jitter-ms", type=float, default=0.0)
+    p.add_argument("--stub-tokens", type=int, default=80)
+    p.add_argument("--no-rag", action="store_true", help="set RAG_ENABLED=0 for the run")
+    p.add_argument("--llm-rate", type=float, default=0.0,
+                   help="LLM_RATE_PER_SEC for the in-process app (0 = unlimited)")
+    p.add_argument("--base-url", help="benchmark a running server instead of the in-process app")
+    p.add_argument("--output", help="write JSON report here (default: stdout)")
+    args = p.parse_args(argv)
+
+    stub = None
+    if not args.base_url:
+        stub = StubInferenceServer(
+            latency_ms=args.stub_latency_ms,
+            jitter_ms=args.stub_jitter_ms,
+            tokens_per_reply=args.stub_tokens,
+            seed=args.seed,
+        ).start()
+        os.environ["HF_INFERENCE_ENDPOINT"] = stub.url
+        os.environ.setdefault("HUGGINGFACE_API_TOKEN", "hf_stub_token")
+        if args.no_rag:
+            os.environ["RAG_ENABLED"] = "0"
+        # measure the app, not the admission limiter, unless asked to
+        os.environ["LLM_RATE_PER_SEC"] = str(args.llm_rate)
+        transport = InProcessTransport(load_app())
+    else:
+        transport = HttpTransport(args.base_url)
+
+    corpus_dir = tempfile.mkdtemp(prefix="resumeai-bench-")
+    try:
+        items = build_corpus(
+            corpus_dir, count=args.corpus_size,
+            sizes=args.sizes.split(","), formats=args.formats.split(","), seed=args.seed,
+        )
+        scenarios = sorted(SCENARIOS) if args.scenario == "all" else [args.scenario]
+        results = []
+        for name in scenarios:
+            if stub:
+                stub.reset_stats()
+            res = run_scenario(transport, name, items, args.requests, args.concurrency, args.warmup)
+            if stub:
+                res["stub_llm"] = stub.stats()
+            results.append(res)
+    finally:
+        shutil.rmtree(corpus_dir, ignore_errors=True)
+        if stub:
+            stub.stop()
+
+    report = {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "environment": {
+            "python":   sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpus":     os.cpu_count(),
+            "target":   args.base_url or "in-process",
+            "rag_enabled": os.getenv("RAG_ENABLED", "1"),
+        },
+        "config": vars(args),
+        "results": results,
+    }
+    out = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(out + "\n")
+    else:
+        print(out)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
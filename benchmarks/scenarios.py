@@ -0,0 +1,156 @@
+# benchmarks/scenarios.py
+# Request drivers for the Flask routes under test.
+#
+# A transport sends one request and returns (status_code, body_bytes).
+#   InProcessTransport : Flask test client — same thread as the caller, so
+#                        metrics.StageRecorder captures per-stage timings.
+#   HttpTransport      : plain urllib against a running server (gunicorn etc.)
+
+import os
+import json
+import uuid
+import urllib.error
+import urllib.request
+from typing import Callable, Dict, Optional, Tuple
+
+from benchmarks.corpus import CorpusItem
+
+Response = Tuple[int, bytes]
+
+
+def load_app():
+    """Import the Flask app for in-process runs.
+
+    HF_INFERENCE_ENDPOINT / HUGGINGFACE_API_TOKEN must be set *before* this is
+    called, because app.py builds its ResumeAnalyzer at import time.
+    """
+    from app import app as flask_app
+    # The HTML templates live next to app.py in this checkout rather than in
+    # templates/; fall back to the app root so /upload can actually render.
+    if not os.path.isdir(os.path.join(flask_app.root_path, flask_app.template_folder or "")):
+        flask_app.template_folder = flask_app.root_path
+    return flask_app
+
+
+class InProcessTransport:
+    def __init__(self, flask_app):
+        self._app = flask_app
+
+    def client(self):
+        return _InProcessClient(self._app.test_client())
+
+
+class _InProcessClient:
+    def __init__(self, client):
+        self._c = client
+
+    def upload(self, filename: str, payload: bytes, jd: str, path: str = "/upload") -> Response:
+        import io
+        r = self._c.post(
+            path,
+            data={"resume": (io.BytesIO(payload), filename), "job_description": jd},
+            content_type="multipart/form-data",
+        )
+        return r.status_code, r.data
+
+    def post_json(self, path: str, body: Dict) -> Response:
+        r = self._c.post(path, json=body)
+        return r.status_code, r.data
+
+
+class HttpTransport:
+    def __init__(self, base_url: str, timeout: float = 120.0):
+        self.base_url = base_url.rstrip("/")
+        self.timeout  = timeout
+
+    def client(self):
+        return self
+
+    def _send(self, req: urllib.request.Request) -> Response:
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as r:
+                return r.status, r.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+        except (urllib.error.URLError, OSError) as e:
+            return 0, str(e).encode()
+
+    def upload(self, filename: str, payload: bytes, jd: str, path: str = "/upload") -> Response:
+        boundary = uuid.uuid4().hex
+        parts = [
+            f"--{boundary}\r\nContent-Disposition: form-data; name=\"job_description\"\r\n\r\n".encode()
+            + jd.encode() + b"\r\n",
+            f"--{boundary}\r\nContent-Disposition: form-data; name=\"resume\"; filename=\"{filename}\"\r\n"
+            f"Content-Type: application/octet-stream\r\n\r\n".encode() + payload + b"\r\n",
+            f"--{boundary}--\r\n".encode(),
+        ]
+        req = urllib.request.Request(
+            self.base_url + path, data=b"".join(parts), method="POST",
+            headers={"Content-Type": f"multipart/form-data; boundary={boundary}"},
+        )
+        # A failed analysis redirects to "/" — report the 302 instead of following it.
+        return _NoRedirect.open(req, self.timeout)
+
+    def post_json(self, path: str, body: Dict) -> Response:
+        req = urllib.request.Request(
+            self.base_url + path, data=json.dumps(body).encode(), method="POST",
+            headers={"Content-Type": "application/json"},
+        )
+        return self._send(req)
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+    @classmethod
+    def open(cls, req, timeout) -> Response:
+        opener = urllib.request.build_opener(cls)
+        try:
+            with opener.open(req, timeout=timeout) as r:
+                return r.status, r.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+        except (urllib.error.URLError, OSError) as e:
+            return 0, str(e).encode()
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Scenarios: (client, corpus item, request index) -> (ok, status)
+# ─────────────────────────────────────────────────────────────────────────────
+def upload_scenario(client, item: CorpusItem, i: int) -> Tuple[bool, int]:
+    with open(item.path, "rb") as f:
+        payload = f.read()
+    # repeat uploads of an item hit the extract cache, as real re-uploads do
+    filename = f"{item.name}-{i}.{item.fmt}"
+    status, _ = client.upload(filename, payload, item.jd)
+    # /upload renders results.html on success and redirects on any failure
+    return status == 200, status
+
+
+def api_analyze_scenario(client, item: CorpusItem, i: int) -> Tuple[bool, int]:
+    with open(item.path, "rb") as f:
+        payload = f.read()
+    status, body = client.upload(f"{item.name}-{i}.{item.fmt}", payload, item.jd, path="/api/analyze")
+    return status == 200 and _success(body), status
+
+
+def _success(body: bytes) -> bool:
+    try:
+        return bool(json.loads(body).get("success"))
+    except ValueError:
+        return False
+
+
+def cover_letter_scenario(client, item: CorpusItem, i: int) -> Tuple[bool, int]:
+    status, body = client.post_json(
+        "/generate-cover-letter", {"resume_text": item.text, "jd_text": item.jd}
+    )
+    return status == 200 and _success(body), status
+
+
+SCENARIOS: Dict[str, Callable] = {
+    "upload":       upload_scenario,
+    "api_analyze":  api_analyze_scenario,
+    "cover_letter": cover_letter_scenario,
+}
@@ -0,0 +1,95 @@
+# benchmarks/skill_match.py
+# Latency of SkillMatcher lookup + matching at taxonomy scale.
+#
+# Uses a synthetic taxonomy of --terms entries and a random L2-normalised
+# float32 matrix written to a temp .npy and memory-mapped, exactly like the
+# real index, so no embedding model is needed. Reports per-resume latency of
+# find() on resume + JD text and of the vectorised match().
+#
+# Also checks that the analyzer's JD skill extraction still finds the skills
+# in a JD that joins them with "/" and "-" (REGRESSION_JD); the run exits
+# non-zero if any expected skill is missing.
+#
+#   python -m benchmarks.skill_match --terms 50000 --docs 200
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+from typing import List, Optional
+
+from metrics import summarize
+from skill_matcher import ALIASES, SkillMatcher
+from benchmarks.corpus import SKILLS, job_description, resume_text
+
+REGRESSION_JD = ("Python/Django, Java-based services, AWS/GCP, React/Redux, SQL (PostgreSQL), "
+                 "C++ and docker-compose. Kubernetes, CI/CD. Node.js.")
+REGRESSION_SKILLS = {"python", "django", "java", "aws", "gcp", "react", "sql", "postgresql",
+                     "c++", "docker", "kubernetes", "devops", "node.js"}
+
+
+def jd_regression() -> dict:
+    from resume_analyzer import ResumeAnalyzer
+    found = set(ResumeAnalyzer().extract_jd_skills(REGRESSION_JD)['technical'])
+    return {"found": sorted(found), "missing": sorted(REGRESSION_SKILLS - found)}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(description="SkillMatcher latency at taxonomy scale")
+    p.add_argument("--terms", type=int, default=50000)
+    p.add_argument("--dim", type=int, default=384)
+    p.add_argument("--docs", type=int, default=200)
+    p.add_argument("--seed", type=int, default=7)
+    args = p.parse_args(argv)
+
+    import numpy as np
+    rng   = random.Random(args.seed)
+    words = ["data", "cloud", "stream", "graph", "query", "model", "cache", "edge", "flow",
+             "vector", "event", "batch", "mesh", "api", "web", "ops", "sec", "ml", "db"]
+    terms = [s.lower() for s in SKILLS]
+    while len(terms) < args.terms:
+        terms.append(" ".join(rng.choice(words) for _ in range(rng.randint(1, 3))) + f" {len(terms)}")
+
+    with tempfile.TemporaryDirectory(prefix="resumeai-skills-") as tmp:
+        SkillMatcher.MATRIX_DIR = tmp
+        matcher = SkillMatcher(terms, ALIASES)
+        vecs = np.random.default_rng(args.seed).standard_normal(
+            (len(matcher.terms), args.dim), dtype=np.float32)
+        vecs /= np.linalg.norm(vecs, axis=1, keepdims=True)
+        np.save(matcher.matrix_path, vecs)
+        del vecs
+
+        t0 = time.perf_counter()
+        M  = matcher.matrix(build_if_missing=False)
+        load_s = time.perf_counter() - t0
+
+        find_s, match_s = [], []
+        for i in range(args.docs):
+            r_text, j_text = resume_text(i, "large"), job_description(i)
+            t0 = time.perf_counter()
+            r_ids, j_ids = matcher.find(r_text), matcher.find(j_text)
+            t1 = time.perf_counter()
+            matcher.match(r_ids, j_ids)
+            t2 = time.perf_counter()
+            find_s.append(t1 - t0)
+            match_s.append(t2 - t1)
+
+        report = {
+            "terms": len(matcher.terms),
+            "dim": args.dim,
+            "matrix_bytes": int(M.nbytes),
+            "mmap_open_s": load_s,
+            "find_s": summarize(find_s),
+            "match_s": summarize(match_s),
+            "total_per_resume_s": summarize([a + b for a, b in zip(find_s, match_s)]),
+        }
+    report["jd_regression"] = jd_regression()
+    print(json.dumps(report, indent=2, sort_keys=True))
+    return 0 if not report["jd_regression"]["missing"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
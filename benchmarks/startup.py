@@ -0,0 +1,111 @@
+# benchmarks/startup.py
+# Cold-start measurements, each in a fresh interpreter:
+#   import_s        : `import app`
+#   warm_up_s       : app.warm_up() (only with --preload)
+#   first_request_s : first /upload through the test client
+#   second_request_s: the same request again (steady state)
+#
+#   python -m benchmarks.startup --runs 3 [--preload] [--output startup.json]
+
+import os
+import sys
+import json
+import argparse
+import subprocess
+import tempfile
+from typing import Dict, List, Optional
+
+from metrics import summarize
+from benchmarks.stub_llm import StubInferenceServer
+
+_CHILD = r"""
+import io, json, sys, time
+t0 = time.perf_counter()
+import app as app_module
+t_import = time.perf_counter() - t0
+from benchmarks.scenarios import load_app
+from benchmarks.corpus import resume_text, job_description, write_pdf
+flask_app = load_app()
+
+t_warm = 0.0
+if PRELOAD:
+    t0 = time.perf_counter()
+    app_module.warm_up()
+    t_warm = time.perf_counter() - t0
+
+write_pdf(resume_text(1, "medium"), PDF_PATH)
+payload = open(PDF_PATH, "rb").read()
+client = flask_app.test_client()
+
+def upload(n):
+    t0 = time.perf_counter()
+    r = client.post("/upload", content_type="multipart/form-data", data={
+        "resume": (io.BytesIO(payload), f"cold-{n}.pdf"),
+        "job_description": job_description(1),
+    })
+    return time.perf_counter() - t0, r.status_code
+
+first, s1 = upload(1)
+second, s2 = upload(2)
+print("RESULT " + json.dumps({
+    "import_s": t_import, "warm_up_s": t_warm,
+    "first_request_s": first, "second_request_s": second,
+    "status": [s1, s2], "modules_loaded": len(sys.modules),
+}))
+"""
+
+
+def _run_child(preload: bool, env: Dict[str, str], pdf_path: str) -> Dict:
+    code = f"PRELOAD = {preload!r}\nPDF_PATH = {pdf_path!r}\n" + _CHILD
+    out = subprocess.run(
+        [sys.executable, "-c", code], env=env, capture_output=True, text=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    for line in out.stdout.splitlines():
+        if line.startswith("RESULT "):
+            return json.loads(line[len("RESULT "):])
+    raise RuntimeError(f"startup child failed:\n{out.stderr[-2000:]}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(description="Measure import time and first-request latency")
+    p.add_argument("--runs", type=int, default=3)
+    p.add_argument("--preload", action="store_true", help="call app.warm_up() before the first request")
+    p.add_argument("--stub-latency-ms", type=float, default=50.0)
+    p.add_argument("--no-rag", action="store_true")
+    p.add_argument("--output")
+    args = p.parse_args(argv)
+
+    stub = StubInferenceServer(latency_ms=args.stub_latency_ms).start()
+    env = dict(os.environ)
+    env["HF_INFERENCE_ENDPOINT"] = stub.url
+    env.setdefault("HUGGINGFACE_API_TOKEN", "hf_stub_token")
+    if args.no_rag:
+        env["RAG_ENABLED"] = "0"
+
+    runs = []
+    try:
+        with tempfile.TemporaryDirectory(prefix="resumeai-startup-") as tmp:
+            for i in range(args.runs):
+                runs.append(_run_child(args.preload, env, os.path.join(tmp, f"r{i}.pdf")))
+    finally:
+        stub.stop()
+
+    keys = ("import_s", "warm_up_s", "first_request_s", "second_request_s")
+    report = {
+        "preload": args.preload,
+        "rag_enabled": not args.no_rag,
+        "runs": runs,
+        "summary": {k: summarize([r[k] for r in runs]) for k in keys},
+    }
+    out = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(out + "\n")
+    else:
+        print(out)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
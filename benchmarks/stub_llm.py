@@ -0,0 +1,181 @@
+# benchmarks/stub_llm.py
+# Local stand-in for the HuggingFace chat_completion endpoint.
+#
+# Speaks the OpenAI-compatible `POST /v1/chat/completions` shape that
+# InferenceClient.chat_completion() uses when `model` is a URL, sleeps for a
+# configurable latency, and returns deterministic text.  Point the app at it
+# with HF_INFERENCE_ENDPOINT=http://127.0.0.1:<port>.
+#
+#   python -m benchmarks.stub_llm --port 8089 --latency-ms 300 --jitter-ms 50
+
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+_FILLER = ("Quantify the impact of each role with concrete metrics and lead every "
+           "bullet with a strong action verb such as Developed Built or Led").split()
+
+
+class StubInferenceServer:
+    """Threaded HTTP server; usable in-process (start/stop) or from the CLI."""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency_ms: float = 200.0,
+        jitter_ms: float = 0.0,
+        tokens_per_reply: int = 80,
+        seed: int = 0,
+    ):
+        self.latency_ms       = latency_ms
+        self.jitter_ms        = jitter_ms
+        self.tokens_per_reply = tokens_per_reply
+        self._rng             = random.Random(seed)
+        self._lock            = threading.Lock()
+        self._stats: Dict[str, float] = {
+            "requests": 0, "prompt_chars": 0, "completion_tokens": 0, "in_flight_peak": 0,
+        }
+        self._in_flight = 0
+        self._httpd     = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(self._stats)
+
+    def reset_stats(self):
+        with self._lock:
+            for k in self._stats:
+                self._stats[k] = 0
+
+    def start(self) -> "StubInferenceServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def serve_forever(self):
+        self._httpd.serve_forever()
+
+    # ── request handling ──────────────────────────────────────────────────────
+    def _sleep(self):
+        with self._lock:
+            jitter = self._rng.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0
+        time.sleep(max(0.0, self.latency_ms + jitter) / 1000.0)
+
+    def _reply(self, payload: Dict) -> Dict:
+        messages   = payload.get("messages") or []
+        max_tokens = int(payload.get("max_tokens") or self.tokens_per_reply)
+        n_tokens   = min(max_tokens, self.tokens_per_reply)
+        prompt_chars = sum(len(str(m.get("content", ""))) for m in messages)
+
+        words = [_FILLER[i % len(_FILLER)] for i in range(n_tokens)]
+        lines = [" ".join(words[i:i + 16]) for i in range(0, len(words), 16)]
+        content = "\n".join(f"• {l}" for l in lines)
+
+        with self._lock:
+            self._stats["prompt_chars"]      += prompt_chars
+            self._stats["completion_tokens"] += n_tokens
+
+        return {
+            "id": "stub-chatcmpl",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": payload.get("model") or "stub",
+            "system_fingerprint": "stub",
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+                "logprobs": None,
+            }],
+            "usage": {
+                "prompt_tokens": prompt_chars // 4,
+                "completion_tokens": n_tokens,
+                "total_tokens": prompt_chars // 4 + n_tokens,
+            },
+        }
+
+    def _handler_class(self):
+        server = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):  # keep benchmark output clean
+                pass
+
+            def _send_json(self, code: int, body: Dict):
+                raw = json.dumps(body).encode()
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(raw)))
+                self.end_headers()
+                self.wfile.write(raw)
+
+            def do_GET(self):
+                if self.path.rstrip("/") == "/stats":
+                    self._send_json(200, server.stats())
+                else:
+                    self._send_json(200, {"status": "ok"})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                try:
+                    payload = json.loads(self.rfile.read(length) or b"{}")
+                except ValueError:
+                    self._send_json(400, {"error": "invalid json"})
+                    return
+                if not self.path.rstrip("/").endswith("chat/completions"):
+                    self._send_json(404, {"error": f"unknown route {self.path}"})
+                    return
+
+                with server._lock:
+                    server._stats["requests"] += 1
+                    server._in_flight += 1
+                    server._stats["in_flight_peak"] = max(
+                        server._stats["in_flight_peak"], server._in_flight
+                    )
+                try:
+                    server._sleep()
+                    self._send_json(200, server._reply(payload))
+                finally:
+                    with server._lock:
+                        server._in_flight -= 1
+
+        return _Handler
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Stub chat_completion server for offline benchmarks")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8089)
+    p.add_argument("--latency-ms", type=float, default=200.0)
+    p.add_argument("--jitter-ms", type=float, default=0.0)
+    p.add_argument("--tokens", type=int, default=80, help="completion tokens per reply")
+    args = p.parse_args(argv)
+
+    server = StubInferenceServer(args.host, args.port, args.latency_ms, args.jitter_ms, args.tokens)
+    print(f"stub LLM listening on {server.url}  (latency {args.latency_ms}±{args.jitter_ms} ms)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,484 @@
+# candidate_index.py
+# Opt-in persistent corpus of analyzed candidates, searchable across uploads
+#
+# With CANDIDATE_INDEX=1 every successful analysis is recorded once per
+# distinct upload (content hash): filename, score + breakdown, canonical
+# skills (skill_matcher taxonomy) and one resume vector — the L2-normalised
+# mean of the resume's chunk embeddings from the RAG build, so nothing is
+# embedded twice. Candidates analyzed without the RAG path have no vector;
+# skill / score filters still find them, and a later analysis without RAG
+# keeps the vector already stored. Re-analysing unchanged bytes writes
+# nothing. The score is the resume-only score (calculate_score_and_breakdown
+# never sees the JD), so keying by content hash is stable across JDs.
+#
+# Storage : SQLite (CANDIDATE_INDEX_DIR/candidates.db, WAL), shared by all
+#           workers. Every row carries a monotonically increasing `seq`; each
+#           process loads the table into columnar arrays once and then only
+#           reads rows with seq > last seen before a search, so other
+#           workers' additions show up without a reload. An updated row is
+#           appended at a new position and the old one masked; once dead
+#           positions pass `compact_ratio` of the arrays they are compacted.
+# Filters : inverted index skill → row positions (array('I'), appended in
+#           row order so postings stay sorted); "all" intersects postings
+#           smallest first, "any" unions them; min_score is a column test.
+# Semantic: small candidate sets (≤ CANDIDATE_EXACT_MAX) are scored exactly
+#           with one matrix-vector product. Larger ones go through an IVF
+#           index — spherical k-means coarse quantiser with
+#           CANDIDATE_ANN_LISTS lists (0 = √n), CANDIDATE_ANN_PROBE probed,
+#           widened until k filtered hits are found. It is built once the
+#           corpus has CANDIDATE_ANN_MIN vectors and rebuilt when it doubles.
+#
+#   python -m benchmarks.candidate_search --candidates 100000
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS candidates (
+    id        INTEGER PRIMARY KEY,
+    key       TEXT UNIQUE NOT NULL,
+    seq       INTEGER NOT NULL,
+    added     REAL NOT NULL,
+    filename  TEXT,
+    score     INTEGER NOT NULL,
+    breakdown TEXT,
+    skills    TEXT NOT NULL,
+    vector    BLOB,
+    deleted   INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS candidates_seq ON candidates (seq);
+"""
+
+
+def resume_vector(vectors) -> Optional[Any]:
+    """Mean of L2-normalised chunk embeddings, renormalised (or None)."""
+    import numpy as np
+    if vectors is None or len(vectors) == 0:
+        return None
+    v = np.asarray(vectors, dtype=np.float32).mean(axis=0)
+    norm = float(np.linalg.norm(v))
+    return v / norm if norm else None
+
+
+# ─── IVF (coarse-quantised) vector index ──────────────────────────────────────
+class _IVF:
+    """Inverted-file ANN index over rows of a normalised float32 matrix."""
+
+    def __init__(self, centroids, lists: List[array], built_for: int):
+        self.centroids = centroids
+        self.lists     = lists
+        self.built_for = built_for
+
+    @classmethod
+    def build(cls, vecs, positions, n_lists: int, iters: int = 8, seed: int = 0,
+              batch: int = 16384) -> "_IVF":
+        import numpy as np
+        rng    = np.random.default_rng(seed)
+        sample = vecs[positions[rng.permutation(len(positions))[: n_lists * 64]]]
+        cent   = sample[rng.choice(len(sample), n_lists, replace=False)].copy()
+        for _ in range(iters):
+            assign = (sample @ cent.T).argmax(axis=1)
+            sums   = np.zeros_like(cent)
+            np.add.at(sums, assign, sample)
+            norms  = np.linalg.norm(sums, axis=1, keepdims=True)
+            empty  = norms[:, 0] == 0
+            cent   = np.where(empty[:, None], cent, sums / np.where(norms == 0, 1.0, norms))
+            if empty.any():                     # re-seed empty lists
+                cent[empty] = sample[rng.choice(len(sample), int(empty.sum()))]
+        lists = [array("I") for _ in range(n_lists)]
+        ivf   = cls(cent.astype(np.float32), lists, len(positions))
+        for start in range(0, len(positions), batch):
+            ivf.add(vecs, positions[start:start + batch])
+        return ivf
+
+    def add(self, vecs, positions):
+        if len(positions) == 0:
+            return
+        assign = (vecs[positions] @ self.centroids.T).argmax(axis=1)
+        for pos, lst in zip(positions.tolist(), assign.tolist()):
+            self.lists[lst].append(pos)
+
+    def probe(self, qvec, nprobe: int):
+        import numpy as np
+        order = np.argsort(-(self.centroids @ qvec))[:nprobe]
+        parts = [np.frombuffer(self.lists[i], dtype=np.uint32) for i in order if len(self.lists[i])]
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.uint32)
+
+
+# ─── Candidate index ──────────────────────────────────────────────────────────
+class CandidateIndex:
+
+    # compact the columnar arrays when this share of positions is dead
+    compact_ratio = 0.25
+    compact_min   = 1024
+
+    def __init__(
+        self,
+        directory: str = "./candidate_index",
+        ann_min: int = 20000,
+        ann_lists: int = 0,
+        ann_probe: int = 16,
+        exact_max: int = 8192,
+    ):
+        self.directory = directory
+        self.path      = os.path.join(directory, "candidates.db")
+        self.ann_min   = ann_min
+        self.ann_lists = ann_lists
+        self.ann_probe = ann_probe
+        self.exact_max = exact_max
+        self._lock     = threading.RLock()
+        self._local    = threading.local()
+        os.makedirs(directory, exist_ok=True)
+        with self._conn() as db:
+            db.executescript(_SCHEMA)
+
+        # columnar in-memory copy, indexed by position (load order)
+        self._seq      = 0
+        self._n        = 0
+        self._ids      = array("q")
+        self._scores   = array("h")
+        self._alive    = bytearray()
+        self._has_vec  = bytearray()
+        self._pos_of:  Dict[int, int] = {}
+        self._postings: Dict[str, array] = {}
+        self._vecs     = None        # (capacity, dim) float32
+        self._ivf: Optional[_IVF] = None
+        self._stats    = {"searches": 0, "exact": 0, "ann": 0, "ann_widened": 0, "added": 0}
+
+    @classmethod
+    def from_env(cls) -> "CandidateIndex":
+        return cls(
+            directory=os.getenv("CANDIDATE_INDEX_DIR", "./candidate_index"),
+            ann_min=int(os.getenv("CANDIDATE_ANN_MIN", "20000")),
+            ann_lists=int(os.getenv("CANDIDATE_ANN_LISTS", "0")),
+            ann_probe=int(os.getenv("CANDIDATE_ANN_PROBE", "16")),
+            exact_max=int(os.getenv("CANDIDATE_EXACT_MAX", "8192")),
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        """Per-thread connection (re-opened after fork)."""
+        held = getattr(self._local, "conn", None)
+        if held is not None and held[0] == os.getpid():
+            return held[1]
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        self._local.conn = (os.getpid(), conn)
+        return conn
+
+    # ── writes ────────────────────────────────────────────────────────────────
+    def add(self, key: str, filename: Optional[str], score: int, breakdown: Optional[Dict],
+            skills: Iterable[str], vector=None):
+        """Record (or update, for the same content hash) one candidate.
+        `vector=None` keeps a vector stored by an earlier analysis."""
+        self.add_many([(key, filename, score, breakdown, skills, vector)])
+
+    def add_many(self, rows: Sequence[tuple]):
+        """Bulk add: (key, filename, score, breakdown, skills, vector) tuples,
+        one transaction."""
+        import numpy as np
+        now  = time.time()
+        data = [(key, now, filename, int(score), json.dumps(breakdown) if breakdown else None,
+                 json.dumps(sorted(set(skills))),
+                 np.asarray(vector, dtype=np.float32).tobytes() if vector is not None else None)
+                for key, filename, score, breakdown, skills, vector in rows]
+        db = self._conn()
+        with db:
+            db.execute("BEGIN IMMEDIATE")
+            seq = db.execute("SELECT COALESCE(MAX(seq), 0) FROM candidates").fetchone()[0]
+            cur = db.executemany(
+                "INSERT INTO candidates (key, seq, added, filename, score, breakdown, skills, vector) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET seq=excluded.seq, added=excluded.added, "
+                "filename=excluded.filename, score=excluded.score, breakdown=excluded.breakdown, "
+                "skills=excluded.skills, vector=COALESCE(excluded.vector, candidates.vector), "
+                "deleted=0 "
+                # unchanged rows keep their seq, so refresh() has nothing to re-append
+                "WHERE candidates.deleted OR candidates.filename IS NOT excluded.filename "
+                "OR candidates.score IS NOT excluded.score "
+                "OR candidates.breakdown IS NOT excluded.breakdown "
+                "OR candidates.skills IS NOT excluded.skills "
+                "OR (excluded.vector IS NOT NULL AND candidates.vector IS NOT excluded.vector)",
+                [(row[0], seq + n + 1) + row[1:] for n, row in enumerate(data)],
+            )
+        with self._lock:
+            self._stats["added"] += max(0, cur.rowcount)
+
+    def forget(self, candidate_id: int) -> bool:
+        """Remove a candidate's data (kept as a tombstone so other workers
+        drop it on their next refresh)."""
+        db = self._conn()
+        with db:
+            db.execute("BEGIN IMMEDIATE")
+            seq = db.execute("SELECT COALESCE(MAX(seq), 0) FROM candidates").fetchone()[0]
+            cur = db.execute(
+                "UPDATE candidates SET deleted=1, seq=?, filename=NULL, breakdown=NULL, "
+                "skills='[]', vector=NULL WHERE id=? AND deleted=0", (seq + 1, candidate_id))
+        return cur.rowcount > 0
+
+    # ── loading ───────────────────────────────────────────────────────────────
+    def refresh(self):
+        """Pull rows written (by any process) since the last refresh."""
+        with self._lock:
+            cur = self._conn().execute(
+                "SELECT id, seq, score, skills, vector, deleted FROM candidates "
+                "WHERE seq > ? ORDER BY seq", (self._seq,))
+            while True:
+                batch = cur.fetchmany(4096)
+                if not batch:
+                    break
+                self._append(batch)
+            dead = self._n - len(self._pos_of)
+            if dead >= self.compact_min and dead > self._n * self.compact_ratio:
+                self._compact()
+            self._maybe_build_ivf()
+
+    def _append(self, batch):
+        import numpy as np
+        first = self._n
+        for cid, seq, score, skills, blob, deleted in batch:
+            self._seq = seq
+            old = self._pos_of.pop(cid, None)
+            if old is not None:
+                self._alive[old] = 0
+            if deleted:
+                continue
+            pos = self._n
+            self._n += 1
+            self._pos_of[cid] = pos
+            self._ids.append(cid)
+            self._scores.append(max(-32768, min(32767, score)))
+            self._alive.append(1)
+            for term in json.loads(skills):
+                self._postings.setdefault(term, array("I")).append(pos)
+            vec = np.frombuffer(blob, dtype=np.float32) if blob else None
+            if vec is not None and self._vecs is not None and vec.shape[0] != self._vecs.shape[1]:
+                logger.warning(f"CandidateIndex: candidate {cid} vector has dim {vec.shape[0]}, "
+                               f"index uses {self._vecs.shape[1]} — vector ignored")
+                vec = None
+            if vec is not None:
+                self._ensure_capacity(pos + 1, vec.shape[0])
+                self._vecs[pos] = vec
+            self._has_vec.append(1 if vec is not None else 0)
+        if self._ivf is not None and self._n > first:
+            new = np.arange(first, self._n, dtype=np.int64)
+            self._ivf.add(self._vecs, new[self._mask(self._has_vec)[first:self._n]])
+
+    def _compact(self):
+        """Drop dead positions; survivors keep their relative order, so
+        postings and IVF lists stay sorted after remapping."""
+        import numpy as np
+        t0   = time.perf_counter()
+        keep = np.flatnonzero(self._mask(self._alive))
+        new_of = np.full(self._n, -1, dtype=np.int64)
+        new_of[keep] = np.arange(len(keep))
+
+        def remap(positions: array) -> array:
+            moved = new_of[np.frombuffer(positions, dtype=np.uint32)]
+            out = array("I")
+            out.frombytes(moved[moved >= 0].astype(np.uint32).tobytes())
+            return out
+
+        dead = self._n - len(keep)
+        idx  = keep.tolist()
+        self._ids     = array("q", (self._ids[p] for p in idx))
+        self._scores  = array("h", (self._scores[p] for p in idx))
+        self._has_vec = bytearray(self._has_vec[p] for p in idx)
+        self._alive   = bytearray(b"\x01") * len(idx)
+        self._pos_of  = {cid: int(new_of[pos]) for cid, pos in self._pos_of.items()}
+        self._postings = {t: p for t, p in ((t, remap(p)) for t, p in self._postings.items()) if len(p)}
+        if self._vecs is not None:
+            vecs = np.zeros((max(1024, len(idx)), self._vecs.shape[1]), dtype=np.float32)
+            vecs[: len(idx)] = self._vecs[keep]
+            self._vecs = vecs
+        if self._ivf is not None:
+            self._ivf.lists = [remap(lst) for lst in self._ivf.lists]
+        self._n = len(idx)
+        logger.info(f"CandidateIndex: compacted {dead} dead positions, {self._n} left "
+                    f"in {time.perf_counter() - t0:.2f}s")
+
+    def _ensure_capacity(self, needed: int, dim: int):
+        import numpy as np
+        if self._vecs is None:
+            self._vecs = np.zeros((max(1024, needed), dim), dtype=np.float32)
+        elif needed > self._vecs.shape[0]:
+            grown = np.zeros((max(needed, self._vecs.shape[0] * 2), dim), dtype=np.float32)
+            grown[: self._vecs.shape[0]] = self._vecs
+            self._vecs = grown
+
+    @staticmethod
+    def _mask(buf: bytearray):
+        import numpy as np
+        return np.frombuffer(bytes(buf), dtype=np.uint8).astype(bool)
+
+    def _maybe_build_ivf(self):
+        import numpy as np
+        with_vec = self._mask(self._has_vec) & self._mask(self._alive)
+        n_vec = int(with_vec.sum())
+        if n_vec < self.ann_min:
+            self._ivf = None
+            return
+        if self._ivf is not None and n_vec < 2 * self._ivf.built_for:
+            return
+        t0 = time.perf_counter()
+        n_lists = self.ann_lists or max(16, int(n_vec ** 0.5))
+        self._ivf = _IVF.build(self._vecs, np.flatnonzero(with_vec), n_lists)
+        logger.info(f"CandidateIndex: built IVF ({n_lists} lists) over {n_vec} vectors "
+                    f"in {time.perf_counter() - t0:.2f}s")
+
+    # ── search ────────────────────────────────────────────────────────────────
+    def search(
+        self,
+        skills_all: Sequence[str] = (),
+        skills_any: Sequence[str] = (),
+        min_score: Optional[int] = None,
+        qvec=None,
+        k: int = 20,
+        nprobe: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """Top-k candidates having every skill in `skills_all`, at least one
+        of `skills_any` and score ≥ `min_score`; ranked by cosine similarity
+        to `qvec` when given, else by score. Skill terms must already be
+        canonical (see ResumeAnalyzer.search_candidates)."""
+        import numpy as np
+        self.refresh()
+        t0 = time.perf_counter()
+        with self._lock:
+            self._stats["searches"] += 1
+            alive = self._mask(self._alive)
+            rows  = self._filter_rows(skills_all, skills_any)
+            if rows is None:
+                rows = np.flatnonzero(alive)
+            else:
+                rows = rows[alive[rows]]
+            if min_score is not None and len(rows):
+                scores = np.frombuffer(self._scores, dtype=np.int16)
+                rows   = rows[scores[rows] >= min_score]
+            matched = len(rows)
+
+            if qvec is None:
+                scores = np.frombuffer(self._scores, dtype=np.int16)[rows]
+                top    = rows[np.argsort(-scores, kind="stable")[:k]]
+                sims   = None
+                method = "score"
+            else:
+                qvec = np.asarray(qvec, dtype=np.float32)
+                top, sims, method = self._semantic(rows, qvec, k, nprobe, alive)
+            ids = [self._ids[p] for p in top.tolist()]
+        hits = self._details(ids)
+        for n, hit in enumerate(hits):
+            if sims is not None:
+                hit["similarity"] = round(float(sims[n]), 4)
+        return {"candidates": hits, "matched": matched, "method": method,
+                "took_ms": round((time.perf_counter() - t0) * 1000, 3)}
+
+    def _filter_rows(self, skills_all: Sequence[str], skills_any: Sequence[str]):
+        """Sorted row positions passing the skill filters (None = no filter)."""
+        import numpy as np
+        empty = np.empty(0, dtype=np.int64)
+        rows = None
+        if skills_all:
+            posts = [self._postings.get(t) for t in set(skills_all)]
+            if any(p is None for p in posts):
+                return empty
+            posts.sort(key=len)
+            rows = np.frombuffer(posts[0], dtype=np.uint32).astype(np.int64)
+            for p in posts[1:]:
+                rows = np.intersect1d(rows, np.frombuffer(p, dtype=np.uint32), assume_unique=True)
+                if not len(rows):
+                    return empty
+        if skills_any:
+            parts = [np.frombuffer(self._postings[t], dtype=np.uint32)
+                     for t in set(skills_any) if t in self._postings]
+            either = np.unique(np.concatenate(parts)).astype(np.int64) if parts else empty
+            rows = either if rows is None else np.intersect1d(rows, either, assume_unique=True)
+        return rows
+
+    def _semantic(self, rows, qvec, k: int, nprobe: Optional[int], alive):
+        import numpy as np
+        has_vec = self._mask(self._has_vec)
+        filtered = len(rows) < int(alive.sum())
+        if self._ivf is None or len(rows) <= self.exact_max:
+            rows = rows[has_vec[rows]]
+            self._stats["exact"] += 1
+            return (*self._top(rows, self._vecs[rows] @ qvec if len(rows) else np.empty(0), k), "exact")
+
+        self._stats["ann"] += 1
+        allowed = None
+        if filtered:
+            allowed = np.zeros(self._n, dtype=bool)
+            allowed[rows] = True
+        else:
+            allowed = alive
+        probe = nprobe or self.ann_probe
+        n_lists = len(self._ivf.lists)
+        while True:
+            cand = self._ivf.probe(qvec, probe).astype(np.int64)
+            cand = cand[allowed[cand]]
+            if len(cand) >= k or probe >= n_lists:
+                break
+            probe = min(n_lists, probe * 2)
+            self._stats["ann_widened"] += 1
+        return (*self._top(cand, self._vecs[cand] @ qvec, k), "ann")
+
+    @staticmethod
+    def _top(rows, sims, k: int):
+        import numpy as np
+        if len(rows) > k:
+            part = np.argpartition(-sims, k)[:k]
+            rows, sims = rows[part], sims[part]
+        order = np.argsort(-sims, kind="stable")
+        return rows[order], sims[order]
+
+    def _details(self, ids: List[int]) -> List[Dict[str, Any]]:
+        if not ids:
+            return []
+        marks = ",".join("?" * len(ids))
+        got = {r[0]: r for r in self._conn().execute(
+            f"SELECT id, filename, added, score, breakdown, skills FROM candidates WHERE id IN ({marks})",
+            ids)}
+        out = []
+        for cid in ids:
+            r = got.get(cid)
+            if r is None:
+                continue
+            out.append({"id": cid, "filename": r[1], "added": r[2], "score": r[3],
+                        "score_breakdown": json.loads(r[4]) if r[4] else None,
+                        "skills": json.loads(r[5])})
+        return out
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            alive = sum(self._alive)
+            return dict(self._stats, candidates=alive,
+                        with_vectors=sum(a and v for a, v in zip(self._alive, self._has_vec)),
+                        skills=len(self._postings),
+                        ivf_lists=len(self._ivf.lists) if self._ivf is not None else 0)
+
+
+def candidate_index_enabled() -> bool:
+    return os.getenv("CANDIDATE_INDEX", "0").strip().lower() in ("1", "true", "yes", "on")
+
+
+_index: Optional[CandidateIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_candidate_index() -> Optional[CandidateIndex]:
+    """Process-wide index, or None unless CANDIDATE_INDEX is on."""
+    global _index
+    if not candidate_index_enabled():
+        return None
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = CandidateIndex.from_env()
+    return _index
@@ -0,0 +1,251 @@
+# context_packer.py
+# Token-budgeted prompt context for the direct LLM calls
+#
+# The prompts used to send blind prefixes (text[:1500], resume[:800] +
+# jd[:800], resume[:2000] + jd[:1500]), which spend the budget on the header
+# and contact block and cut off the experience the model should talk about.
+# Instead the text is split into small chunks along resume sections
+# (resume_segmenter), each chunk is ranked with the same primitives the RAG
+# hybrid search uses (retrieval.BM25Index against a query such as the JD,
+# fused via reciprocal_rank_fusion with a per-prompt section preference),
+# and chunks are taken best-first until the token budget is spent. Selected
+# chunks are emitted in document order.
+#
+# Tokens are counted with the serving model's tokenizer (`tokenizers`,
+# LLM_TOKENIZER = hub id or path to tokenizer.json). The default model's
+# tokenizer is only fetched from the hub by warm_up() (or when LLM_TOKENIZER
+# names it); requests use a local copy if there is one and otherwise a
+# BPE-like estimate, reported as "approx".
+
+import os
+import re
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+from retrieval import BM25Index, reciprocal_rank_fusion
+from resume_segmenter import ResumeStructure, segment_resume
+
+logger = logging.getLogger(__name__)
+
+# Per prompt type: token budgets and the section kinds worth spending them on,
+# best first. Budgets roughly match the old character caps (≈4 chars/token).
+PROFILES: Dict[str, Dict] = {
+    "feedback":     {"resume": 380, "prefer": ("summary", "experience", "projects", "internship",
+                                               "skills", "achievements", "education")},
+    "job_match":    {"resume": 200, "jd": 200, "prefer": ("experience", "skills", "projects",
+                                                          "internship", "summary")},
+    "cover_letter": {"resume": 500, "jd": 380, "prefer": ("summary", "experience", "projects",
+                                                          "skills", "achievements", "internship"),
+                     "lead_line": True},
+}
+
+CHUNK_TOKENS = 60
+# rough BPE shape: short letter runs, digit groups, single symbols
+_APPROX_RE = re.compile(r"[A-Za-z]{1,5}|\d{1,3}|[^\sA-Za-z\d]")
+
+
+# ─── Token counting ───────────────────────────────────────────────────────────
+class TokenCounter:
+
+    DEFAULT = "mistralai/Mistral-7B-Instruct-v0.2"
+
+    def __init__(self, name: Optional[str] = None, download: Optional[bool] = None):
+        """`download`: whether a hub id may be fetched over the network.
+        Defaults to True only when the tokenizer was named explicitly (the
+        argument or LLM_TOKENIZER); the default model's tokenizer is then
+        only read from the local hub cache."""
+        self._tok = None
+        self.name = "approx"
+        named  = name or os.getenv("LLM_TOKENIZER")
+        source = named or self.DEFAULT
+        self.download = bool(named) if download is None else download
+        try:
+            from tokenizers import Tokenizer
+            path = source if os.path.isfile(source) else _cached_tokenizer(source)
+            if path:
+                self._tok = Tokenizer.from_file(path)
+            elif self.download:
+                token = os.getenv("HUGGINGFACE_API_TOKEN") or None
+                try:
+                    self._tok = Tokenizer.from_pretrained(source, token=token)
+                except TypeError:       # tokenizers < 0.14 named it auth_token
+                    self._tok = Tokenizer.from_pretrained(source, auth_token=token)
+            else:
+                logger.info(f"TokenCounter: {source} not cached locally, estimating "
+                            "(warm_up() or LLM_TOKENIZER fetches it)")
+                return
+            self.name = source
+            logger.info(f"TokenCounter: using {source}")
+        except Exception as e:
+            logger.warning(f"TokenCounter: tokenizer {source} unavailable, estimating — {e}")
+
+    @property
+    def exact(self) -> bool:
+        return self._tok is not None
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        if self._tok is not None:
+            return len(self._tok.encode(text, add_special_tokens=False).ids)
+        return len(_APPROX_RE.findall(text))
+
+
+def _cached_tokenizer(repo_id: str) -> Optional[str]:
+    """tokenizer.json for a hub id from the local hub cache, without network."""
+    try:
+        from huggingface_hub import try_to_load_from_cache
+        path = try_to_load_from_cache(repo_id, "tokenizer.json")
+    except Exception:
+        return None
+    return path if isinstance(path, str) else None
+
+
+_counter: Optional[TokenCounter] = None
+_counter_lock = threading.Lock()
+
+
+def get_token_counter(download: bool = False) -> TokenCounter:
+    """Process-wide counter. warm_up() passes download=True so the default
+    tokenizer is fetched there rather than inside a request."""
+    global _counter
+    if _counter is None or (download and not _counter.exact and not _counter.download):
+        with _counter_lock:
+            if _counter is None or (download and not _counter.exact and not _counter.download):
+                _counter = TokenCounter(download=True if download else None)
+    return _counter
+
+
+def count_tokens(text: str) -> int:
+    return get_token_counter().count(text)
+
+
+# ─── Chunking ─────────────────────────────────────────────────────────────────
+@dataclass
+class Chunk:
+    __slots__ = ("kind", "text", "pos", "tokens")
+    kind:   str
+    text:   str
+    pos:    int      # document order
+    tokens: int
+
+
+def chunk_text(text: str, structure: Optional[ResumeStructure] = None,
+               max_tokens: int = CHUNK_TOKENS) -> List[Chunk]:
+    """Split along sections, then into runs of lines of ≤ max_tokens each
+    (over-long lines are split on words)."""
+    counter = get_token_counter()
+    structure = structure or segment_resume(text)
+    chunks: List[Chunk] = []
+
+    def emit(kind: str, parts: List[str], tokens: int):
+        if parts:
+            chunks.append(Chunk(kind, "\n".join(parts), len(chunks), tokens))
+
+    for section in structure.sections:
+        buf: List[str] = []
+        used = 0
+        for line in section.text.split("\n"):
+            line = line.strip()
+            if not line:
+                continue
+            n = counter.count(line)
+            pieces = [(line, n)] if n <= max_tokens else _split_words(line, max_tokens, counter)
+            for piece, pn in pieces:
+                if buf and used + pn > max_tokens:
+                    emit(section.kind, buf, used)
+                    buf, used = [], 0
+                buf.append(piece)
+                used += pn
+        emit(section.kind, buf, used)
+    return chunks
+
+
+def _split_words(line: str, max_tokens: int, counter: TokenCounter):
+    out, cur = [], []
+    for word in line.split():
+        if cur and counter.count(" ".join(cur + [word])) > max_tokens:
+            out.append(" ".join(cur))
+            cur = []
+        cur.append(word)
+    if cur:
+        out.append(" ".join(cur))
+    return [(p, counter.count(p)) for p in out]
+
+
+# ─── Packing ──────────────────────────────────────────────────────────────────
+@dataclass
+class PackedContext:
+    __slots__ = ("text", "tokens", "chunks_used", "chunks_total")
+    text:         str
+    tokens:       int
+    chunks_used:  int
+    chunks_total: int
+
+
+def pack(
+    text: str,
+    budget: int,
+    query: Optional[str] = None,
+    prefer: Sequence[str] = (),
+    structure: Optional[ResumeStructure] = None,
+    lead_line: bool = False,
+) -> PackedContext:
+    """Best chunks of `text` that fit in `budget` tokens, in document order.
+
+    Ranking fuses (a) section preference order and (b) BM25 relevance to
+    `query`, weighted 2:1 towards the query when one is given. With
+    `lead_line`, the first header line (usually the candidate's name) is kept.
+    """
+    chunks = chunk_text(text, structure)
+    if not chunks:
+        return PackedContext("", 0, 0, 0)
+
+    rank_of = {kind: r for r, kind in enumerate(prefer)}
+    prior = sorted(range(len(chunks)), key=lambda i: (rank_of.get(chunks[i].kind, len(prefer)), i))
+    rankings, weights = [prior], [1.0]
+    if query and query.strip():
+        hits = BM25Index([c.text for c in chunks]).search(query, k=len(chunks))
+        rankings.append([i for i, _ in hits])
+        weights.append(2.0)
+    order = [i for i, _ in reciprocal_rank_fusion(rankings, weights=weights)]
+
+    chosen, used, lead = set(), 0, ""
+    if lead_line and chunks[0].kind == "header":
+        lead = chunks[0].text.split("\n", 1)[0]
+        used = get_token_counter().count(lead)
+    for i in order:
+        if used + chunks[i].tokens <= budget:
+            chosen.add(i)
+            used += chunks[i].tokens
+    if lead and 0 in chosen:          # the header chunk already starts with it
+        used -= get_token_counter().count(lead)
+        lead = ""
+    parts, prev = ([lead] if lead else []), None
+    for i in sorted(chosen):
+        if prev is not None and i != prev + 1:
+            parts.append("…")
+        parts.append(chunks[i].text)
+        prev = i
+    body = "\n".join(parts)
+    return PackedContext(body, used, len(chosen), len(chunks))
+
+
+def pack_for(
+    prompt: str,
+    resume_text: str,
+    jd_text: Optional[str] = None,
+    structure: Optional[ResumeStructure] = None,
+    jd_query: Optional[str] = None,
+) -> Dict[str, PackedContext]:
+    """Resume (and JD) context for one of PROFILES. The resume is ranked
+    against the JD; the JD against `jd_query` (e.g. its skill terms)."""
+    profile = PROFILES[prompt]
+    out = {"resume": pack(resume_text, profile["resume"], query=jd_text,
+                          prefer=profile["prefer"], structure=structure,
+                          lead_line=profile.get("lead_line", False))}
+    if jd_text and "jd" in profile:
+        out["jd"] = pack(jd_text, profile["jd"], query=jd_query)
+    return out
@@ -0,0 +1,334 @@
+# cpu_pool.py
+# Process pool for the GIL-bound stages of an analysis
+#
+# Document parsing, segmentation, the skill regexes and the scorer are pure
+# Python; in a threaded gunicorn worker they serialise every request on the
+# GIL. With CPU_POOL_WORKERS > 0 these stages (ResumeAnalyzer.cpu_features)
+# run in a separate process pool that receives the raw upload bytes and
+# returns the compact result (text, sections, skills, score, breakdown).
+# LLM / RAG work stays on the request thread — it is I/O bound.
+#
+# The per-section skill scans are memoized (incremental.py). The request's
+# memo stays in the parent, so its reusable "skills" entries are sent with
+# the task, the worker runs against a copy, and the entries it used plus
+# its reused/recomputed counts are merged back.
+#
+#   CPU_POOL_WORKERS    processes per app worker (0 = run in the request thread)
+#   CPU_POOL_MAX_TASKS  recycle worker processes after this many tasks each
+#                       (contains PyPDF2's per-process memory growth)
+#   CPU_POOL_TIMEOUT    seconds before a task is abandoned; only the process
+#                       running it is killed and replaced, other requests'
+#                       tasks keep running
+#   CPU_POOL_MAX_CRASHES consecutive worker crashes after which the pool is
+#                       disabled and every task runs in the request thread
+#
+# Each worker process has its own pipe and serves one task at a time, so the
+# parent always knows which process runs which task (a ProcessPoolExecutor
+# can only be torn down as a whole). If a worker crashes, it is replaced and
+# the task is run in-thread once so the request still succeeds. Processes
+# are started outside the pool lock; a slot is reserved first.
+
+import os
+import time
+import queue
+import atexit
+import logging
+import threading
+import multiprocessing
+from typing import Any, Dict, List, Optional
+
+from metrics import StageRecorder, active_recorder
+from incremental import AnalysisMemo, active_memo
+
+logger = logging.getLogger(__name__)
+
+_worker_analyzer = None
+# memo kinds computed inside cpu_features()
+MEMO_KINDS = ("skills",)
+
+
+def _init_worker():
+    global _worker_analyzer
+    from resume_analyzer import ResumeAnalyzer
+    _worker_analyzer = ResumeAnalyzer()
+    for name in ("PyPDF2", "docx"):
+        try:
+            __import__(name)
+        except ImportError:
+            pass
+
+
+def _worker_main(conn):
+    _init_worker()
+    while True:
+        try:
+            task = conn.recv()
+        except (EOFError, OSError):
+            break
+        if task is None:            # retired by the parent
+            break
+        try:
+            reply = ("ok", _run_features(*task))
+        except Exception as e:
+            reply = ("error", f"{type(e).__name__}: {e}")
+        try:
+            conn.send(reply)
+        except (EOFError, OSError):
+            break
+    conn.close()
+
+
+def _run_features(data: bytes, text: Optional[str],
+                  known: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Any]:
+    memo = None
+    if known is not None:
+        seed = AnalysisMemo()
+        seed._entries.update(known)
+        memo = AnalysisMemo(seed)
+    with StageRecorder() as rec:
+        if memo is None:
+            out = _worker_analyzer.cpu_features(data, text)
+        else:
+            with memo.activate():
+                out = _worker_analyzer.cpu_features(data, text)
+    out["timings"] = rec.timings
+    if memo is not None:
+        out["memo"] = ({k: memo._entries.get(k, {}) for k in MEMO_KINDS},
+                       memo.reused, memo.recomputed)
+    return out
+
+
+class _Worker:
+    """One pool process and the parent's end of its pipe."""
+
+    def __init__(self, ctx):
+        self.conn, child = ctx.Pipe()
+        self.proc  = ctx.Process(target=_worker_main, args=(child,), daemon=True)
+        self.proc.start()
+        child.close()
+        self.tasks = 0
+
+    def retire(self, wait: float = 5.0):
+        """Ask the process to exit after its current task; kill it if it won't."""
+        try:
+            self.conn.send(None)
+        except (EOFError, OSError):
+            pass
+        self.proc.join(wait)
+        self.kill()
+
+    def kill(self):
+        if self.proc.is_alive():
+            self.proc.kill()
+            self.proc.join()
+        self.conn.close()
+
+
+class _WorkerCrashed(Exception):
+    pass
+
+
+class CPUPool:
+
+    # how long a waiting _acquire() sleeps before re-reading the idle queue
+    # (shutdown() swaps it for a new one)
+    _POLL_S = 0.5
+
+    def __init__(self, workers: int = 0, max_tasks: int = 50, timeout: float = 30.0,
+                 max_crashes: int = 3):
+        self.workers     = workers
+        self.max_tasks   = max_tasks
+        self.timeout     = timeout
+        self.max_crashes = max_crashes
+        self._lock     = threading.Lock()
+        self._ctx      = None
+        self._idle: "queue.LifoQueue[_Worker]" = queue.LifoQueue()
+        self._live: List[_Worker] = []
+        self._starting = 0          # slots reserved for processes being started
+        self._crashes  = 0          # consecutive worker crashes
+        self._disabled = False
+        self._stats    = {"tasks": 0, "in_thread": 0, "timeouts": 0, "restarts": 0,
+                          "recycles": 0, "fallbacks": 0}
+
+    @classmethod
+    def from_env(cls) -> "CPUPool":
+        return cls(
+            workers=int(os.getenv("CPU_POOL_WORKERS", "0")),
+            max_tasks=int(os.getenv("CPU_POOL_MAX_TASKS", "50")),
+            timeout=float(os.getenv("CPU_POOL_TIMEOUT", "30")),
+            max_crashes=int(os.getenv("CPU_POOL_MAX_CRASHES", "3")),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.workers > 0 and not self._disabled
+
+    # ── public API ────────────────────────────────────────────────────────────
+    def features(self, analyzer, data: bytes, text: Optional[str] = None) -> Dict[str, Any]:
+        """analyzer.cpu_features(data, text), in the pool when enabled."""
+        if not self.enabled:
+            with self._lock:
+                self._stats["in_thread"] += 1
+            return analyzer.cpu_features(data, text)
+
+        t0    = time.perf_counter()
+        memo  = active_memo()
+        known = {k: memo.known(k) for k in MEMO_KINDS} if memo is not None else None
+        worker = self._acquire()
+        if worker is None:              # disabled while this task waited
+            with self._lock:
+                self._stats["in_thread"] += 1
+            return analyzer.cpu_features(data, text)
+        try:
+            # with the text already extracted, don't ship the upload
+            worker.conn.send((b"" if text is not None else data, text, known))
+            timeout = self.timeout
+            if not worker.conn.poll(timeout):
+                with self._lock:
+                    self._stats["timeouts"] += 1
+                logger.error(f"CPUPool: task exceeded {timeout:.0f}s — "
+                             f"killing worker {worker.proc.pid}")
+                self._replace(worker)
+                worker = None
+                return {"error": "Processing the file took too long."}
+            status, out = worker.conn.recv()
+        except (EOFError, OSError) as e:
+            logger.error(f"CPUPool: worker {worker.proc.pid} died ({e!r}) — replacing, running in-thread")
+            with self._lock:
+                self._stats["fallbacks"] += 1
+                self._crashes += 1
+                broken = self._crashes >= self.max_crashes
+            if broken:
+                self._disable(worker)
+            else:
+                self._replace(worker)
+            worker = None
+            return analyzer.cpu_features(data, text)
+        finally:
+            if worker is not None:
+                self._release(worker)
+        if status != "ok":
+            raise RuntimeError(f"cpu_pool task failed: {out}")
+
+        with self._lock:
+            self._stats["tasks"] += 1
+            self._crashes = 0
+        if memo is not None:
+            if "memo" in out:
+                memo.merge(*out.pop("memo"))
+            else:
+                for kind in MEMO_KINDS:
+                    memo.untrack(kind)
+        # worker-side stage timings, plus queueing / pickling overhead
+        timings = out.pop("timings", {})
+        rec = active_recorder()
+        if rec is not None:
+            for name, secs in timings.items():
+                rec.add(name, secs)
+            rec.add("cpu_pool_overhead", max(0.0, time.perf_counter() - t0 - sum(timings.values())))
+        return out
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._stats, workers=self.workers, max_tasks=self.max_tasks,
+                        live=len(self._live), disabled=self._disabled)
+
+    def shutdown(self):
+        """Stop every worker process; later calls to features() restart them."""
+        with self._lock:
+            workers, self._live = self._live, []
+            self._idle = queue.LifoQueue()
+        for w in workers:
+            w.retire()
+
+    # ── internals ─────────────────────────────────────────────────────────────
+    def _acquire(self) -> Optional[_Worker]:
+        """An idle worker, starting one while fewer than `workers` are live;
+        None once the pool has been disabled."""
+        while not self._disabled:
+            idle = self._idle
+            try:
+                return idle.get_nowait()
+            except queue.Empty:
+                pass
+            if self._reserve():
+                return self._start()
+            try:
+                return idle.get(timeout=self._POLL_S)
+            except queue.Empty:
+                continue
+        return None
+
+    def _reserve(self) -> bool:
+        with self._lock:
+            if len(self._live) + self._starting >= self.workers:
+                return False
+            self._starting += 1
+            return True
+
+    def _start(self) -> _Worker:
+        """Start a process for a reserved slot (_starting); runs outside the
+        lock, since process startup is slow."""
+        try:
+            worker = self._spawn()
+        finally:
+            with self._lock:
+                self._starting -= 1
+        with self._lock:
+            self._live.append(worker)
+        return worker
+
+    def _spawn(self) -> _Worker:
+        with self._lock:
+            if self._ctx is None:
+                # forkserver: workers don't inherit the app's threads or locks
+                self._ctx = multiprocessing.get_context(
+                    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+                )
+                atexit.register(self.shutdown)
+                logger.info(f"CPUPool: up to {self.workers} worker(s), "
+                            f"recycled every {self.max_tasks} tasks each")
+            ctx = self._ctx
+        return _Worker(ctx)
+
+    def _release(self, worker: _Worker):
+        """Back to the idle queue, or recycled after max_tasks tasks
+        (contains per-process memory growth, e.g. PyPDF2)."""
+        worker.tasks += 1
+        if worker.tasks >= self.max_tasks:
+            with self._lock:
+                self._stats["recycles"] += 1
+            self._replace(worker, kill=False)
+            return
+        with self._lock:
+            retired = worker not in self._live      # shut down meanwhile
+        if not retired:
+            self._idle.put(worker)
+
+    def _replace(self, worker: _Worker, kill: bool = True):
+        """Retire one worker and start its replacement; the other workers
+        and their tasks are untouched."""
+        if kill:
+            worker.kill()
+            with self._lock:
+                self._stats["restarts"] += 1
+        else:
+            threading.Thread(target=worker.retire, daemon=True).start()
+        with self._lock:
+            if worker not in self._live:
+                return                  # pool was shut down meanwhile
+            self._live.remove(worker)
+            self._starting += 1         # keep the slot while the new one starts
+        self._idle.put(self._start())
+
+    def _disable(self, worker: _Worker):
+        """Too many crashes in a row: stop using processes for good."""
+        worker.kill()
+        with self._lock:
+            self._disabled = True
+            self._stats["restarts"] += 1
+            if worker in self._live:
+                self._live.remove(worker)
+        logger.error(f"CPUPool: {self._crashes} consecutive worker crashes — "
+                     f"pool disabled, running every task in-thread")
+        threading.Thread(target=self.shutdown, daemon=True).start()
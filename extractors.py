@@ -0,0 +1,394 @@
+# extractors.py
+# Upload text extraction: format sniffed from content, pluggable parsers
+#
+# The format comes from the file's leading bytes, not its extension. A ".doc"
+# may be a legacy Word binary, RTF, HTML saved by Word or a renamed DOCX.
+# Parsers are local and pure Python:
+#   pdf   : PyPDF2
+#   docx  : python-docx
+#   odt   : zipfile + content.xml
+#   rtf   : control-word stripper (below)
+#   html  : html.parser
+#   txt   : UTF-8 / UTF-16 (BOM), cp1252 fallback
+# Legacy Word binaries (OLE2) have no pure-Python parser and are rejected
+# with a message asking for DOCX or PDF, instead of failing inside
+# python-docx.
+#
+# ExtractorRegistry.register() adds a format; the first registered sniffer
+# that matches wins. Per-format extraction latency is kept for /health and
+# /metrics.
+
+import io
+import re
+import time
+import codecs
+import hashlib
+import logging
+import zipfile
+import threading
+from collections import deque
+from dataclasses import dataclass
+from html.parser import HTMLParser
+from typing import Callable, Dict, List, Optional
+from xml.etree import ElementTree
+
+from metrics import summarize
+
+logger = logging.getLogger(__name__)
+
+SNIFF_BYTES = 4096
+# uncompressed size limits for DOCX / ODT archives: per XML part, and for
+# the whole archive (python-docx loads every part, media included)
+MAX_XML_BYTES     = 32 * 1024 * 1024
+MAX_ARCHIVE_BYTES = 128 * 1024 * 1024
+
+
+class UnsupportedFormat(ValueError):
+    """The upload's format is unknown or has no parser; the message is for the user."""
+
+
+def file_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+@dataclass
+class Extractor:
+    name:        str
+    sniff:       Callable[[bytes], bool]          # gets the whole upload
+    extract:     Optional[Callable[[bytes], str]]
+    unsupported: Optional[str] = None             # message when extract is None
+
+
+@dataclass
+class Extraction:
+    __slots__ = ("format", "text", "seconds")
+    format:  str
+    text:    str
+    seconds: float
+
+
+class ExtractorRegistry:
+
+    def __init__(self, window: int = 1024):
+        self._extractors: List[Extractor] = []
+        self._lock    = threading.Lock()
+        self._window  = window
+        self._latency: Dict[str, deque] = {}
+        self._counts:  Dict[str, int]   = {}
+
+    def register(self, name: str, sniff: Callable[[bytes], bool],
+                 extract: Optional[Callable[[bytes], str]] = None,
+                 unsupported: Optional[str] = None):
+        self._extractors.append(Extractor(name, sniff, extract, unsupported))
+
+    @property
+    def formats(self) -> List[str]:
+        return [e.name for e in self._extractors if e.extract is not None]
+
+    def detect(self, data: bytes) -> Optional[Extractor]:
+        for ex in self._extractors:
+            try:
+                if ex.sniff(data):
+                    return ex
+            except Exception:           # e.g. a truncated zip: not this format
+                continue
+        return None
+
+    def check(self, data: bytes) -> str:
+        """Format name of `data`; raises UnsupportedFormat before any parsing."""
+        ex = self.detect(data)
+        if ex is None:
+            raise UnsupportedFormat("Unrecognised file format. Please upload a PDF, DOCX, ODT, RTF, HTML or TXT file.")
+        if ex.extract is None:
+            raise UnsupportedFormat(ex.unsupported or f"{ex.name} files are not supported.")
+        return ex.name
+
+    def extract(self, data: bytes) -> Extraction:
+        """Text of `data` ("" if the parser failed); raises UnsupportedFormat."""
+        fmt = self.check(data)
+        ex  = next(e for e in self._extractors if e.name == fmt)
+        t0  = time.perf_counter()
+        try:
+            text = ex.extract(data) or ""
+        except UnsupportedFormat:
+            raise
+        except Exception as e:
+            logger.error(f"{fmt.upper()} extraction error: {e}")
+            text = ""
+        return Extraction(fmt, text.strip(), time.perf_counter() - t0)
+
+    # ── metrics ───────────────────────────────────────────────────────────────
+    def record(self, fmt: str, seconds: float):
+        """Note one extraction; done by the caller so that extractions run in
+        cpu_pool workers are counted in the parent process."""
+        with self._lock:
+            self._latency.setdefault(fmt, deque(maxlen=self._window)).append(seconds)
+            self._counts[fmt] = self._counts.get(fmt, 0) + 1
+
+    def stats(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {fmt: dict(summarize(list(lat)), total=self._counts[fmt])
+                    for fmt, lat in self._latency.items()}
+
+
+# ─── Sniffers ─────────────────────────────────────────────────────────────────
+_OLE2_MAGIC = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"
+_HTML_RE    = re.compile(rb"<(!doctype\s+html|html|head|body)[\s>]", re.I)
+_CONTROL_BYTES = bytes(b for b in range(32) if b not in b"\t\n\r\f")
+
+
+def _zip_member(data: bytes, name: str) -> Optional[bytes]:
+    if not data.startswith(b"PK\x03\x04"):
+        return None
+    with zipfile.ZipFile(io.BytesIO(data)) as z:
+        try:
+            info = z.getinfo(name)
+        except KeyError:
+            return None
+        if info.file_size > MAX_XML_BYTES:
+            raise UnsupportedFormat("The document is too large to process.")
+        return z.read(info)
+
+
+def _check_archive(data: bytes) -> None:
+    """Reject zip bombs before a parser inflates every member."""
+    with zipfile.ZipFile(io.BytesIO(data)) as z:
+        infos = z.infolist()
+    if (any(i.file_size > MAX_XML_BYTES for i in infos if i.filename.endswith(".xml"))
+            or sum(i.file_size for i in infos) > MAX_ARCHIVE_BYTES):
+        raise UnsupportedFormat("The document is too large to process.")
+
+
+def _is_docx(data: bytes) -> bool:
+    if not data.startswith(b"PK\x03\x04"):
+        return False
+    with zipfile.ZipFile(io.BytesIO(data)) as z:
+        return "word/document.xml" in z.namelist()
+
+
+def _is_odt(data: bytes) -> bool:
+    mimetype = _zip_member(data, "mimetype")
+    return bool(mimetype) and mimetype.strip().startswith(b"application/vnd.oasis.opendocument.text")
+
+
+def _is_pdf(data: bytes) -> bool:
+    return b"%PDF-" in data[:1024]        # the header may follow some junk
+
+
+def _is_html(data: bytes) -> bool:
+    head  = data[:SNIFF_BYTES]
+    start = head.lstrip(b"\xef\xbb\xbf \t\r\n")
+    return start.startswith(b"<") and bool(_HTML_RE.search(head))
+
+
+def _is_text(data: bytes) -> bool:
+    head = data[:SNIFF_BYTES]
+    if head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return True
+    # binary formats are full of control bytes; text has almost none
+    controls = len(head) - len(head.translate(None, _CONTROL_BYTES))
+    return b"\x00" not in head and controls <= len(head) // 100
+
+
+# ─── Parsers ──────────────────────────────────────────────────────────────────
+def extract_pdf(data: bytes) -> str:
+    import PyPDF2
+    return "\n".join((page.extract_text() or "") for page in PyPDF2.PdfReader(io.BytesIO(data)).pages)
+
+
+def extract_docx(data: bytes) -> str:
+    import docx
+    _check_archive(data)
+    return "\n".join(p.text for p in docx.Document(io.BytesIO(data)).paragraphs)
+
+
+def decode_text(data: bytes) -> str:
+    if data.startswith(codecs.BOM_UTF8):
+        return data[3:].decode("utf-8", errors="replace")
+    if data.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return data.decode("utf-16", errors="replace")
+    try:
+        return data.decode("utf-8")
+    except UnicodeDecodeError:
+        return data.decode("cp1252", errors="replace")
+
+
+_ODT_TEXT = "urn:oasis:names:tc:opendocument:xmlns:text:1.0"
+_ODT_BLOCKS = {f"{{{_ODT_TEXT}}}p", f"{{{_ODT_TEXT}}}h"}
+
+
+def _odt_inline(el) -> str:
+    parts = [el.text or ""]
+    for child in el:
+        tag = child.tag
+        if tag == f"{{{_ODT_TEXT}}}s":
+            parts.append(" " * int(child.get(f"{{{_ODT_TEXT}}}c", "1")))
+        elif tag == f"{{{_ODT_TEXT}}}tab":
+            parts.append("\t")
+        elif tag == f"{{{_ODT_TEXT}}}line-break":
+            parts.append("\n")
+        else:
+            parts.append(_odt_inline(child))
+        parts.append(child.tail or "")
+    return "".join(parts)
+
+
+def extract_odt(data: bytes) -> str:
+    root  = ElementTree.fromstring(_zip_member(data, "content.xml") or b"<x/>")
+    lines: List[str] = []
+
+    def walk(el):
+        for child in el:
+            if child.tag in _ODT_BLOCKS:
+                lines.append(_odt_inline(child))
+            else:
+                walk(child)
+
+    walk(root)
+    return "\n".join(lines)
+
+
+# RTF: a group-aware control-word scanner. Destinations that hold no body
+# text (font/colour tables, metadata, pictures, `{\*...}` extensions) are
+# skipped; \uN escapes and \'hh bytes in the document's code page are decoded.
+_RTF_TOKEN = re.compile(
+    r"\\([a-z]{1,32})(-?\d{1,10})? ?|\\'([0-9a-f]{2})|\\([^a-z])|([{}])|[\r\n]+|([^\\{}\r\n]+)",
+    re.I,
+)
+_RTF_SKIP = frozenset((
+    "fonttbl", "colortbl", "stylesheet", "info", "pict", "object", "header", "footer",
+    "headerl", "headerr", "headerf", "footerl", "footerr", "footerf", "themedata",
+    "colorschememapping", "latentstyles", "datastore", "xmlnstbl", "listtable",
+    "listoverridetable", "rsidtbl", "generator", "filetbl", "revtbl", "fldinst", "bkmkstart",
+    "bkmkend",
+))
+_RTF_CHARS = {
+    "par": "\n", "line": "\n", "row": "\n", "sect": "\n\n", "page": "\n\n",
+    "tab": "\t", "cell": "\t", "emdash": "\u2014", "endash": "\u2013", "bullet": "\u2022",
+    "lquote": "\u2018", "rquote": "\u2019", "ldblquote": "\u201c", "rdblquote": "\u201d",
+    "emspace": " ", "enspace": " ", "qmspace": " ",
+}
+
+
+def extract_rtf(data: bytes) -> str:
+    text = data.decode("latin-1")      # RTF is 7-bit; 8-bit bytes arrive as \'hh
+    codepage = "cp1252"
+    out: List[str] = []
+    stack: List[tuple] = []
+    skip, uc, pending = False, 1, 0    # pending: fallback chars to drop after \uN
+
+    for word, arg, hexcode, sym, brace, run in (m.groups() for m in _RTF_TOKEN.finditer(text)):
+        if brace:
+            pending = 0
+            if brace == "{":
+                stack.append((skip, uc))
+            elif stack:
+                skip, uc = stack.pop()
+        elif word:
+            pending = 0
+            if word in _RTF_SKIP:
+                skip = True
+            elif word == "ansicpg" and arg:
+                codepage = f"cp{arg}"
+            elif skip:
+                continue
+            elif word in _RTF_CHARS:
+                out.append(_RTF_CHARS[word])
+            elif word == "uc" and arg:
+                uc = int(arg)
+            elif word == "u" and arg:
+                code = int(arg)
+                out.append(chr(code + 0x10000 if code < 0 else code))
+                pending = uc
+        elif hexcode:
+            if pending:
+                pending -= 1
+            elif not skip:
+                try:
+                    out.append(bytes([int(hexcode, 16)]).decode(codepage))
+                except (LookupError, UnicodeDecodeError):
+                    out.append(bytes([int(hexcode, 16)]).decode("cp1252", errors="replace"))
+        elif sym:
+            pending = 0
+            if sym == "*":
+                skip = True
+            elif skip:
+                continue
+            elif sym in "\\{}":
+                out.append(sym)
+            elif sym == "~":
+                out.append("\u00a0")
+            elif sym in "\r\n":
+                out.append("\n")
+        elif run:
+            if pending:
+                dropped = min(pending, len(run))
+                run, pending = run[dropped:], pending - dropped
+            if not skip:
+                out.append(run)
+    return "".join(out)
+
+
+class _HTMLText(HTMLParser):
+    SKIP   = {"script", "style", "head", "noscript", "template", "svg"}
+    BLOCKS = {"p", "div", "br", "li", "tr", "h1", "h2", "h3", "h4", "h5", "h6", "section",
+              "article", "header", "footer", "ul", "ol", "table", "dt", "dd", "blockquote", "pre", "hr"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: List[str] = []
+        self._skip = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP:
+            self._skip += 1
+        elif tag in self.BLOCKS:
+            self.parts.append("\n")
+        elif tag in ("td", "th"):
+            self.parts.append("\t")
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP:
+            self._skip = max(0, self._skip - 1)
+        elif tag in self.BLOCKS:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        if not self._skip:
+            self.parts.append(re.sub(r"\s+", " ", data))
+
+
+def extract_html(data: bytes) -> str:
+    parser = _HTMLText()
+    parser.feed(decode_text(data))
+    parser.close()
+    lines = (line.strip() for line in "".join(parser.parts).split("\n"))
+    return "\n".join(line for line in lines if line)
+
+
+# ─── Default registry ─────────────────────────────────────────────────────────
+def default_registry() -> ExtractorRegistry:
+    reg = ExtractorRegistry()
+    reg.register("pdf",  _is_pdf, extract_pdf)
+    reg.register("docx", _is_docx, extract_docx)
+    reg.register("odt",  _is_odt, extract_odt)
+    reg.register("doc",  lambda data: data.startswith(_OLE2_MAGIC), None,
+                 unsupported="Legacy Word (.doc) files are not supported. "
+                             "Please save the resume as DOCX or PDF and upload it again.")
+    reg.register("rtf",  lambda data: data[:64].lstrip().startswith(b"{\\rtf"), extract_rtf)
+    reg.register("html", _is_html, extract_html)
+    reg.register("txt",  _is_text, decode_text)
+    return reg
+
+
+_registry: Optional[ExtractorRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_extractors() -> ExtractorRegistry:
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = default_registry()
+    return _registry
@@ -0,0 +1,23 @@
+# gunicorn_preload.py
+# Opt-in gunicorn profile that loads the app and its models once in the master
+# process and forks workers from it:
+#
+#   gunicorn -c gunicorn_preload.py app:app
+#
+# Workers start with the embedding model, LLM client, RAG imports and compiled
+# skill matchers already in memory (shared copy-on-write) instead of loading
+# them on their first request.
+
+import os
+
+bind         = os.getenv("GUNICORN_BIND", "0.0.0.0:5001")
+workers      = int(os.getenv("GUNICORN_WORKERS", "2"))
+threads      = int(os.getenv("GUNICORN_THREADS", "4"))
+timeout      = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+preload_app  = True
+
+
+def on_starting(server):
+    # With preload_app the app module is already imported here, in the master.
+    from app import warm_up
+    warm_up()
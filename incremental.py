@@ -0,0 +1,192 @@
+# incremental.py
+# Diff-aware re-analysis of an edited resume
+#
+# Users fix two bullets and re-upload; without this every LLM call, embedding
+# and skill scan is redone. An AnalysisMemo holds one version's work keyed by
+# content hash:
+#   llm        : prompt (messages) hash         → LLM output
+#   rag        : question + retrieved chunks    → RAG answer
+#   embedding  : chunk text hash                → vector
+#   skills     : section text hash              → skill hits
+# The next upload from the same user starts a new memo seeded with the
+# previous one; only entries whose inputs changed are recomputed, and only
+# entries used by the new version are carried forward (no growth across
+# versions).
+#
+# Like metrics.stage(), the active memo is thread-local: call sites use
+# memoized(...), which is a plain call when no memo is active.
+#
+# The last memo per user lives in session_store.memo_store_from_env() (LRU,
+# TTL and a byte cap from approx_bytes()).
+
+import json
+import difflib
+import hashlib
+import threading
+from array import array
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+_local = threading.local()
+
+
+def content_hash(*parts: Any) -> str:
+    h = hashlib.sha256()
+    for p in parts:
+        raw = p if isinstance(p, str) else json.dumps(p, sort_keys=True, default=str)
+        h.update(raw.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()[:32]
+
+
+class AnalysisMemo:
+
+    def __init__(self, previous: Optional["AnalysisMemo"] = None):
+        self._prev    = previous
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self.reused:     Dict[str, int] = {}
+        self.recomputed: Dict[str, int] = {}
+        self.untracked:  set = set()     # kinds computed where the memo couldn't follow
+        self.text: str = ""
+        self.section_hashes: Dict[str, str] = {}
+
+    def get_or_compute(self, kind: str, key: str, compute: Callable[[], Any]) -> Any:
+        bucket = self._entries.setdefault(kind, {})
+        if key in bucket:
+            self.reused[kind] = self.reused.get(kind, 0) + 1
+            return bucket[key]
+        if self._prev is not None and key in self._prev._entries.get(kind, {}):
+            bucket[key] = self._prev._entries[kind][key]
+            self.reused[kind] = self.reused.get(kind, 0) + 1
+            return bucket[key]
+        value = compute()
+        self.recomputed[kind] = self.recomputed.get(kind, 0) + 1
+        if value is not None:        # failed LLM calls are retried next time
+            bucket[key] = value
+        return value
+
+    # ── work done in another process (cpu_pool) ───────────────────────────────
+    def known(self, kind: str) -> Dict[str, Any]:
+        """Entries of one kind this version may reuse: its own and the
+        previous version's."""
+        out = dict(self._prev._entries.get(kind, {})) if self._prev is not None else {}
+        out.update(self._entries.get(kind, {}))
+        return out
+
+    def merge(self, entries: Dict[str, Dict[str, Any]],
+              reused: Dict[str, int], recomputed: Dict[str, int]):
+        """Fold in entries ({kind: {key: value}}) and counts from a memo run
+        elsewhere on this one's behalf."""
+        for kind, bucket in entries.items():
+            self._entries.setdefault(kind, {}).update(bucket)
+        for k, n in reused.items():
+            self.reused[k] = self.reused.get(k, 0) + n
+        for k, n in recomputed.items():
+            self.recomputed[k] = self.recomputed.get(k, 0) + n
+
+    def untrack(self, kind: str):
+        self.untracked.add(kind)
+
+    # ── BoundedStore value protocol ───────────────────────────────────────────
+    def approx_bytes(self) -> int:
+        """Rough size of what the memo keeps: text, hashes and every entry."""
+        return (_approx_bytes(self.text) + _approx_bytes(self.section_hashes)
+                + _approx_bytes(self._entries))
+
+    def cleanup(self):
+        pass
+
+    @contextmanager
+    def activate(self):
+        prev = getattr(_local, "memo", None)
+        _local.memo = self
+        try:
+            yield self
+        finally:
+            _local.memo = prev
+            # the previous version is only needed while this one is computed
+            self._prev = None
+
+    # ── version diff ──────────────────────────────────────────────────────────
+    def record_version(self, text: str, section_hashes: Dict[str, str]):
+        self.text = text
+        self.section_hashes = section_hashes
+
+    def report(self, previous: Optional["AnalysisMemo"]) -> Dict[str, Any]:
+        out: Dict[str, Any] = {
+            "previous_version": previous is not None,
+            "reused":     dict(self.reused),
+            "recomputed": dict(self.recomputed),
+        }
+        for kind in self.untracked:
+            out["reused"][kind] = out["recomputed"][kind] = "not tracked"
+        if previous is not None:
+            old_lines = previous.text.splitlines()
+            new_lines = self.text.splitlines()
+            added = removed = 0
+            for op, i1, i2, j1, j2 in difflib.SequenceMatcher(
+                None, old_lines, new_lines, autojunk=False
+            ).get_opcodes():
+                if op in ("replace", "delete"):
+                    removed += i2 - i1
+                if op in ("replace", "insert"):
+                    added += j2 - j1
+            old_s, new_s = previous.section_hashes, self.section_hashes
+            out.update({
+                "lines_added":   added,
+                "lines_removed": removed,
+                "sections_changed": sorted(
+                    k for k in set(old_s) | set(new_s) if old_s.get(k) != new_s.get(k)
+                ),
+            })
+        return out
+
+
+def active_memo() -> Optional[AnalysisMemo]:
+    return getattr(_local, "memo", None)
+
+
+@contextmanager
+def suspended():
+    """Run process-wide work (e.g. building a shared index) outside the memo."""
+    prev = getattr(_local, "memo", None)
+    _local.memo = None
+    try:
+        yield
+    finally:
+        _local.memo = prev
+
+
+def memoized(kind: str, key: str, compute: Callable[[], Any]) -> Any:
+    memo = getattr(_local, "memo", None)
+    if memo is None:
+        return compute()
+    return memo.get_or_compute(kind, key, compute)
+
+
+def memoized_embeddings(texts: List[str], embed: Callable[[List[str]], List[List[float]]]) -> List[List[float]]:
+    """Embed only texts not seen in this/previous version; one batch call."""
+    memo = getattr(_local, "memo", None)
+    if memo is None:
+        return embed(texts)
+    keys    = [content_hash(t) for t in texts]
+    missing = [i for i, k in enumerate(keys)
+               if k not in memo._entries.get("embedding", {})
+               and (memo._prev is None or k not in memo._prev._entries.get("embedding", {}))]
+    fresh = dict(zip(missing, embed([texts[i] for i in missing]))) if missing else {}
+    # vectors are stored as compact float32 arrays, returned as lists
+    out = [memo.get_or_compute("embedding", k, lambda i=i: array("f", fresh[i]))
+           for i, k in enumerate(keys)]
+    return [list(v) for v in out]
+
+
+def _approx_bytes(value: Any) -> int:
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    if isinstance(value, array):
+        return value.itemsize * len(value)
+    if isinstance(value, dict):
+        return sum(_approx_bytes(k) + _approx_bytes(v) for k, v in value.items())
+    if isinstance(value, (list, tuple, set)):
+        return sum(_approx_bytes(v) for v in value)
+    return 16
@@ -0,0 +1,186 @@
+# jd_index.py
+# Content-addressed store for job-description artifacts shared by all candidates
+#
+# A posting with 500 applicants used to be split, embedded and indexed 500
+# times (once per candidate collection). Here a JD is keyed by the hash of its
+# normalised text and processed once:
+#   skills  : extract_skills() result — in memory, and persisted on the JD's
+#             first vector entry so other workers / restarts reuse it
+#   vectors : chunks + embeddings in one shared Chroma collection
+#             ("job_descriptions"), tagged with jd_hash
+# Per-candidate retrieval queries the candidate's resume collection and this
+# collection (filtered by jd_hash) together — see ChromaVectorStore.
+
+import json
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def jd_hash(jd_text: str) -> str:
+    normalised = " ".join(jd_text.split()).lower()
+    return hashlib.sha256(normalised.encode("utf-8")).hexdigest()[:24]
+
+
+def _as_matrix(vectors) -> Any:
+    import numpy as np
+    return np.asarray(vectors, dtype=np.float32)
+
+
+@dataclass
+class JDEntry:
+    key:     str
+    chunks:  List[str] = field(default_factory=list)
+    # float32 chunk embeddings (n × d) in chunk order, for MMR over retrieved
+    # JD chunks
+    vectors: Optional[Any] = None
+
+
+class SharedJDIndex:
+    COLLECTION = "job_descriptions"
+    # bump when JD skill extraction changes, so skills persisted by an older
+    # extractor are recomputed instead of reused
+    SKILLS_VERSION = 3
+
+    def __init__(self, max_cached: int = 256):
+        self.max_cached = max_cached
+        self._lock      = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._skills:  "OrderedDict[str, Dict[str, List[str]]]" = OrderedDict()
+        self._entries: "OrderedDict[str, JDEntry]" = OrderedDict()
+        self._collection = None
+        self._stats = {"skills_hits": 0, "skills_misses": 0,
+                       "vector_hits": 0, "vector_misses": 0}
+
+    # ── skills ────────────────────────────────────────────────────────────────
+    def skills(self, jd_text: str, extract: Callable[[str], Dict[str, List[str]]]) -> Dict[str, List[str]]:
+        key = jd_hash(jd_text)
+        with self._lock:
+            cached = self._skills.get(key)
+            if cached is not None:
+                self._skills.move_to_end(key)
+                self._stats["skills_hits"] += 1
+                return cached
+        persisted = self._persisted_skills(key)
+        result    = persisted if persisted is not None else extract(jd_text)
+        with self._lock:
+            self._stats["skills_hits" if persisted is not None else "skills_misses"] += 1
+            self._remember(self._skills, key, result)
+        return result
+
+    # ── vectors ───────────────────────────────────────────────────────────────
+    @property
+    def collection(self):
+        if self._collection is None:
+            import chromadb
+            from rag_engine import ChromaVectorStore
+            client = chromadb.PersistentClient(path=ChromaVectorStore.CHROMA_DIR)
+            self._collection = client.get_or_create_collection(
+                name=self.COLLECTION, metadata={"hnsw:space": "cosine"},
+            )
+        return self._collection
+
+    def ensure(self, jd_text: str, splitter: Any, embeddings: Any) -> JDEntry:
+        """Return the indexed JD, splitting + embedding it only the first time."""
+        key = jd_hash(jd_text)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._stats["vector_hits"] += 1
+                return entry
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # Per-JD lock: concurrent first uploads for the same posting embed once.
+        with key_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+            if entry is None:
+                entry = self._load(key)
+                hit = entry is not None
+                if entry is None:
+                    entry = self._index(key, jd_text, splitter, embeddings)
+            else:
+                hit = True
+            with self._lock:
+                self._stats["vector_hits" if hit else "vector_misses"] += 1
+                self._remember(self._entries, key, entry)
+                self._key_locks.pop(key, None)
+        return entry
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            s = dict(self._stats)
+        for kind in ("skills", "vector"):
+            total = s[f"{kind}_hits"] + s[f"{kind}_misses"]
+            s[f"{kind}_reuse_rate"] = s[f"{kind}_hits"] / total if total else 0.0
+        s["cached_jds"] = len(self._entries)
+        return s
+
+    # ── internals ─────────────────────────────────────────────────────────────
+    def _remember(self, cache: "OrderedDict", key: str, value: Any):
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > self.max_cached:
+            cache.popitem(last=False)
+
+    def _load(self, key: str) -> Optional[JDEntry]:
+        got = self.collection.get(where={"jd_hash": key},
+                                  include=["documents", "metadatas", "embeddings"])
+        if not got["ids"]:
+            return None
+        order  = sorted(range(len(got["ids"])), key=lambda i: got["metadatas"][i].get("chunk", 0))
+        return JDEntry(key=key, chunks=[got["documents"][i] for i in order],
+                       vectors=_as_matrix([got["embeddings"][i] for i in order]))
+
+    def _index(self, key: str, jd_text: str, splitter: Any, embeddings: Any) -> JDEntry:
+        chunks = [c.strip() for c in splitter.split_text(jd_text) if c.strip()]
+        if chunks:
+            metadatas = [{"source": "job_description", "jd_hash": key, "chunk": i}
+                         for i in range(len(chunks))]
+            with self._lock:
+                skills = self._skills.get(key)
+            if skills is not None:
+                metadatas[0]["skills"]         = json.dumps(skills)
+                metadatas[0]["skills_version"] = self.SKILLS_VERSION
+            vectors = _as_matrix(embeddings.embed_documents(chunks))
+            self.collection.add(
+                ids=[f"{key}_{i}" for i in range(len(chunks))],
+                documents=chunks,
+                embeddings=vectors,
+                metadatas=metadatas,
+            )
+            logger.info(f"SharedJDIndex: indexed JD {key} ({len(chunks)} chunks)")
+            return JDEntry(key=key, chunks=chunks, vectors=vectors)
+        return JDEntry(key=key, chunks=chunks)
+
+    def _persisted_skills(self, key: str) -> Optional[Dict[str, List[str]]]:
+        if self._collection is None:
+            # don't import chromadb just for a skills lookup
+            return None
+        try:
+            got = self._collection.get(ids=[f"{key}_0"], include=["metadatas"])
+            meta = got["metadatas"][0] if got["ids"] else None
+            if meta and meta.get("skills") and meta.get("skills_version") == self.SKILLS_VERSION:
+                return json.loads(meta["skills"])
+        except Exception as e:
+            logger.warning(f"SharedJDIndex: skills lookup failed — {e}")
+        return None
+
+
+_shared: Optional[SharedJDIndex] = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_jd_index() -> SharedJDIndex:
+    global _shared
+    if _shared is None:
+        with _shared_lock:
+            if _shared is None:
+                _shared = SharedJDIndex()
+    return _shared
@@ -0,0 +1,260 @@
+# llm_limiter.py
+# Admission control for outbound LLM calls
+#
+# Without coordination every worker thread calls the inference API at once;
+# a traffic spike becomes a burst of concurrent requests, the API starts
+# rate limiting, and /upload turns into long retries and 500s. All LLM calls
+# (ResumeAnalyzer._llm_call and the RAG chain's _HFChatLLM._generate) go
+# through one LLMLimiter. It is opt-in: with the defaults (LLM_RATE_PER_SEC
+# and LLM_MAX_CONCURRENT unset or 0) every call is admitted at once. One
+# analysis makes about 10 calls, so size the rate to analyses/s × 10.
+#
+#   token bucket : LLM_RATE_PER_SEC refill, LLM_BURST capacity. With
+#                  LLM_LIMIT_STATE set to a file path the bucket lives in that
+#                  file (fcntl-locked), so all gunicorn workers on the host
+#                  share one budget; otherwise it is per process.
+#   concurrency  : at most LLM_MAX_CONCURRENT calls in flight per process —
+#                  not per deployment: W gunicorn workers allow W × that.
+#   priority     : waiters are admitted interactive-first (cover letter,
+#                  chat), then batch (analysis) in arrival order.
+#   deadlines    : a call that cannot be admitted within LLM_MAX_WAIT
+#                  (batch) / LLM_MAX_WAIT_INTERACTIVE seconds is rejected
+#                  with LLMRejected instead of piling onto the API. The
+#                  caller falls back (rule-based output); rejections made
+#                  inside track_rejections() are counted so the response can
+#                  be marked degraded.
+#
+# Queue wait is recorded as the "llm_queue" stage (see metrics.stage) and in
+# stats(), alongside admitted / rejected counts per priority.
+
+import os
+import time
+import heapq
+import struct
+import logging
+import itertools
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+from metrics import stage, summarize
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = "interactive"
+BATCH       = "batch"
+_RANK       = {INTERACTIVE: 0, BATCH: 1}
+
+_local = threading.local()
+
+
+class LLMRejected(RuntimeError):
+    """Raised when an LLM call is not admitted before its deadline."""
+
+
+@contextmanager
+def interactive():
+    """Mark LLM calls made by this thread as interactive (user is waiting)."""
+    prev = getattr(_local, "priority", BATCH)
+    _local.priority = INTERACTIVE
+    try:
+        yield
+    finally:
+        _local.priority = prev
+
+
+def current_priority() -> str:
+    return getattr(_local, "priority", BATCH)
+
+
+@contextmanager
+def track_rejections():
+    """Collect the LLMRejected raised on this thread; yields a list that
+    receives one priority string per rejected call."""
+    prev = getattr(_local, "rejected", None)
+    _local.rejected = rejected = []
+    try:
+        yield rejected
+    finally:
+        _local.rejected = prev
+
+
+# ─── Token buckets ────────────────────────────────────────────────────────────
+class TokenBucket:
+    """In-process bucket. take() returns 0.0 when a token was taken, else the
+    seconds until one will be available."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate   = rate
+        self.burst  = burst
+        self._tokens = burst
+        self._last   = time.monotonic()
+        self._lock   = threading.Lock()
+
+    def take(self) -> float:
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last   = now
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return 0.0
+            return (1.0 - self._tokens) / self.rate
+
+
+class FileTokenBucket(TokenBucket):
+    """Bucket state (tokens, wall-clock timestamp) kept in a small file and
+    updated under flock, shared by every process on the host."""
+
+    _FMT = "dd"
+
+    def __init__(self, rate: float, burst: float, path: str):
+        super().__init__(rate, burst)
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def take(self) -> float:
+        if self.rate <= 0:
+            return 0.0
+        import fcntl
+        with self._lock:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                raw = os.pread(fd, struct.calcsize(self._FMT), 0)
+                now = time.time()
+                if len(raw) == struct.calcsize(self._FMT):
+                    tokens, last = struct.unpack(self._FMT, raw)
+                    tokens = min(self.burst, tokens + max(0.0, now - last) * self.rate)
+                else:
+                    tokens = self.burst
+                wait = 0.0
+                if tokens >= 1.0:
+                    tokens -= 1.0
+                else:
+                    wait = (1.0 - tokens) / self.rate
+                os.pwrite(fd, struct.pack(self._FMT, tokens, now), 0)
+                return wait
+            finally:
+                os.close(fd)   # releases the flock
+
+
+# ─── Limiter ──────────────────────────────────────────────────────────────────
+class LLMLimiter:
+
+    def __init__(
+        self,
+        rate: float = 0.0,
+        burst: float = 10.0,
+        max_concurrent: int = 0,
+        max_wait: float = 20.0,
+        max_wait_interactive: float = 60.0,
+        state_path: Optional[str] = None,
+    ):
+        self.bucket = FileTokenBucket(rate, burst, state_path) if state_path else TokenBucket(rate, burst)
+        self.max_concurrent = max_concurrent      # 0 = unlimited
+        self.max_wait = {BATCH: max_wait, INTERACTIVE: max_wait_interactive}
+        self._cond     = threading.Condition()
+        self._waiters: list = []          # heap of (rank, seq)
+        self._seq      = itertools.count()
+        self._inflight = 0
+        self._waits    = {p: deque(maxlen=1000) for p in _RANK}
+        self._stats    = {f"{k}_{p}": 0 for k in ("admitted", "rejected") for p in _RANK}
+
+    @classmethod
+    def from_env(cls) -> "LLMLimiter":
+        return cls(
+            rate=float(os.getenv("LLM_RATE_PER_SEC", "0")),
+            burst=float(os.getenv("LLM_BURST", "10")),
+            max_concurrent=int(os.getenv("LLM_MAX_CONCURRENT", "0")),
+            max_wait=float(os.getenv("LLM_MAX_WAIT", "20")),
+            max_wait_interactive=float(os.getenv("LLM_MAX_WAIT_INTERACTIVE", "60")),
+            state_path=os.getenv("LLM_LIMIT_STATE") or None,
+        )
+
+    @contextmanager
+    def slot(self, priority: Optional[str] = None):
+        """Hold an admission slot for the duration of one LLM call."""
+        priority = priority or current_priority()
+        with stage("llm_queue"):
+            self._acquire(priority)
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._inflight -= 1
+                self._cond.notify_all()
+
+    def _acquire(self, priority: str):
+        t0       = time.monotonic()
+        deadline = t0 + self.max_wait[priority]
+        me       = (_RANK[priority], next(self._seq))
+        with self._cond:
+            heapq.heappush(self._waiters, me)
+            while True:
+                wait = None
+                # only the highest-priority waiter may take a token
+                if self._waiters[0] == me and self._has_capacity():
+                    # reserve the slot, then take the token without holding
+                    # the condition: FileTokenBucket does flock + file I/O
+                    self._inflight += 1
+                    self._cond.release()
+                    try:
+                        wait = self.bucket.take()
+                    except BaseException:
+                        self._cond.acquire()
+                        self._inflight -= 1
+                        self._leave(me)
+                        raise
+                    self._cond.acquire()
+                    if wait == 0.0:
+                        self._leave(me)
+                        break
+                    self._inflight -= 1
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._leave(me)
+                    self._stats[f"rejected_{priority}"] += 1
+                    rejected = getattr(_local, "rejected", None)
+                    if rejected is not None:
+                        rejected.append(priority)
+                    logger.warning(f"LLMLimiter: {priority} call rejected after "
+                                   f"{time.monotonic() - t0:.1f}s in queue")
+                    raise LLMRejected(f"LLM busy — {priority} call not admitted in "
+                                      f"{self.max_wait[priority]:.0f}s")
+                self._cond.wait(min(remaining, wait) if wait else remaining)
+            self._stats[f"admitted_{priority}"] += 1
+            self._waits[priority].append(time.monotonic() - t0)
+
+    def _has_capacity(self) -> bool:
+        return not self.max_concurrent or self._inflight < self.max_concurrent
+
+    def _leave(self, me):
+        """Drop a waiter from the queue (caller holds the condition)."""
+        self._waiters.remove(me)
+        heapq.heapify(self._waiters)
+        self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            s: Dict[str, Any] = dict(self._stats)
+            s["inflight"] = self._inflight
+            s["queued"]   = len(self._waiters)
+            s["queue_wait_s"] = {p: summarize(list(w)) for p, w in self._waits.items()}
+        return s
+
+
+_shared: Optional[LLMLimiter] = None
+_shared_lock = threading.Lock()
+
+
+def get_llm_limiter() -> LLMLimiter:
+    global _shared
+    if _shared is None:
+        with _shared_lock:
+            if _shared is None:
+                _shared = LLMLimiter.from_env()
+    return _shared
@@ -0,0 +1,189 @@
+# metrics.py
+# Lightweight, dependency-free instrumentation for Resume.AI
+#
+# Stage timers : `with stage("extract"):` records wall time for a pipeline
+#                stage into whichever StageRecorder is active on this thread.
+#                When no recorder is active the context manager is a no-op,
+#                so production requests pay one thread-local lookup per stage.
+#                `count("prompt_tokens", n)` adds to a per-request counter the
+#                same way.
+# RSS          : current / peak resident set size of this process.
+# Allocations  : with MEMORY_DEBUG=1, `with memory_trace("analyze"):` diffs
+#                tracemalloc snapshots around the block, logs the top growth
+#                sites and records `alloc_net_bytes`. Off by default —
+#                tracemalloc slows allocation-heavy code considerably.
+# Exposition   : process_gauges() / render_prometheus() back the /metrics
+#                endpoint (per worker: every gauge carries a pid label).
+
+import os
+import gc
+import math
+import time
+import logging
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Per-request stage timing
+# ─────────────────────────────────────────────────────────────────────────────
+class StageRecorder:
+    """Collects {stage_name: seconds} and {counter: total} for one unit of
+    work on one thread."""
+
+    def __init__(self):
+        self.timings:  Dict[str, float] = {}
+        self.counters: Dict[str, float] = {}
+
+    def add(self, name: str, seconds: float):
+        self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+    def incr(self, name: str, value: float = 1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def __enter__(self):
+        self._prev = getattr(_local, "recorder", None)
+        _local.recorder = self
+        return self
+
+    def __exit__(self, *exc):
+        _local.recorder = self._prev
+        return False
+
+
+def active_recorder() -> Optional[StageRecorder]:
+    return getattr(_local, "recorder", None)
+
+
+@contextmanager
+def stage(name: str):
+    rec = getattr(_local, "recorder", None)
+    if rec is None:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        rec.add(name, time.perf_counter() - t0)
+
+
+def count(name: str, value: float = 1):
+    rec = getattr(_local, "recorder", None)
+    if rec is not None:
+        rec.incr(name, value)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Process memory
+# ─────────────────────────────────────────────────────────────────────────────
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def current_rss_bytes() -> int:
+    """Current RSS from /proc (Linux); falls back to peak RSS elsewhere."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return peak_rss_bytes()
+
+
+def peak_rss_bytes() -> int:
+    try:
+        import resource
+        import sys
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is KiB on Linux, bytes on macOS
+        return peak if sys.platform == "darwin" else peak * 1024
+    except Exception:
+        return 0
+
+
+MEMORY_DEBUG        = os.getenv("MEMORY_DEBUG", "0").strip().lower() in ("1", "true", "yes", "on")
+MEMORY_DEBUG_TOP    = int(os.getenv("MEMORY_DEBUG_TOP", "5"))
+
+
+@contextmanager
+def memory_trace(label: str, enabled: Optional[bool] = None):
+    """Log where the enclosed block left memory allocated (MEMORY_DEBUG).
+
+    Snapshots are process-wide, so with concurrent requests a diff includes
+    other threads' allocations; use it on a single-threaded worker or a
+    benchmark run for precise attribution."""
+    if not (MEMORY_DEBUG if enabled is None else enabled):
+        yield
+        return
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    try:
+        yield
+    finally:
+        after = tracemalloc.take_snapshot()
+        diff  = after.compare_to(before, "lineno")
+        net   = sum(d.size_diff for d in diff)
+        count("alloc_net_bytes", net)
+        top = "; ".join(
+            f"{d.traceback[0].filename.rsplit(os.sep, 1)[-1]}:{d.traceback[0].lineno} "
+            f"{d.size_diff / 1024:+.1f} KiB"
+            for d in diff[:MEMORY_DEBUG_TOP] if d.size_diff
+        )
+        logger.info(f"memory_trace {label}: net {net / 1024:+.1f} KiB — {top or 'no growth'}")
+
+
+def process_gauges() -> Dict[str, float]:
+    """Memory gauges for this process."""
+    gauges = {
+        "process_resident_memory_bytes":      current_rss_bytes(),
+        "process_peak_resident_memory_bytes": peak_rss_bytes(),
+    }
+    for gen, st in enumerate(gc.get_stats()):
+        gauges[f"python_gc_generation{gen}_collections"] = st["collections"]
+        gauges[f"python_gc_generation{gen}_collected"]   = st["collected"]
+    if tracemalloc.is_tracing():
+        current, peak = tracemalloc.get_traced_memory()
+        gauges["python_traced_memory_bytes"]      = current
+        gauges["python_traced_memory_peak_bytes"] = peak
+    return gauges
+
+
+def render_prometheus(gauges: Dict[str, float], prefix: str = "resumeai_") -> str:
+    """Prometheus text exposition; each gauge labelled with this worker's pid."""
+    pid   = os.getpid()
+    lines = []
+    for name, value in sorted(gauges.items()):
+        lines.append(f"# TYPE {prefix}{name} gauge")
+        lines.append(f'{prefix}{name}{{pid="{pid}"}} {value!r}')
+    return "\n".join(lines) + "\n"
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Summary statistics
+# ─────────────────────────────────────────────────────────────────────────────
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile; returns 0.0 for an empty list."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = max(0, min(len(ordered) - 1, math.ceil(pct / 100.0 * len(ordered)) - 1))
+    return ordered[idx]
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {"count": 0, "mean": 0.0, "p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+    return {
+        "count": len(values),
+        "mean":  sum(values) / len(values),
+        "p50":   percentile(values, 50),
+        "p95":   percentile(values, 95),
+        "p99":   percentile(values, 99),
+        "max":   max(values),
+    }
@@ -0,0 +1,248 @@
+# profiling.py
+# Opt-in per-request profiling with flamegraph-ready output
+#
+# A request is profiled when profiling is enabled (PROFILE_ENABLED=1) and
+# either it is sampled (PROFILE_SAMPLE_RATE, 0.0–1.0) or it carries
+# `X-Profile: <PROFILE_TOKEN>`. Two modes (PROFILE_MODE):
+#   sample   : a background thread snapshots the request thread's stack every
+#              PROFILE_INTERVAL_MS (default 5 ms) via sys._current_frames();
+#              low overhead, wall-clock (includes time blocked on the LLM)
+#   cprofile : cProfile for exact call counts / CPU time, plus the sampler
+#              for stacks
+# Output under PROFILE_DIR, keyed by request id:
+#   <id>.json       metadata + top PROFILE_TOP_N functions
+#   <id>.collapsed  "frame;frame;frame count" lines — feed to flamegraph.pl
+#                   or speedscope
+# Only the newest PROFILE_KEEP profiles are kept. Work done in cpu_pool
+# worker processes is not visible here (profile with CPU_POOL_WORKERS=0).
+# Profiles do not nest: inside a profiled request, profile() is a no-op that
+# yields the outer request's id.
+
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import random
+import logging
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+_local = threading.local()
+
+
+def _frame_label(code) -> str:
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class _StackSampler(threading.Thread):
+    """Samples one thread's stack at a fixed interval until stopped."""
+
+    def __init__(self, thread_id: int, interval: float):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.thread_id = thread_id
+        self.interval  = interval
+        self.stacks: Counter = Counter()
+        self._stop_evt = threading.Event()
+
+    def run(self):
+        while not self._stop_evt.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self) -> Counter:
+        self._stop_evt.set()
+        if self.ident is not None:
+            self.join()
+        return self.stacks
+
+
+class RequestProfiler:
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        sample_rate: float = 0.0,
+        token: Optional[str] = None,
+        mode: str = "sample",
+        directory: str = "./profiles",
+        keep: int = 50,
+        top_n: int = 30,
+        interval_ms: float = 5.0,
+    ):
+        self.enabled     = enabled
+        self.sample_rate = sample_rate
+        self.token       = token
+        self.mode        = mode
+        self.directory   = directory
+        self.keep        = keep
+        self.top_n       = top_n
+        self.interval    = interval_ms / 1000.0
+        self._lock       = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "RequestProfiler":
+        return cls(
+            enabled=os.getenv("PROFILE_ENABLED", "0").strip().lower() in ("1", "true", "yes", "on"),
+            sample_rate=float(os.getenv("PROFILE_SAMPLE_RATE", "0")),
+            token=os.getenv("PROFILE_TOKEN") or None,
+            mode=os.getenv("PROFILE_MODE", "sample"),
+            directory=os.getenv("PROFILE_DIR", "./profiles"),
+            keep=int(os.getenv("PROFILE_KEEP", "50")),
+            top_n=int(os.getenv("PROFILE_TOP_N", "30")),
+            interval_ms=float(os.getenv("PROFILE_INTERVAL_MS", "5")),
+        )
+
+    def should_profile(self, header_value: Optional[str] = None) -> bool:
+        if not self.enabled:
+            return False
+        # the header only counts with a configured token, so arbitrary clients
+        # cannot switch profiling on
+        if header_value and self.token and header_value == self.token:
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    # ── capture ───────────────────────────────────────────────────────────────
+    @contextmanager
+    def profile(self, request_id: Optional[str] = None, label: str = ""):
+        """Profile the enclosed block on this thread; yields the request id."""
+        outer = getattr(_local, "request_id", None)
+        if outer is not None:
+            yield outer
+            return
+        request_id = request_id or uuid.uuid4().hex
+        _local.request_id = request_id
+        sampler = _StackSampler(threading.get_ident(), self.interval)
+        cprof = None
+        if self.mode == "cprofile":
+            import cProfile
+            cprof = cProfile.Profile()
+            try:
+                cprof.enable()
+            except ValueError as e:
+                # another profiler (debugger, coverage, a concurrent request on
+                # 3.12+) already owns the hook — fall back to sampling only
+                logger.warning(f"RequestProfiler: cProfile unavailable, sampling only — {e}")
+                cprof = None
+        t0 = time.perf_counter()
+        try:
+            sampler.start()
+            yield request_id
+        finally:
+            _local.request_id = None
+            if cprof is not None:
+                cprof.disable()
+            stacks  = sampler.stop()
+            elapsed = time.perf_counter() - t0
+            try:
+                self._write(request_id, label, elapsed, stacks, cprof)
+            except Exception as e:
+                logger.warning(f"RequestProfiler: could not save profile {request_id} — {e}")
+
+    def _write(self, request_id: str, label: str, elapsed: float, stacks: Counter, cprof):
+        os.makedirs(self.directory, exist_ok=True)
+        meta = {
+            "id":         request_id,
+            "label":      label,
+            "created":    time.time(),
+            "duration_s": elapsed,
+            "mode":       "cprofile" if cprof is not None else "sample",
+            "samples":    sum(stacks.values()),
+            "interval_ms": self.interval * 1000,
+            "top":        self._top_from_cprofile(cprof) if cprof is not None
+                          else self._top_from_samples(stacks),
+        }
+        base = os.path.join(self.directory, request_id)
+        with open(base + ".collapsed", "w") as f:
+            for stack, n in stacks.most_common():
+                f.write(f"{stack} {n}\n")
+        with open(base + ".json", "w") as f:
+            json.dump(meta, f, indent=2)
+        logger.info(f"RequestProfiler: saved {request_id} ({label}, {elapsed:.2f}s, "
+                    f"{meta['samples']} samples)")
+        self._prune()
+
+    def _top_from_samples(self, stacks: Counter) -> List[Dict]:
+        self_n, total_n = Counter(), Counter()
+        for stack, n in stacks.items():
+            frames = stack.split(";")
+            self_n[frames[-1]] += n
+            for fr in set(frames):
+                total_n[fr] += n
+        all_n = sum(stacks.values()) or 1
+        return [{"function": fr, "self_pct": 100.0 * self_n[fr] / all_n,
+                 "total_pct": 100.0 * total_n[fr] / all_n}
+                for fr, _ in self_n.most_common(self.top_n)]
+
+    def _top_from_cprofile(self, cprof) -> List[Dict]:
+        import pstats
+        st = pstats.Stats(cprof)
+        rows = []
+        for (filename, line, func), (cc, nc, tt, ct, _) in st.stats.items():
+            rows.append({"function": f"{os.path.basename(filename)}:{line}:{func}",
+                         "calls": nc, "self_s": tt, "total_s": ct})
+        rows.sort(key=lambda r: r["self_s"], reverse=True)
+        return rows[: self.top_n]
+
+    # ── retention / listing ───────────────────────────────────────────────────
+    def _prune(self):
+        with self._lock:
+            metas = self._meta_files()
+            for path in metas[self.keep:]:
+                for ext in (".json", ".collapsed"):
+                    try:
+                        os.remove(path[: -len(".json")] + ext)
+                    except OSError:
+                        pass
+
+    def _meta_files(self) -> List[str]:
+        """Profile metadata files, newest first."""
+        try:
+            names = [n for n in os.listdir(self.directory) if n.endswith(".json")]
+        except OSError:
+            return []
+        paths = [os.path.join(self.directory, n) for n in names]
+        return sorted(paths, key=lambda p: os.path.getmtime(p), reverse=True)
+
+    def list(self) -> List[Dict]:
+        out = []
+        for path in self._meta_files():
+            try:
+                with open(path) as f:
+                    meta = json.load(f)
+            except (OSError, ValueError):
+                continue
+            meta.pop("top", None)
+            out.append(meta)
+        return out
+
+    def path_for(self, request_id: str, kind: str = "json") -> Optional[str]:
+        """File for a profile id ('json' or 'collapsed'), or None."""
+        if not _ID_RE.match(request_id or "") or kind not in ("json", "collapsed"):
+            return None
+        path = os.path.join(self.directory, f"{request_id}.{kind}")
+        return path if os.path.exists(path) else None
+
+
+_profiler: Optional[RequestProfiler] = None
+_profiler_lock = threading.Lock()
+
+
+def get_request_profiler() -> RequestProfiler:
+    global _profiler
+    if _profiler is None:
+        with _profiler_lock:
+            if _profiler is None:
+                _profiler = RequestProfiler.from_env()
+    return _profiler
@@ -5,44 +5,69 @@
 # Vector DB    : ChromaDB (persistent on disk, replaces in-memory NumPy matrix)
 # LLM          : Qwen2.5-7B-Instruct via HuggingFace Inference API
 # Orchestration: LangChain LCEL chain with a custom HF chat wrapper
+#
+# Heavy dependencies (numpy, torch via sentence-transformers, chromadb,
+# langchain) are imported on first use so that importing this module is cheap.
+# Call preload() before forking workers to load them once in the parent.
 
 import os
 import uuid
 import logging
-import numpy as np
-from typing import List, Dict, Optional, Any
+import threading
+from dataclasses import dataclass
+from typing import List, Dict, Optional, Any, Tuple
+
+from retrieval import BM25Index, mmr_select, overlap_length, reciprocal_rank_fusion, unique_token_ratio
+from incremental import content_hash, memoized, memoized_embeddings
+from llm_limiter import LLMRejected, get_llm_limiter
+from metrics import active_recorder, count
+from context_packer import count_tokens
 
 logger = logging.getLogger(__name__)
 
 # ─────────────────────────────────────────────────────────────────────────────
 # Sentence-Transformers Embeddings
-# (unchanged — ChromaDB uses this same class for embedding)
+# One process-wide model; ChromaVectorStore, the skill matrix and candidate
+# search all embed through it. Chunk vectors are memoized per user.
 # ─────────────────────────────────────────────────────────────────────────────
 class STEmbeddings:
     MODEL_NAME = "all-MiniLM-L6-v2"
 
+    # The SentenceTransformer is loaded once per process and shared by every
+    # engine; loading it per request cost seconds and ~80 MB each time.
+    _shared_model = None
+    _shared_lock  = threading.Lock()
+
     def __init__(self):
         self._model = None
         self._load_model()
 
     def _load_model(self):
-        try:
-            from sentence_transformers import SentenceTransformer
-            self._model = SentenceTransformer(self.MODEL_NAME)
-            logger.info(f"STEmbeddings: loaded {self.MODEL_NAME}")
-        except ImportError:
-            logger.error(
-                "sentence-transformers not installed.\n"
-                "Fix: pip install sentence-transformers torch"
-            )
-        except Exception as e:
-            logger.error(f"STEmbeddings: failed to load — {e}")
+        cls = type(self)
+        if cls._shared_model is not None:
+            self._model = cls._shared_model
+            return
+        with cls._shared_lock:
+            if cls._shared_model is None:
+                try:
+                    from sentence_transformers import SentenceTransformer
+                    cls._shared_model = SentenceTransformer(self.MODEL_NAME)
+                    logger.info(f"STEmbeddings: loaded {self.MODEL_NAME}")
+                except ImportError:
+                    logger.error(
+                        "sentence-transformers not installed.\n"
+                        "Fix: pip install sentence-transformers torch"
+                    )
+                except Exception as e:
+                    logger.error(f"STEmbeddings: failed to load — {e}")
+        self._model = cls._shared_model
 
     @property
     def ready(self) -> bool:
         return self._model is not None
 
-    def _encode(self, texts: List[str]) -> np.ndarray:
+    def _encode(self, texts: List[str]) -> "np.ndarray":
+        import numpy as np
         vecs = self._model.encode(
             texts,
             normalize_embeddings=True,
@@ -52,12 +77,27 @@ class STEmbeddings:
         return vecs.astype(np.float32)
 
     def embed_documents(self, texts: List[str]) -> List[List[float]]:
-        return self._encode(texts).tolist()
+        # chunks unchanged since the session's previous upload are not re-encoded
+        return memoized_embeddings(texts, lambda batch: self._encode(batch).tolist())
 
     def embed_query(self, text: str) -> List[float]:
         return self._encode([text])[0].tolist()
 
 
+# ─────────────────────────────────────────────────────────────────────────────
+# Chunks
+# Sessions hold their chunks for as long as they live in RAGSessionStore, so
+# they are kept as slotted ChunkDocs (same page_content / metadata interface
+# as a LangChain Document, about a third of the per-chunk overhead) and only
+# turned into Documents at the LangChain retriever boundary.
+# ─────────────────────────────────────────────────────────────────────────────
+@dataclass
+class ChunkDoc:
+    __slots__ = ("page_content", "metadata")
+    page_content: str
+    metadata:     Dict[str, Any]
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # ChromaDB Vector Store
 # CHANGED: replaces the old SemanticVectorStore (NumPy matrix)
@@ -72,7 +112,34 @@ class ChromaVectorStore:
     # don't bleed into each other.
     CHROMA_DIR = "./chroma_db"
 
-    def __init__(self, docs: List[Any], embeddings: STEmbeddings):
+    # "hybrid" fuses dense (Chroma) and sparse (BM25) rankings with
+    # reciprocal-rank fusion; "dense" is the original Chroma-only search.
+    RETRIEVAL_MODE = os.getenv("RAG_RETRIEVAL", "hybrid").strip().lower()
+    # candidates pulled from each ranker before fusion
+    FUSION_FETCH_K = 10
+
+    # Post-processing of the ranked candidates ("off" = plain top-k):
+    #   mmr : maximal marginal relevance over the chunks' stored embeddings
+    #         (RAG_MMR_LAMBDA trades relevance against novelty; chunks at least
+    #         RAG_DUP_THRESHOLD cosine-similar to a picked one are dropped),
+    #         then adjacent picked chunks whose text overlaps (the splitter's
+    #         chunk_overlap) are merged into one
+    DEDUP         = os.getenv("RAG_DEDUP", "mmr").strip().lower()
+    MMR_LAMBDA    = float(os.getenv("RAG_MMR_LAMBDA", "0.7"))
+    DUP_THRESHOLD = float(os.getenv("RAG_DUP_THRESHOLD", "0.92"))
+
+    def __init__(
+        self,
+        docs: List[Any],
+        embeddings: STEmbeddings,
+        retrieval: Optional[str] = None,
+        jd: Optional[Any] = None,
+        jd_collection: Optional[Any] = None,
+        dedup: Optional[str] = None,
+    ):
+        """`docs` go into this session's private collection. `jd` (a
+        jd_index.JDEntry) and `jd_collection` point at the shared, already
+        embedded job description, which is queried alongside it."""
         try:
             import chromadb
         except ImportError:
@@ -101,26 +168,246 @@ class ChromaVectorStore:
         # Old: matrix = np.array(vecs) → just stored numbers
         # New: collection.add() stores text, embedding, metadata, and id together
         texts     = [d.page_content for d in docs]
-        embeddings_list = embeddings.embed_documents(texts)
         metadatas = [d.metadata for d in docs]
         ids       = [f"chunk_{i}" for i in range(len(docs))]
 
-        self._collection.add(
-            documents=texts,           # the raw text of each chunk
-            embeddings=embeddings_list, # the vector for each chunk
-            metadatas=metadatas,       # {"source": "resume"} or {"source": "job_description"}
-            ids=ids,                   # unique ID for each chunk
-        )
+        self._vectors = None
+        if docs:
+            import numpy as np
+            # kept (float32) so MMR needs no second embedding pass or fetch
+            self._vectors = np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+            self._collection.add(
+                documents=texts,           # the raw text of each chunk
+                embeddings=self._vectors,  # the vector for each chunk
+                metadatas=metadatas,       # {"source": "resume", "section": ...}
+                ids=ids,                   # unique ID for each chunk
+            )
+
+        # Shared JD chunks are addressed as indices after the private ones
+        self._n_own = len(docs)
+        self._jd    = jd
+        self._jd_collection = jd_collection if jd is not None and jd.chunks else None
+        jd_docs = []
+        if self._jd_collection is not None:
+            # the chunk strings are the shared index's own; one metadata dict
+            jd_meta = {"source": "job_description", "jd_hash": jd.key}
+            jd_docs = [ChunkDoc(c, jd_meta) for c in jd.chunks]
 
-        # Keep original docs so we can return LangChain Document objects
-        self._docs = docs
+        self._docs = list(docs) + jd_docs
+
+        # Sparse index over the same chunks for exact keyword matches
+        self._mode = (retrieval or self.RETRIEVAL_MODE)
+        self._bm25 = BM25Index([d.page_content for d in self._docs]) if self._mode == "hybrid" else None
+        self._dedup = (dedup or self.DEDUP)
 
         logger.info(
             f"ChromaVectorStore: {len(docs)} chunks indexed in "
             f"collection '{self._collection_name}' at {self.CHROMA_DIR}"
+            + (f" (+{len(jd_docs)} shared JD chunks)" if jd_docs else "")
         )
 
-    def similarity_search(self, query: str, k: int = 4) -> List[Any]:
+    def similarity_search(
+        self, query: str, k: int = 4, sections: Optional[List[str]] = None
+    ) -> List[Any]:
+        """Top-k chunks. `sections` restricts resume chunks to those section
+        kinds; job-description chunks are always eligible."""
+        return self.retrieve(query, k=k, sections=sections, measure=False)[0]
+
+    def retrieve(
+        self, query: str, k: int = 4, sections: Optional[List[str]] = None, measure: bool = True,
+    ) -> Tuple[List[Any], Dict[str, Any]]:
+        """similarity_search() plus a report on the context it returns:
+        chunks, tokens, tokens saved against plain top-k, unique_token_ratio.
+        With measure=False the context is only tokenized for an active
+        StageRecorder; otherwise the report just has "chunks"."""
+        allowed = None
+        if sections:
+            allowed = self._allowed_ids(sections)
+            if not allowed:
+                return [], {"chunks": 0, "tokens": 0}
+        if self._dedup != "mmr":
+            if self._bm25 is not None:
+                docs = self.hybrid_search(query, k=k, allowed=allowed, sections=sections)
+            else:
+                docs = [self._docs[i] for i in self.dense_ids(query, k, allowed=allowed, sections=sections)]
+            return docs, self._context_report(docs, measure=measure)
+        return self.mmr_search(query, k=k, allowed=allowed, sections=sections, measure=measure)
+
+    def _allowed_ids(self, sections: List[str]) -> List[int]:
+        flags = [f"in_{s}" for s in sections]
+        if not any(d.metadata.get(f) for d in self._docs for f in flags):
+            return []
+        return [i for i, d in enumerate(self._docs)
+                if any(d.metadata.get(f) for f in flags)
+                or d.metadata.get("source") == "job_description"]
+
+    def hybrid_search(
+        self, query: str, k: int = 4,
+        allowed: Optional[List[int]] = None, sections: Optional[List[str]] = None,
+    ) -> List[Any]:
+        """Dense + BM25 candidates fused by reciprocal rank."""
+        fused = self._hybrid_ranked(query, self._fetch_k(k, allowed), allowed, sections)
+        return [self._docs[i] for i, _ in fused[:k]]
+
+    def _fetch_k(self, k: int, allowed: Optional[List[int]]) -> int:
+        pool = len(allowed) if allowed is not None else len(self._docs)
+        return min(pool, max(k, self.FUSION_FETCH_K))
+
+    def _hybrid_ranked(
+        self, query: str, fetch_k: int,
+        allowed: Optional[List[int]], sections: Optional[List[str]], qvec: Optional[List[float]] = None,
+    ) -> List[Tuple[int, float]]:
+        dense = [i for _, i in self._dense_hits(query, fetch_k, allowed, sections, qvec)]
+        if allowed is None:
+            sparse = [i for i, _ in self._bm25.search(query, fetch_k)]
+        else:
+            ok     = set(allowed)
+            sparse = [i for i, _ in self._bm25.search(query, len(self._docs)) if i in ok][:fetch_k]
+        return reciprocal_rank_fusion([dense, sparse])
+
+    def dense_ids(
+        self, query: str, k: int,
+        allowed: Optional[List[int]] = None, sections: Optional[List[str]] = None,
+    ) -> List[int]:
+        """Indices of the k nearest chunks across the private collection and
+        the shared JD entries, best first (one query embedding for both)."""
+        return [i for _, i in self._dense_hits(query, k, allowed, sections)]
+
+    def _dense_hits(
+        self, query: str, k: int,
+        allowed: Optional[List[int]], sections: Optional[List[str]], qvec: Optional[List[float]] = None,
+    ) -> List[Tuple[float, int]]:
+        """(cosine distance, index) of the k nearest chunks, best first."""
+        if qvec is None:
+            qvec = self._emb.embed_query(query)
+        hits = []   # (distance, index)
+
+        if self._n_own:
+            where = None
+            if sections:
+                clauses = [{f"in_{s}": True} for s in sections]
+                where   = clauses[0] if len(clauses) == 1 else {"$or": clauses}
+            own_pool = sum(1 for i in allowed if i < self._n_own) if allowed is not None else self._n_own
+            if own_pool:
+                res = self._collection.query(
+                    query_embeddings=[qvec], n_results=min(k, own_pool),
+                    where=where, include=["distances"],
+                )
+                hits += [(d, int(cid.rsplit("_", 1)[1]))
+                         for cid, d in zip(res["ids"][0], res["distances"][0])]
+
+        if self._jd_collection is not None:
+            res = self._jd_collection.query(
+                query_embeddings=[qvec], n_results=min(k, len(self._jd.chunks)),
+                where={"jd_hash": self._jd.key}, include=["distances"],
+            )
+            hits += [(d, self._n_own + int(cid.rsplit("_", 1)[1]))
+                     for cid, d in zip(res["ids"][0], res["distances"][0])]
+
+        # same model + cosine space in both collections, so distances compare
+        hits.sort()
+        return hits[:k]
+
+    # ── MMR + overlap merging ─────────────────────────────────────────────────
+    def mmr_search(
+        self, query: str, k: int = 4,
+        allowed: Optional[List[int]] = None, sections: Optional[List[str]] = None,
+        measure: bool = True,
+    ) -> Tuple[List[Any], Dict[str, Any]]:
+        """FUSION_FETCH_K candidates from the usual ranking, then up to k of
+        them picked by MMR and overlapping neighbours merged. Relevance is
+        1 − cosine distance (dense) or the fused score scaled to [0, 1]
+        (hybrid), so the hybrid ranking is kept and only redundancy is added."""
+        qvec    = self._emb.embed_query(query)
+        fetch_k = self._fetch_k(k, allowed)
+        if self._bm25 is not None:
+            ranked = self._hybrid_ranked(query, fetch_k, allowed, sections, qvec)[:fetch_k]
+            cand   = [i for i, _ in ranked]
+            top, low = (ranked[0][1], ranked[-1][1]) if ranked else (0.0, 0.0)
+            rel    = [(sc - low) / (top - low) if top > low else 1.0 for _, sc in ranked]
+        else:
+            hits = self._dense_hits(query, fetch_k, allowed, sections, qvec)
+            cand = [i for _, i in hits]
+            rel  = [1.0 - d for d, _ in hits]
+        plain = [self._docs[i] for i in cand[:k]]
+
+        vectors = self._candidate_vectors(cand)
+        if vectors is None:
+            return plain, self._context_report(plain, measure=measure)
+        picked = [cand[p] for p in mmr_select(rel, vectors, k, self.MMR_LAMBDA, self.DUP_THRESHOLD)]
+        docs, merged = self._merge_adjacent(picked)
+        report = self._context_report(docs, baseline=plain, measure=measure)
+        report.update(candidates=len(cand), dropped=min(k, len(cand)) - len(picked), merged=merged)
+        return docs, report
+
+    def _candidate_vectors(self, ids: List[int]) -> Optional[Any]:
+        """Stored embeddings of the given chunk indices (n × d), or None if
+        any is unavailable (e.g. a JD entry indexed before vectors were kept)."""
+        import numpy as np
+        jd_vecs = self._jd.vectors if self._jd_collection is not None else None
+        rows = []
+        for i in ids:
+            if i < self._n_own:
+                rows.append(self._vectors[i])
+            elif jd_vecs is not None and i - self._n_own < len(jd_vecs):
+                rows.append(jd_vecs[i - self._n_own])
+            else:
+                return None
+        return np.stack(rows) if rows else None
+
+    def _merge_adjacent(self, ids: List[int]) -> Tuple[List[Any], int]:
+        """Picked chunks, in pick order, with each run of neighbouring chunks
+        (consecutive indices from the same source) that overlap textually
+        folded into one chunk at the position of its best-ranked member. A
+        chunk whose text is contained in another picked chunk is dropped.
+        Returns (chunks, number of chunks merged away)."""
+        rank = {i: r for r, i in enumerate(ids)}
+        runs: List[List[int]] = []
+        for i in sorted(ids):
+            prev = runs[-1][-1] if runs else None
+            if (prev is not None and i == prev + 1
+                    and self._docs[i].metadata.get("source") == self._docs[prev].metadata.get("source")
+                    and overlap_length(self._docs[prev].page_content, self._docs[i].page_content)):
+                runs[-1].append(i)
+            else:
+                runs.append([i])
+
+        out = []
+        for run in sorted(runs, key=lambda r: min(rank[i] for i in r)):
+            doc = self._docs[run[0]]
+            if len(run) > 1:
+                text, meta = doc.page_content, dict(doc.metadata)
+                for i in run[1:]:
+                    nxt   = self._docs[i]
+                    text += nxt.page_content[overlap_length(text, nxt.page_content):]
+                    meta.update((f, v) for f, v in nxt.metadata.items() if f.startswith("in_"))
+                doc = ChunkDoc(text, meta)
+            out.append(doc)
+        merged = len(ids) - len(out)
+        kept = [d for n, d in enumerate(out)
+                if not any(n != m and d.page_content in o.page_content
+                           and (len(d.page_content) < len(o.page_content) or m < n)
+                           for m, o in enumerate(out))]
+        return kept, merged + len(out) - len(kept)
+
+    @staticmethod
+    def _context_report(
+        docs: List[Any], baseline: Optional[List[Any]] = None, measure: bool = True,
+    ) -> Dict[str, Any]:
+        if not measure and active_recorder() is None:
+            return {"chunks": len(docs)}     # nobody reads the token counts
+        texts  = [d.page_content for d in docs]
+        tokens = sum(count_tokens(t) for t in texts)
+        report = {"chunks": len(docs), "tokens": tokens,
+                  "unique_token_ratio": round(unique_token_ratio(texts), 4)}
+        if baseline is not None:
+            base = sum(count_tokens(d.page_content) for d in baseline)
+            report["tokens_saved"] = base - tokens
+            count("rag_context_tokens_saved", base - tokens)
+        count("rag_context_tokens", tokens)
+        return report
+
+    def dense_search(self, query: str, k: int = 4) -> List[Any]:
         # Old code:
         #   qvec   = np.array(self._emb.embed_query(query))
         #   scores = self.matrix.dot(qvec)           # brute force dot product
@@ -131,20 +418,26 @@ class ChromaVectorStore:
         #   ChromaDB handles the similarity search internally using HNSW index.
         #   HNSW (Hierarchical Navigable Small World) is an approximate nearest
         #   neighbor algorithm — much faster than brute force for large datasets.
+        return [self._docs[i] for i in self.dense_ids(query, k)]
 
-        query_embedding = self._emb.embed_query(query)
-        results = self._collection.query(
-            query_embeddings=[query_embedding],
-            n_results=k,
-        )
+    def resume_vector(self) -> Optional[Any]:
+        """One vector for the whole resume: the normalised mean of its chunk
+        embeddings (see candidate_index.py), or None."""
+        if self._vectors is None:
+            return None
+        from candidate_index import resume_vector
+        own = [i for i in range(self._n_own) if self._docs[i].metadata.get("source") == "resume"]
+        return resume_vector(self._vectors[own]) if own else None
 
-        # ChromaDB returns results as lists of lists — one list per query.
-        # We sent one query so we take index [0].
-        from langchain_core.documents import Document
-        docs = []
-        for text, meta in zip(results["documents"][0], results["metadatas"][0]):
-            docs.append(Document(page_content=text, metadata=meta))
-        return docs
+    # 384-dim float32 vectors, plus roughly the same again for HNSW graph links
+    _BYTES_PER_VECTOR = 384 * 4 * 2
+
+    def approx_bytes(self) -> int:
+        # shared JD vectors are not owned by this session; only their text is
+        text   = sum(len(d.page_content) for d in self._docs)
+        sparse = self._bm25.approx_bytes() if self._bm25 is not None else 0
+        kept   = self._vectors.nbytes if self._vectors is not None else 0
+        return text + sparse + kept + self._n_own * self._BYTES_PER_VECTOR
 
     def cleanup(self):
         """Delete the collection when the session is done to free disk space."""
@@ -157,8 +450,9 @@ class ChromaVectorStore:
 
 # ─────────────────────────────────────────────────────────────────────────────
 # LangChain-compatible retriever
-# UNCHANGED in logic — just now backed by ChromaVectorStore instead of
-# SemanticVectorStore, but the interface is identical.
+# Plain top-k similarity_search over the ChromaVectorStore, exposed as
+# engine._retriever for LangChain callers. ask() does not use it: it calls
+# ChromaVectorStore.retrieve() (section filter + MMR dedup) directly.
 # ─────────────────────────────────────────────────────────────────────────────
 def _make_retriever(store: ChromaVectorStore, k: int = 4):
     from langchain_core.retrievers import BaseRetriever
@@ -183,21 +477,49 @@ def _make_retriever(store: ChromaVectorStore, k: int = 4):
             *,
             run_manager: CallbackManagerForRetrieverRun,
         ) -> List[Document]:
-            return self._store.similarity_search(query, k=self._k)
+            return [Document(page_content=d.page_content, metadata=dict(d.metadata))
+                    for d in self._store.similarity_search(query, k=self._k)]
 
     return _ChromaRetriever(vector_store=store, top_k=k)
 
 
+# ─────────────────────────────────────────────────────────────────────────────
+# Text splitter factory
+# ─────────────────────────────────────────────────────────────────────────────
+def _make_splitter(chunk_size: int = 500, chunk_overlap: int = 80):
+    try:
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
+    except ImportError:
+        try:
+            from langchain.text_splitter import RecursiveCharacterTextSplitter
+        except ImportError:
+            logger.error(
+                "RAG: text splitter unavailable.\n"
+                "Fix: pip install langchain-text-splitters"
+            )
+            return None
+    return RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        separators=["\n\n", "\n", ". ", " ", ""],
+    )
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # ResumeRAGEngine — main coordinator
-# Changes from old version:
-#   1. self._store is now ChromaVectorStore instead of SemanticVectorStore
-#   2. build_vectorstore() calls ChromaVectorStore(...) instead of SemanticVectorStore(...)
-#   3. Added cleanup() call to delete ChromaDB collection after use
-#   4. Everything else (LLM, chain, ask, helpers) is UNCHANGED
+#   build_vectorstore() : section-aware chunks of resume + JD into a per-engine
+#                         ChromaVectorStore collection
+#   ask()               : one retrieval (optionally limited to section kinds,
+#                         MMR-deduplicated), then one LLM call over those chunks
+#   cleanup()           : deletes the Chroma collection (RAGSessionStore calls
+#                         it on eviction)
 # ─────────────────────────────────────────────────────────────────────────────
 class ResumeRAGEngine:
 
+    # chunks retrieved per question (prompt context size)
+    TOP_K = int(os.getenv("RAG_TOP_K", "4"))
+    CHUNK_SIZE = 500
+
     def __init__(self, hf_api_token: str):
         self.hf_api_token = hf_api_token
         self._store       = None   # will be ChromaVectorStore
@@ -205,44 +527,27 @@ class ResumeRAGEngine:
         self._retriever   = None
         self._ready       = False
 
-        # Embeddings — unchanged
+        # Embeddings — process-wide sentence-transformers model
         self._embeddings = STEmbeddings()
         if not self._embeddings.ready:
             logger.error("RAG: embeddings unavailable — check logs above")
 
-        # Text splitter — unchanged
-        self._splitter = None
-        try:
-            from langchain_text_splitters import RecursiveCharacterTextSplitter
-            self._splitter = RecursiveCharacterTextSplitter(
-                chunk_size=500,
-                chunk_overlap=80,
-                separators=["\n\n", "\n", ". ", " ", ""],
-            )
-            logger.info("RAG: text splitter ready (langchain_text_splitters)")
-        except ImportError:
-            try:
-                from langchain.text_splitter import RecursiveCharacterTextSplitter
-                self._splitter = RecursiveCharacterTextSplitter(
-                    chunk_size=500,
-                    chunk_overlap=80,
-                    separators=["\n\n", "\n", ". ", " ", ""],
-                )
-                logger.info("RAG: text splitter ready (langchain.text_splitter fallback)")
-            except ImportError:
-                logger.error(
-                    "RAG: text splitter unavailable.\n"
-                    "Fix: pip install langchain-text-splitters"
-                )
+        # Text splitters: the overlapping one is for unstructured text (JD, or
+        # resumes with no detectable headings); section bodies are already
+        # topically coherent, so they are split without overlap.
+        self._splitter         = _make_splitter(self.CHUNK_SIZE, chunk_overlap=80)
+        self._section_splitter = _make_splitter(self.CHUNK_SIZE, chunk_overlap=0)
 
-        # LLM — unchanged
+        # LLM — LangChain chat model over InferenceClient
         self._llm = None
         if not hf_api_token:
             logger.error("RAG: HUGGINGFACE_API_TOKEN not set — LLM disabled")
         else:
             self._llm = self._load_llm(hf_api_token)
 
-    # ── LLM loader — UNCHANGED ────────────────────────────────────────────────
+    # ── LLM loader ────────────────────────────────────────────────────────────
+    # Each _generate() builds and closes its own InferenceClient (a long-lived
+    # one keeps every response open) and goes through the LLM limiter.
     RAG_MODEL = "Qwen/Qwen2.5-7B-Instruct"
 
     def _load_llm(self, token: str):
@@ -254,10 +559,12 @@ class ResumeRAGEngine:
             from langchain_core.callbacks import CallbackManagerForLLMRun
             from typing import Optional
 
-            model_id = self.RAG_MODEL
+            # HF_INFERENCE_ENDPOINT (a URL) overrides the hub model id so the
+            # chain can be pointed at a self-hosted or stub endpoint.
+            model_id = os.getenv("HF_INFERENCE_ENDPOINT") or self.RAG_MODEL
 
             class _HFChatLLM(BaseChatModel):
-                client: object
+                token: str
                 model_id: str
 
                 class Config:
@@ -285,17 +592,28 @@ class ResumeRAGEngine:
                         else:
                             hf_msgs.append({"role": "user", "content": m.content})
 
-                    response = self.client.chat_completion(
-                        messages=hf_msgs,
-                        model=self.model_id,
-                        max_tokens=600,
-                        temperature=0.3,
-                    )
+                    count("llm_calls")
+                    if active_recorder() is not None:
+                        count("prompt_tokens", sum(count_tokens(m["content"]) for m in hf_msgs))
+                    # one client per call: recent huggingface_hub keeps every
+                    # response open on the client until close()
+                    client = InferenceClient(api_key=self.token)
+                    try:
+                        with get_llm_limiter().slot():
+                            response = client.chat_completion(
+                                messages=hf_msgs,
+                                model=self.model_id,
+                                max_tokens=600,
+                                temperature=0.3,
+                            )
+                    finally:
+                        close = getattr(client, "close", None)
+                        if close is not None:
+                            close()
                     text = response.choices[0].message.content or ""
                     return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
 
-            hf_client = InferenceClient(api_key=token)
-            llm = _HFChatLLM(client=hf_client, model_id=model_id)
+            llm = _HFChatLLM(token=token, model_id=model_id)
             logger.info(f"RAG: LLM ready — {model_id} via InferenceClient")
             return llm
 
@@ -306,12 +624,16 @@ class ResumeRAGEngine:
 
         return None
 
-    # ── QA chain builder — UNCHANGED ──────────────────────────────────────────
-    def _build_qa_chain(self, retriever):
+    # ── QA chain builder ──────────────────────────────────────────────────────
+    # Input is {"docs": [...], "question": str}: ask() retrieves once and feeds
+    # the same documents to the prompt and to the returned sources, instead of
+    # the chain running its own retriever and ask() searching a second time.
+    def _build_qa_chain(self):
         try:
+            from operator import itemgetter
             from langchain_core.prompts import ChatPromptTemplate
             from langchain_core.output_parsers import StrOutputParser
-            from langchain_core.runnables import RunnablePassthrough, RunnableLambda
+            from langchain_core.runnables import RunnableLambda
 
             PROMPT = ChatPromptTemplate.from_messages([
                 ("system",
@@ -328,8 +650,8 @@ class ResumeRAGEngine:
 
             chain = (
                 {
-                    "context":  retriever | RunnableLambda(format_docs),
-                    "question": RunnablePassthrough(),
+                    "context":  itemgetter("docs") | RunnableLambda(format_docs),
+                    "question": itemgetter("question"),
                 }
                 | PROMPT
                 | self._llm
@@ -343,7 +665,7 @@ class ResumeRAGEngine:
             logger.error(f"RAG: failed to build QA chain — {e}", exc_info=True)
             return None
 
-    # ── Helpers — UNCHANGED ───────────────────────────────────────────────────
+    # ── Helpers ───────────────────────────────────────────────────────────────
     @staticmethod
     def _clean_answer(raw: str) -> str:
         if "[/INST]" in raw:
@@ -367,8 +689,17 @@ class ResumeRAGEngine:
 
     # ── Public API ────────────────────────────────────────────────────────────
     def build_vectorstore(
-        self, resume_text: str, job_description: Optional[str] = None
+        self,
+        resume_text: str,
+        job_description: Optional[str] = None,
+        structure: Optional[Any] = None,
     ) -> bool:
+        """Chunk, embed and index the resume (+ JD).
+
+        `structure` is a resume_segmenter.ResumeStructure; when given (or when
+        headings can be detected) sections are used as chunk boundaries and
+        each chunk carries its section kind in metadata.
+        """
         if not self._embeddings.ready:
             logger.error("RAG build_vectorstore: embeddings not ready")
             return False
@@ -378,41 +709,44 @@ class ResumeRAGEngine:
             return False
 
         try:
-            from langchain_core.documents import Document
-
             # CHANGED: cleanup old ChromaDB collection before building a new one.
             # Old code had no cleanup because NumPy matrix was just garbage collected.
             # ChromaDB persists to disk so we must delete the old collection ourselves.
             if self._store is not None:
                 self._store.cleanup()
 
-            docs: List[Document] = []
-
-            for chunk in self._splitter.split_text(resume_text):
-                chunk = chunk.strip()
-                if chunk:
-                    docs.append(Document(page_content=chunk, metadata={"source": "resume"}))
+            docs: List[ChunkDoc] = self._resume_documents(resume_text, structure)
 
+            # The JD is embedded once into the shared, content-addressed index
+            # and reused by every candidate applying to the same posting.
+            jd_entry, jd_collection = None, None
             if job_description and job_description.strip():
-                for chunk in self._splitter.split_text(job_description):
-                    chunk = chunk.strip()
-                    if chunk:
-                        docs.append(
-                            Document(page_content=chunk, metadata={"source": "job_description"})
-                        )
-
-            if not docs:
+                try:
+                    from jd_index import get_shared_jd_index
+                    shared        = get_shared_jd_index()
+                    jd_entry      = shared.ensure(job_description, self._splitter, self._embeddings)
+                    jd_collection = shared.collection
+                except Exception as e:
+                    logger.warning(f"RAG: shared JD index unavailable, indexing JD privately — {e}")
+                    for chunk in self._splitter.split_text(job_description):
+                        chunk = chunk.strip()
+                        if chunk:
+                            docs.append(ChunkDoc(chunk, {"source": "job_description"}))
+
+            if not docs and not (jd_entry and jd_entry.chunks):
                 logger.error("RAG build_vectorstore: 0 chunks produced")
                 return False
 
             # CHANGED: ChromaVectorStore instead of SemanticVectorStore
             # Old: self._store = SemanticVectorStore(docs, self._embeddings)
             # New: self._store = ChromaVectorStore(docs, self._embeddings)
-            self._store     = ChromaVectorStore(docs, self._embeddings)
-            self._retriever = _make_retriever(self._store, k=4)
+            self._store     = ChromaVectorStore(
+                docs, self._embeddings, jd=jd_entry, jd_collection=jd_collection,
+            )
+            self._retriever = _make_retriever(self._store, k=self.TOP_K)
 
             if self._llm is not None:
-                self._qa_chain = self._build_qa_chain(self._retriever)
+                self._qa_chain = self._build_qa_chain()
                 if self._qa_chain is None:
                     logger.warning("RAG: QA chain build failed — falling back to extractive mode")
             else:
@@ -428,8 +762,60 @@ class ResumeRAGEngine:
             logger.error(f"RAG build_vectorstore failed — {e}", exc_info=True)
             return False
 
-    # ── ask() — UNCHANGED ─────────────────────────────────────────────────────
-    def ask(self, question: str) -> Dict:
+    def _resume_documents(self, resume_text: str, structure: Optional[Any]) -> List[ChunkDoc]:
+        if structure is None:
+            from resume_segmenter import segment_resume
+            structure = segment_resume(resume_text)
+
+        docs: List[ChunkDoc] = []
+        if not structure.kinds:
+            for chunk in self._splitter.split_text(resume_text):
+                chunk = chunk.strip()
+                if chunk:
+                    docs.append(ChunkDoc(chunk, {"source": "resume"}))
+            return docs
+
+        # Sections are chunk boundaries: a long section is split on its own
+        # (no overlap), consecutive short ones are packed together up to the
+        # chunk size. Every chunk is flagged with each section it contains
+        # ("in_<kind>": True) so section filters are exact.
+        def emit(texts: List[str], kinds: List[str]):
+            meta = {"source": "resume", "section": kinds[0]}
+            meta.update({f"in_{k}": True for k in kinds})
+            docs.append(ChunkDoc("\n\n".join(texts), meta))
+
+        limit = self.CHUNK_SIZE
+        buf_texts: List[str] = []
+        buf_kinds: List[str] = []
+        for section in structure.sections:
+            body = section.text.strip()
+            if len(body) > limit:
+                if buf_texts:
+                    emit(buf_texts, buf_kinds)
+                    buf_texts, buf_kinds = [], []
+                for chunk in self._section_splitter.split_text(body):
+                    chunk = chunk.strip()
+                    if chunk:
+                        emit([chunk], [section.kind])
+                continue
+            if buf_texts and sum(map(len, buf_texts)) + len(body) + 2 > limit:
+                emit(buf_texts, buf_kinds)
+                buf_texts, buf_kinds = [], []
+            buf_texts.append(body)
+            if section.kind not in buf_kinds:
+                buf_kinds.append(section.kind)
+        if buf_texts:
+            emit(buf_texts, buf_kinds)
+        return docs
+
+    # ── ask() ─────────────────────────────────────────────────────────────────
+    # One query embedding + one similarity search, then (if available) one
+    # LLM call over the retrieved chunks. "context" in the result reports the
+    # prompt context's size and redundancy (ChromaVectorStore.retrieve).
+    def ask(self, question: str, sections: Optional[List[str]] = None) -> Dict:
+        """Answer from the index. `sections` limits retrieval to resume chunks of
+        those kinds (JD chunks stay eligible); falls back to the whole index if
+        none of them were found in the resume."""
         if not self._ready or self._store is None:
             return {
                 "answer": "RAG engine is not ready. Call build_vectorstore() first.",
@@ -438,28 +824,64 @@ class ResumeRAGEngine:
             }
 
         try:
+            top_docs = []
+            if sections:
+                top_docs, context = self._store.retrieve(question, k=self.TOP_K, sections=sections)
+            if not top_docs:
+                top_docs, context = self._store.retrieve(question, k=self.TOP_K)
+            sources  = self._format_sources(top_docs)
+
             if self._qa_chain is not None:
-                raw_answer = self._qa_chain.invoke(question)
+                raw_answer = memoized(
+                    "rag", content_hash(question, [d.page_content for d in top_docs]),
+                    lambda: self._qa_chain.invoke({"docs": top_docs, "question": question}),
+                )
                 answer     = self._clean_answer(raw_answer)
-                top_docs   = self._store.similarity_search(question, k=4)
-                sources    = self._format_sources(top_docs)
-                return {"answer": answer, "sources": sources, "mode": "llm"}
+                return {"answer": answer, "sources": sources, "mode": "llm", "context": context}
 
-            top_docs = self._store.similarity_search(question, k=4)
-            sources  = self._format_sources(top_docs)
             answer   = top_docs[0].page_content.strip() if top_docs else "No relevant content found."
-            return {"answer": answer, "sources": sources, "mode": "extractive"}
+            return {"answer": answer, "sources": sources, "mode": "extractive", "context": context}
 
+        except LLMRejected as e:
+            logger.warning(f"RAG ask() not admitted — {e}")
+            return {"answer": "The AI service is busy. Please try again shortly.", "sources": [], "mode": "busy"}
         except Exception as e:
             logger.error(f"RAG ask() failed — {e}", exc_info=True)
             return {"answer": "An error occurred. Please try again.", "sources": [], "mode": "error"}
 
-    # ── Convenience wrappers — UNCHANGED ──────────────────────────────────────
+    # ── Lifecycle ─────────────────────────────────────────────────────────────
+    @property
+    def ready(self) -> bool:
+        return self._ready
+
+    def approx_bytes(self) -> int:
+        """Rough per-session footprint: chunk text + vectors + HNSW links."""
+        if self._store is None:
+            return 0
+        return self._store.approx_bytes()
+
+    def resume_vector(self) -> Optional[Any]:
+        return self._store.resume_vector() if self._store is not None else None
+
+    def cleanup(self):
+        """Release the vector store (deletes its Chroma collection)."""
+        if self._store is not None:
+            self._store.cleanup()
+        self._store     = None
+        self._retriever = None
+        self._qa_chain  = None
+        self._ready     = False
+
+    # ── Convenience wrappers ──────────────────────────────────────────────────
+    # get_targeted_feedback() maps its label to section kinds, so retrieval only
+    # sees the matching resume sections (plus JD chunks).
     def get_targeted_feedback(self, section: str) -> str:
+        from resume_segmenter import kinds_for_label
         result = self.ask(
             f"Looking at the '{section}' section of this resume, "
             f"give exactly 3 numbered, specific, actionable improvement suggestions. "
-            f"Reference actual content from the resume in each suggestion."
+            f"Reference actual content from the resume in each suggestion.",
+            sections=kinds_for_label(section),
         )
         return result.get("answer", "No feedback available.")
 
@@ -472,3 +894,36 @@ class ResumeRAGEngine:
             "(3) One specific, concrete change to strengthen this resume for the role."
         )
         return result.get("answer", "No insights available.")
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Process warm-up
+# Loads the shared embedding model and imports the RAG stack up front. Meant
+# for the gunicorn master under --preload, so forked workers inherit the pages
+# copy-on-write instead of each paying the load on their first request.
+# ─────────────────────────────────────────────────────────────────────────────
+_PRELOAD_MODULES = (
+    "numpy",
+    "chromadb",
+    "huggingface_hub",
+    "langchain_core.documents",
+    "langchain_core.prompts",
+    "langchain_core.runnables",
+    "langchain_core.retrievers",
+    "langchain_core.language_models.chat_models",
+    "langchain_text_splitters",
+)
+
+
+def preload() -> Dict[str, bool]:
+    import importlib
+    loaded = {}
+    for name in _PRELOAD_MODULES:
+        try:
+            importlib.import_module(name)
+            loaded[name] = True
+        except ImportError:
+            loaded[name] = False
+    loaded["embeddings"] = STEmbeddings().ready
+    logger.info(f"RAG preload: {loaded}")
+    return loaded
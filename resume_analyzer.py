@@ -1,26 +1,61 @@
 # resume_analyzer.py
+#
+# docx, PyPDF2, huggingface_hub and rag_engine are imported on first use so
+# that `import app` stays fast; warm_up() pulls them in ahead of time.
 
 import os
 import re
-from typing import Dict, List, Optional, Tuple
-import docx
-import PyPDF2
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
 from dotenv import load_dotenv
 import logging
-from huggingface_hub import InferenceClient
-from rag_engine import ResumeRAGEngine
+from metrics import active_recorder, count, memory_trace, stage
+from session_store import (RAGSessionStore, StoredText, extract_cache_from_env, memo_store_from_env,
+                           text_store_from_env)
+from resume_segmenter import ResumeStructure, segment_resume
+from jd_index import get_shared_jd_index
+from skill_matcher import SkillMatcher
+from incremental import AnalysisMemo, content_hash, memoized
+from llm_limiter import LLMRejected, get_llm_limiter, interactive, track_rejections
+from context_packer import count_tokens, get_token_counter, pack_for
+from cpu_pool import CPUPool
+from profiling import get_request_profiler
+from extractors import UnsupportedFormat, file_hash, get_extractors
+from candidate_index import get_candidate_index
 
 load_dotenv()
 logging.basicConfig(level=logging.INFO)
 
 
+# Outputs analyze_resume() can skip; None computes all but full_text
+OPTIONAL_OUTPUTS = ('ai_feedback', 'enhanced_bullets', 'rag_insights', 'full_text')
+
+
+def rag_enabled() -> bool:
+    """RAG_ENABLED=0 skips the RAG pipeline (e.g. to benchmark the rule-based path)."""
+    return os.getenv("RAG_ENABLED", "1").strip().lower() not in ("0", "false", "no", "off")
+
+
 class ResumeAnalyzer:
 
     def __init__(self):
-        self.client = None
-        self.llm    = None
+        self._llm_model   = None
+        self._llm_token   = None
+        self._skill_regex = None
         self._initialize_llm()
 
+        # Built RAG engines kept for /chat follow-ups, keyed by session id
+        self.rag_sessions = RAGSessionStore.from_env()
+        # Previous upload's work per session, for incremental re-analysis
+        self.memos        = memo_store_from_env()
+        # Extracted text by text_id, so clients don't post the resume back
+        self.texts        = text_store_from_env()
+        # Extracted text by upload content hash: re-uploads skip parsing
+        self.extracted    = extract_cache_from_env()
+        # Extraction + scoring off the request thread when CPU_POOL_WORKERS > 0
+        self.cpu_pool     = CPUPool.from_env()
+
         self.technical_skills = [
             'python', 'java', 'javascript', 'react', 'node.js', 'html', 'css',
             'sql', 'mongodb', 'mysql', 'postgresql', 'git', 'docker', 'aws',
@@ -86,6 +121,8 @@ class ResumeAnalyzer:
             'professional experience', 'publications', 'awards', 'internship',
         ]
 
+        self.skill_matcher = SkillMatcher.default(self.technical_skills)
+
         self.education_keywords = [
             'university', 'college', 'degree', 'bachelor', 'master', 'phd',
             'diploma', 'certification', 'course', 'training', 'institute',
@@ -98,33 +135,83 @@ class ResumeAnalyzer:
         if not token:
             logging.warning("HUGGINGFACE_API_TOKEN not set — AI features disabled")
             return
-        try:
-            self.client = InferenceClient(
-                model="mistralai/Mistral-7B-Instruct-v0.2",
-                token=token
-            )
-            self.llm = self.client
-            logging.info("HuggingFace InferenceClient initialised")
-        except Exception as e:
-            logging.error(f"LLM init failed: {e}")
+        # HF_INFERENCE_ENDPOINT points the client at a self-hosted or
+        # stub endpoint (see benchmarks/stub_llm.py) instead of the hub.
+        self._llm_token = token
+        self._llm_model = os.getenv("HF_INFERENCE_ENDPOINT") or "mistralai/Mistral-7B-Instruct-v0.2"
+
+    @property
+    def ai_configured(self) -> bool:
+        """True when an LLM model and token are set; imports nothing (each
+        call builds its own client, see _call_client)."""
+        return bool(self._llm_model and self._llm_token)
+
+    def warm_up(self) -> Dict[str, bool]:
+        """Import lazy dependencies (huggingface_hub too when AI is configured)
+        and compile matchers."""
+        status = {}
+        for name in ("docx", "PyPDF2") + (("huggingface_hub",) if self.ai_configured else ()):
+            try:
+                __import__(name)
+                status[name] = True
+            except ImportError:
+                status[name] = False
+        status["llm_client"] = self.ai_configured and status.get("huggingface_hub", False)
+        self._skill_matchers()
+        status["skill_matchers"] = True
+        status["skill_matrix"] = self.skill_matcher.matrix(build_if_missing=True) is not None
+        status["exact_tokenizer"] = get_token_counter(download=True).exact
+        from rag_engine import preload
+        status.update(preload())
+        return status
 
     def _llm_call(self, messages: List[Dict], max_tokens: int = 500) -> Optional[str]:
-        if not self.client:
+        if not self.ai_configured:
             return None
+        # identical prompt as in the session's previous upload → reuse the answer
+        return memoized("llm", content_hash(messages, max_tokens),
+                        lambda: self._llm_complete(messages, max_tokens))
+
+    def _llm_complete(self, messages: List[Dict], max_tokens: int) -> Optional[str]:
+        count("llm_calls")
+        if active_recorder() is not None:     # tokenizing every prompt isn't free
+            count("prompt_tokens", sum(count_tokens(m["content"]) for m in messages))
         try:
-            resp = self.client.chat_completion(
-                messages=messages,
-                max_tokens=max_tokens,
-                temperature=0.7,
-                top_p=0.95,
-            )
+            # admission control: rate/concurrency limited, interactive first
+            with get_llm_limiter().slot(), self._call_client() as client:
+                resp = client.chat_completion(
+                    messages=messages,
+                    max_tokens=max_tokens,
+                    temperature=0.7,
+                    top_p=0.95,
+                )
             return resp.choices[0].message.content.strip()
+        except LLMRejected as e:
+            logging.warning(f"LLM call skipped — {e}")
+            return None
         except Exception as e:
             logging.error(f"LLM call error: {e}")
             return None
 
+    @contextmanager
+    def _call_client(self):
+        """An InferenceClient for one call. Recent huggingface_hub versions keep
+        every response open on the client until close(), so a long-lived
+        client grows with each call; a client is only configuration (the HTTP
+        session is shared), so creating one per call is cheap."""
+        from huggingface_hub import InferenceClient
+        client = InferenceClient(model=self._llm_model, token=self._llm_token)
+        try:
+            yield client
+        finally:
+            close = getattr(client, "close", None)
+            if close is not None:
+                close()
+
     # ─── ATS Scoring (realistic 6-dimension rubric, max 100) ──────────────────
-    def calculate_score_and_breakdown(self, text: str, skills: Dict) -> Tuple[int, Dict]:
+    def calculate_score_and_breakdown(
+        self, text: str, skills: Dict, structure: Optional[ResumeStructure] = None
+    ) -> Tuple[int, Dict]:
         """
         Scores across 6 dimensions:
           Contact Info  →  10 pts   email, phone, LinkedIn, GitHub
@@ -133,6 +220,10 @@ class ResumeAnalyzer:
           Experience    →  20 pts   section presence, titles, date ranges, bullets
           Skills        →  25 pts   tech count, soft count, dedicated section
           Structure     →  20 pts   distinct section categories found
+
+        With `structure` (from segment_resume), Structure counts sections that
+        have an actual heading; without one, or if no headings were detected,
+        it falls back to keyword presence anywhere in the text.
         """
         bd = {
             'Contact Info': 0,
@@ -211,6 +302,10 @@ class ResumeAnalyzer:
         for cat, variants in mapping.items():
             if any(v in tl for v in variants):
                 cats.add(cat)
+        # headings the segmenter recognised count too (same category names) —
+        # a union, so a resume never scores lower than on keywords alone
+        if structure is not None:
+            cats.update(structure.kinds)
         st = len(cats) * 3
         if re.search(r'[A-Z][a-z]+ [A-Z][a-z]+', text[:200]): st += 2  # name detected
         if len(cats) < 3: st -= 4
@@ -219,7 +314,12 @@ class ResumeAnalyzer:
         return min(100, max(0, sum(bd.values()))), bd
 
     # ─── AI feedback ─────────────────────────────────────────────────────────
-    def generate_ai_feedback(self, text: str, skills: Dict, score: int) -> str:
+    def generate_ai_feedback(
+        self, text: str, skills: Dict, score: int, structure: Optional[ResumeStructure] = None
+    ) -> str:
+        if not self.ai_configured:
+            return self._fallback_feedback(skills, score)
+        context = pack_for("feedback", text, structure=structure)["resume"].text
         msg = [
             {"role": "system", "content": (
                 "You are a professional resume coach. "
@@ -229,7 +329,7 @@ class ResumeAnalyzer:
                 "weak action verbs, missing sections, or thin skills."
             )},
             {"role": "user", "content": (
-                f"ATS score: {score}/100.\n\nResume:\n---\n{text[:1500]}\n---\n\n"
+                f"ATS score: {score}/100.\n\nResume:\n---\n{context}\n---\n\n"
                 "Give 5 concrete improvement tips."
             )},
         ]
@@ -254,25 +354,35 @@ class ResumeAnalyzer:
 
     # ─── Job comparison ───────────────────────────────────────────────────────
     def ai_enhanced_job_comparison(
-        self, resume_text: str, jd_text: str, resume_skills: List[str]
+        self, resume_text: str, jd_text: str, resume_skills: List[str],
+        structure: Optional[ResumeStructure] = None,
     ) -> Optional[Dict]:
         if not jd_text or not jd_text.strip():
             return None
-        jd_skills = self.extract_skills(jd_text)['technical']
-        matching  = sorted(set(resume_skills) & set(jd_skills))
-        missing   = sorted(set(jd_skills) - set(resume_skills))
-        match_pct = int(len(matching) / len(jd_skills) * 100) if jd_skills else 0
+        # content-addressed: each distinct JD is scanned once
+        jd_skills  = get_shared_jd_index().skills(jd_text, self.extract_jd_skills)['technical']
+        matcher    = self.skill_matcher
+        resume_ids = sorted(set(matcher.find(resume_text)) | set(matcher.ids_for(resume_skills)))
+        jd_ids     = matcher.ids_for(jd_skills)
+        # aliases are canonicalised ("k8s" → kubernetes); with the skill matrix
+        # available, near-synonyms above the similarity threshold also match
+        matched    = matcher.match(resume_ids, jd_ids)
+        matching   = matched['matching']
+        missing    = matched['missing']
+        match_pct  = int(len(matching) / len(jd_ids) * 100) if jd_ids else 0
         result = {
             'match_score':      match_pct,
             'matching_skills':  matching,
             'missing_skills':   missing,
+            'semantic_matches': matched['semantic_matches'],
             'ai_insights':      "AI insights unavailable.",
             'jd_text':          jd_text,
         }
-        if self.client:
+        if self.ai_configured:
+            ctx = pack_for("job_match", resume_text, jd_text, structure, jd_query=" ".join(jd_skills))
             ai = self._llm_call([
                 {"role": "system", "content": "Career advisor. Give 3 concise insights: (1) key strengths, (2) critical gaps, (3) one actionable tip."},
-                {"role": "user", "content": f"Resume:\n{resume_text[:800]}\n\nJD:\n{jd_text[:800]}"},
+                {"role": "user", "content": f"Resume:\n{ctx['resume'].text}\n\nJD:\n{ctx['jd'].text}"},
             ], max_tokens=300)
             if ai:
                 result['ai_insights'] = ai
@@ -281,7 +391,7 @@ class ResumeAnalyzer:
     # ─── Bullet enhancement ───────────────────────────────────────────────────
     def enhance_bullet_points(self, text: str) -> list:
         bullets = re.findall(r'^\s*[\*•-]\s*(.*)', text, re.MULTILINE)
-        if not self.client or not bullets:
+        if not self.ai_configured or not bullets:
             return []
         suggestions = []
         for bullet in bullets[:5]:
@@ -297,49 +407,41 @@ class ResumeAnalyzer:
 
     # ─── Cover letter ─────────────────────────────────────────────────────────
     def generate_cover_letter(self, resume_text: str, jd_text: Optional[str]) -> Optional[str]:
-        if not self.client:
+        if not self.ai_configured:
             return None
+        jd_skills = (get_shared_jd_index().skills(jd_text, self.extract_jd_skills)['technical']
+                     if jd_text else [])
+        ctx = pack_for("cover_letter", resume_text, jd_text, jd_query=" ".join(jd_skills))
         prompt = (
             "Write a professional cover letter. Highlight 2-3 key skills. "
             "Structure: introduction, body, conclusion.\n\n"
-            f"RESUME:\n{resume_text[:2000]}\n\n"
-            f"JOB DESCRIPTION:\n{jd_text[:1500] if jd_text else '(None — write general cover letter.)'}"
+            f"RESUME:\n{ctx['resume'].text}\n\n"
+            f"JOB DESCRIPTION:\n{ctx['jd'].text if jd_text else '(None — write general cover letter.)'}"
         )
-        return self._llm_call([
-            {"role": "system", "content": "World-class career coach who writes compelling cover letters."},
-            {"role": "user",   "content": prompt},
-        ], max_tokens=700)
+        with interactive():
+            return self._llm_call([
+                {"role": "system", "content": "World-class career coach who writes compelling cover letters."},
+                {"role": "user",   "content": prompt},
+            ], max_tokens=700)
 
     # ─── Text extraction ──────────────────────────────────────────────────────
-    def extract_text_from_pdf(self, path: str) -> str:
+    # The format is sniffed from the bytes (extractors.py). Extractors take
+    # raw bytes so the CPU pool (cpu_pool.py) can run them in another process
+    # without sharing a file path.
+    def extract_text_from_bytes(self, data: bytes) -> str:
         try:
-            t = ""
-            with open(path, 'rb') as f:
-                for page in PyPDF2.PdfReader(f).pages:
-                    t += (page.extract_text() or "") + "\n"
-            return t.strip()
-        except Exception as e:
-            logging.error(f"PDF error: {e}"); return ""
-
-    def extract_text_from_docx(self, path: str) -> str:
-        try:
-            return "\n".join(p.text for p in docx.Document(path).paragraphs).strip()
-        except Exception as e:
-            logging.error(f"DOCX error: {e}"); return ""
-
-    def extract_text_from_txt(self, path: str) -> str:
-        try:
-            with open(path, 'r', encoding='utf-8', errors='ignore') as f:
-                return f.read().strip()
-        except Exception as e:
-            logging.error(f"TXT error: {e}"); return ""
+            return get_extractors().extract(data).text
+        except UnsupportedFormat as e:
+            logging.warning(f"Extraction skipped — {e}")
+            return ""
 
     def extract_text(self, path: str) -> str:
-        ext = os.path.splitext(path)[1].lower()
-        if ext == '.pdf':             return self.extract_text_from_pdf(path)
-        if ext in ('.docx', '.doc'): return self.extract_text_from_docx(path)
-        if ext == '.txt':             return self.extract_text_from_txt(path)
-        return ""
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError as e:
+            logging.error(f"Read error: {e}"); return ""
+        return self.extract_text_from_bytes(data)
 
     def is_resume(self, text: str) -> bool:
         tl   = text.lower()
@@ -348,89 +450,344 @@ class ResumeAnalyzer:
         phone = bool(re.search(r'(\+\d{1,3}[-.\s]?)?\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}', text))
         return secs >= 2 and (email or phone) and len(text.split()) > 50
 
+    def _skill_matchers(self) -> Dict[str, List[Tuple[str, "re.Pattern"]]]:
+        # Compiled once per analyzer instead of going through re's internal
+        # cache (~90 patterns) on every call.
+        if self._skill_regex is None:
+            self._skill_regex = {
+                kind: [(s, re.compile(r'\b' + re.escape(s) + r'\b')) for s in skills]
+                for kind, skills in (('technical', self.technical_skills), ('soft', self.soft_skills))
+            }
+        return self._skill_regex
+
     def extract_skills(self, text: str) -> Dict[str, List[str]]:
-        tl   = text.lower()
-        tech = sorted({s for s in self.technical_skills if re.search(r'\b' + re.escape(s) + r'\b', tl)})
-        soft = sorted({s for s in self.soft_skills     if re.search(r'\b' + re.escape(s) + r'\b', tl)})
+        tl       = text.lower()
+        matchers = self._skill_matchers()
+        tech = sorted({s for s, rx in matchers['technical'] if rx.search(tl)})
+        soft = sorted({s for s, rx in matchers['soft']      if rx.search(tl)})
         return {'technical': tech, 'soft': soft}
 
+    def extract_skills_by_section(self, structure: ResumeStructure) -> Dict[str, List[str]]:
+        """Union of per-section skill hits; unchanged sections are memoized."""
+        tech, soft = set(), set()
+        for section in structure.sections:
+            hits = memoized("skills", content_hash(section.text),
+                            lambda t=section.text: self.extract_skills(t))
+            tech.update(hits['technical'])
+            soft.update(hits['soft'])
+        return {'technical': sorted(tech), 'soft': sorted(soft)}
+
+    def extract_jd_skills(self, text: str) -> Dict[str, List[str]]:
+        """Taxonomy skills (incl. aliases, canonicalised) mentioned in a JD.
+        The keyword scan used before the taxonomy is kept as a floor, so a
+        skill it finds is never lost to tokenisation."""
+        m = self.skill_matcher
+        ids = set(m.find(text)) | set(m.ids_for(self.extract_skills(text)['technical']))
+        return {'technical': [m.terms[i] for i in sorted(ids)], 'soft': []}
+
     def calculate_job_profile_match(self, skills: List[str]) -> Dict[str, int]:
         return {
             p: min(100, int(len([s for s in skills if s in kws]) / len(kws) * 100))
             for p, kws in self.job_profiles.items()
         }
 
+    # ─── CPU stages ───────────────────────────────────────────────────────────
+    def cpu_features(self, data: bytes, text: Optional[str] = None) -> Dict:
+        """Extract, segment, scan skills and score: the GIL-bound part of an
+        analysis. Returns a compact, picklable dict (or {'error': ...}) so it
+        can run in a cpu_pool worker. Pass `text` when the upload's text is
+        already known (extract cache); otherwise the result also carries the
+        sniffed 'format' and 'extract_seconds'."""
+        extraction = None
+        if text is None:
+            with stage("extract"):
+                try:
+                    extraction = get_extractors().extract(data)
+                except UnsupportedFormat as e:
+                    return {'error': str(e)}
+            text = extraction.text
+        if not text:
+            return {'error': 'Could not extract text from the file.'}
+        if not self.is_resume(text):
+            return {'error': 'The uploaded file does not appear to be a resume.'}
+        with stage("score"):
+            structure        = segment_resume(text)
+            skills           = self.extract_skills_by_section(structure)
+            score, breakdown = self.calculate_score_and_breakdown(text, skills, structure)
+        out = {
+            'text':            text,
+            'structure':       structure,
+            'skills':          skills,
+            'score':           score,
+            'breakdown':       breakdown,
+            'profile_matches': self.calculate_job_profile_match(skills['technical']),
+        }
+        if extraction is not None:
+            out['format']          = extraction.format
+            out['extract_seconds'] = extraction.seconds
+        return out
+
+    # ─── Candidate search ─────────────────────────────────────────────────────
+    def candidate_skills(self, text: str, skills: Dict[str, List[str]]) -> List[str]:
+        """Canonical skill terms indexed for a candidate: taxonomy hits plus
+        the technical / soft skills shown in the result."""
+        m = self.skill_matcher
+        return sorted({m.terms[i] for i in m.find(text)}
+                      | {m.canonical(s) for s in skills['technical'] + skills['soft']})
+
+    def _record_candidate(self, index, key: str, filename: Optional[str], text: str, score: int,
+                          breakdown: Dict, skills: Dict[str, List[str]], vector) -> None:
+        try:
+            index.add(key, filename, score, breakdown, self.candidate_skills(text, skills), vector)
+        except Exception as e:
+            logging.error(f"Candidate index: could not record {filename} — {e}")
+
+    def search_candidates(
+        self,
+        skills: Iterable[str] = (),
+        any_skills: Iterable[str] = (),
+        min_score: Optional[int] = None,
+        query: Optional[str] = None,
+        k: int = 20,
+    ) -> Dict:
+        """Search every candidate recorded with CANDIDATE_INDEX=1: all of
+        `skills`, any of `any_skills` (aliases resolved), score ≥ min_score,
+        ranked by similarity to the free-text `query` or else by score."""
+        index = get_candidate_index()
+        if index is None:
+            return {'success': False, 'error': 'Candidate search is not enabled.'}
+        qvec = None
+        if query:
+            from rag_engine import STEmbeddings
+            emb = STEmbeddings()
+            if not emb.ready:
+                return {'success': False, 'error': 'Semantic search is unavailable (no embedding model).'}
+            qvec = emb.embed_query(query)
+        canon = self.skill_matcher.canonical
+        result = index.search(
+            skills_all=[canon(s) for s in skills if s.strip()],
+            skills_any=[canon(s) for s in any_skills if s.strip()],
+            min_score=min_score, qvec=qvec, k=k,
+        )
+        return {'success': True, **result}
+
+    # ─── Resume chat ──────────────────────────────────────────────────────────
+    def ask_resume(self, session_id: Optional[str], question: str) -> Optional[Dict]:
+        """Answer a follow-up question from the session's stored RAG index.
+        Returns None when the session has no (or an evicted) index."""
+        rag = self.rag_sessions.get(session_id)
+        if rag is None:
+            return None
+        with interactive():
+            return rag.ask(question)
+
     # ─── Main entry point ─────────────────────────────────────────────────────
     def analyze_resume(
-        self, file_path: str, job_description_text: Optional[str] = None
+        self,
+        file_path: str,
+        job_description_text: Optional[str] = None,
+        session_id: Optional[str] = None,
+        include: Optional[Iterable[str]] = None,
+        profile: Optional[bool] = None,
     ) -> Dict:
+        """analyze_bytes() for a file on disk."""
         try:
-            text = self.extract_text(file_path)
-            if not text:
-                return {'success': False, 'error': 'Could not extract text from the file.'}
-            if not self.is_resume(text):
-                return {'success': False, 'error': 'The uploaded file does not appear to be a resume.'}
-
-            skills           = self.extract_skills(text)
-            score, breakdown = self.calculate_score_and_breakdown(text, skills)
-            profile_matches  = self.calculate_job_profile_match(skills['technical'])
-            job_comparison   = self.ai_enhanced_job_comparison(text, job_description_text, skills['technical'])
-            ai_feedback      = self.generate_ai_feedback(text, skills, score)
-            enhanced_bullets = self.enhance_bullet_points(text)
-
-            # ── RAG Pipeline ─────────────────────────────────────────────────
-            rag_insights = {"rag_available": False}
-            hf_token     = os.getenv("HUGGINGFACE_API_TOKEN", "")
-
-            if hf_token:
-                try:
-                    rag = ResumeRAGEngine(hf_api_token=hf_token)
-
-                    # Check embeddings via .ready property (STEmbeddings always
-                    # exists as an object, but may have failed to load the model)
-                    if not rag._embeddings.ready:
-                        logging.error(
-                            "RAG SKIPPED: sentence-transformers embeddings failed to load.\n"
-                            "  Fix: pip install sentence-transformers torch"
-                        )
-                    elif not rag.build_vectorstore(text, job_description_text):
-                        logging.error("RAG SKIPPED: build_vectorstore() returned False")
-                    else:
+            with open(file_path, 'rb') as f:
+                data = f.read()
+        except OSError as e:
+            logging.error(f"Read error: {e}")
+            return {'success': False, 'error': 'Could not read the uploaded file.'}
+        return self.analyze_bytes(data, job_description_text, session_id, include, profile,
+                                  filename=os.path.basename(file_path))
+
+    def analyze_bytes(
+        self,
+        data: bytes,
+        job_description_text: Optional[str] = None,
+        session_id: Optional[str] = None,
+        include: Optional[Iterable[str]] = None,
+        profile: Optional[bool] = None,
+        filename: Optional[str] = None,
+    ) -> Dict:
+        """Run the full analysis of an upload's bytes. With session_id, the
+        built RAG engine is kept in self.rag_sessions for follow-up questions
+        via ask_resume(), and the session's previous upload is reused: only LLM
+        prompts, embeddings and skill scans whose input changed are recomputed
+        (see incremental.py). Text extracted from identical bytes is reused
+        across all users (self.extracted).
+
+        `include` lists the OPTIONAL_OUTPUTS to compute (None = all except
+        full_text). The extracted text is kept server-side; the result carries
+        its text_id for get_text() / generate_cover_letter.
+
+        `profile`: True records a profile (see profiling.py) and returns its
+        profile_id, False never does, None follows PROFILE_SAMPLE_RATE. With
+        MEMORY_DEBUG, the allocations the call leaves behind are logged."""
+        profiler = get_request_profiler()
+        if profile or (profile is None and profiler.should_profile()):
+            with profiler.profile(label="analyze_resume") as profile_id, memory_trace("analyze_resume"):
+                result = self._analyze_session(data, filename, job_description_text, session_id, include)
+            result['profile_id'] = profile_id
+            return result
+        with memory_trace("analyze_resume"):
+            return self._analyze_session(data, filename, job_description_text, session_id, include)
+
+    def _analyze_session(
+        self,
+        data: bytes,
+        filename: Optional[str],
+        job_description_text: Optional[str],
+        session_id: Optional[str],
+        include: Optional[Iterable[str]],
+    ) -> Dict:
+        include  = set(OPTIONAL_OUTPUTS[:-1] if include is None else include)
+        previous = self.memos.get(session_id)
+        memo     = AnalysisMemo(previous)
+        try:
+            with memo.activate(), track_rejections() as rejected:
+                result = self._analyze(data, filename, job_description_text, session_id, memo, include)
+        except Exception as e:
+            logging.error(f"analyze_resume error: {e}", exc_info=True)
+            return {'success': False, 'error': 'An unexpected error occurred during analysis.'}
+        if result.get('success'):
+            if rejected:
+                # the limiter turned calls away; those outputs are rule-based
+                result['degraded'] = {'reason': 'llm_busy', 'llm_calls_rejected': len(rejected)}
+            text = result.pop('full_text')
+            result['text_id']     = self.store_text(text, job_description_text)
+            result['incremental'] = memo.report(previous)
+            if 'full_text' in include:
+                result['full_text'] = text
+            if session_id:
+                self.memos.put(session_id, memo)
+        return result
+
+    def store_text(self, resume_text: str, jd_text: Optional[str] = None) -> str:
+        text_id = uuid.uuid4().hex
+        self.texts.put(text_id, StoredText(resume_text, jd_text or None))
+        return text_id
+
+    def get_text(self, text_id: Optional[str]) -> Optional[StoredText]:
+        """Stored text for a text_id, or None if unknown or expired."""
+        return self.texts.get(text_id)
+
+    def _analyze(
+        self,
+        data: bytes,
+        filename: Optional[str],
+        job_description_text: Optional[str],
+        session_id: Optional[str],
+        memo: AnalysisMemo,
+        include: set,
+    ) -> Dict:
+        key      = file_hash(data)
+        cached   = self.extracted.get(key)
+        features = self.cpu_pool.features(self, data, text=cached.resume_text if cached else None)
+        count("extract_cache_hit" if cached else "extract_cache_miss")
+        if 'format' in features:
+            get_extractors().record(features['format'], features['extract_seconds'])
+        if 'error' in features:
+            return {'success': False, 'error': features['error']}
+        if cached is None:
+            self.extracted.put(key, StoredText(features['text'], None))
+        text            = features['text']
+        structure       = features['structure']
+        skills          = features['skills']
+        score           = features['score']
+        breakdown       = features['breakdown']
+        profile_matches = features['profile_matches']
+        memo.record_version(text, {
+            kind: content_hash(structure.text_of([kind]))
+            for kind in {s.kind for s in structure.sections}
+        })
+        with stage("job_comparison"):
+            job_comparison   = self.ai_enhanced_job_comparison(
+                text, job_description_text, skills['technical'], structure)
+        optional = {}
+        if 'ai_feedback' in include:
+            with stage("ai_feedback"):
+                optional['ai_feedback']      = self.generate_ai_feedback(text, skills, score, structure)
+        if 'enhanced_bullets' in include:
+            with stage("bullets"):
+                optional['enhanced_bullets'] = self.enhance_bullet_points(text)
+
+        # ── RAG Pipeline ─────────────────────────────────────────────────
+        rag_insights = {"rag_available": False}
+        hf_token     = os.getenv("HUGGINGFACE_API_TOKEN", "")
+        rag          = None
+        rag_kept     = False
+        resume_vec   = None
+
+        if 'rag_insights' not in include:
+            logging.info("RAG SKIPPED: not requested")
+        elif not rag_enabled():
+            logging.info("RAG SKIPPED: disabled via RAG_ENABLED")
+        elif hf_token:
+            try:
+                from rag_engine import ResumeRAGEngine
+                with stage("rag_build"):
+                    rag   = ResumeRAGEngine(hf_api_token=hf_token)
+                    built = (
+                        rag._embeddings.ready
+                        and rag.build_vectorstore(text, job_description_text, structure)
+                    )
+
+                # Check embeddings via .ready property (STEmbeddings always
+                # exists as an object, but may have failed to load the model)
+                if not rag._embeddings.ready:
+                    logging.error(
+                        "RAG SKIPPED: sentence-transformers embeddings failed to load.\n"
+                        "  Fix: pip install sentence-transformers torch"
+                    )
+                elif not built:
+                    logging.error("RAG SKIPPED: build_vectorstore() returned False")
+                else:
+                    resume_vec = rag.resume_vector()
+                    with stage("rag_query"):
                         exp_fb = rag.get_targeted_feedback("work experience and projects")
                         ski_fb = rag.get_targeted_feedback("technical skills")
                         jd_sem = (
                             rag.get_semantic_jd_match_insights()
                             if job_description_text else None
                         )
-                        rag_insights = {
-                            "rag_available":       True,
-                            "experience_feedback": exp_fb,
-                            "skills_feedback":     ski_fb,
-                            "jd_semantic_match":   jd_sem,
-                        }
-                        logging.info("RAG: all insights generated successfully")
-
-                except Exception as e:
-                    logging.error(f"RAG pipeline error: {e}", exc_info=True)
-            else:
-                logging.warning("RAG SKIPPED: HUGGINGFACE_API_TOKEN not set")
-            # ─────────────────────────────────────────────────────────────────
-
-            return {
-                'success':             True,
-                'filename':            os.path.basename(file_path),
-                'score':               score,
-                'skills':              skills,
-                'score_breakdown':     breakdown,
-                'job_profile_matches': profile_matches,
-                'job_comparison':      job_comparison,
-                'ai_feedback':         ai_feedback,
-                'enhanced_bullets':    enhanced_bullets,
-                'full_text':           text,
-                'ai_powered':          self.client is not None,
-                'rag_insights':        rag_insights,
-            }
+                    rag_insights = {
+                        "rag_available":       True,
+                        "experience_feedback": exp_fb,
+                        "skills_feedback":     ski_fb,
+                        "jd_semantic_match":   jd_sem,
+                    }
+                    logging.info("RAG: all insights generated successfully")
+
+                    if session_id:
+                        self.rag_sessions.put(session_id, rag)
+                        rag_kept = True
+
+            except Exception as e:
+                logging.error(f"RAG pipeline error: {e}", exc_info=True)
+            finally:
+                if rag is not None and not rag_kept:
+                    rag.cleanup()
+        else:
+            logging.warning("RAG SKIPPED: HUGGINGFACE_API_TOKEN not set")
+        if 'rag_insights' in include:
+            optional['rag_insights'] = rag_insights
+        # ─────────────────────────────────────────────────────────────────
+
+        index = get_candidate_index()
+        if index is not None:
+            with stage("candidate_index"):
+                self._record_candidate(index, key, filename, text, score, breakdown, skills, resume_vec)
 
-        except Exception as e:
-            logging.error(f"analyze_resume error: {e}", exc_info=True)
-            return {'success': False, 'error': 'An unexpected error occurred during analysis.'}
\ No newline at end of file
+        return {
+            'success':             True,
+            'filename':            filename,
+            'score':               score,
+            'skills':              skills,
+            'score_breakdown':     breakdown,
+            'job_profile_matches': profile_matches,
+            'job_comparison':      job_comparison,
+            **optional,
+            'full_text':           text,
+            'ai_powered':          self.ai_configured,
+            'chat_available':      rag_kept,
+        }
\ No newline at end of file
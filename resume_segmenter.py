@@ -0,0 +1,95 @@
+# resume_segmenter.py
+# Parses resume text once into typed sections (experience, skills, ...).
+#
+# The result is shared by the scorer (Structure dimension), the RAG chunker
+# (sections become chunk boundaries and chunk metadata) and targeted feedback
+# (retrieval filtered to one section instead of a semantic guess).
+
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional
+
+# canonical kind → heading variants (lower-case, punctuation stripped)
+SECTION_HEADINGS: Dict[str, List[str]] = {
+    'summary':      ['summary', 'professional summary', 'career summary', 'objective',
+                     'career objective', 'profile', 'professional profile', 'about', 'about me'],
+    'contact':      ['contact', 'contact information', 'contact details', 'personal details'],
+    'experience':   ['experience', 'work experience', 'professional experience',
+                     'employment', 'employment history', 'work history', 'career history'],
+    'internship':   ['internship', 'internships', 'internship experience'],
+    'projects':     ['projects', 'personal projects', 'academic projects', 'key projects'],
+    'skills':       ['skills', 'technical skills', 'core competencies', 'technologies',
+                     'key skills', 'tools', 'tech stack', 'skills and tools'],
+    'education':    ['education', 'academic background', 'qualifications',
+                     'educational qualifications', 'academics'],
+    'achievements': ['achievements', 'certifications', 'certificates', 'awards',
+                     'honors', 'publications', 'accomplishments', 'awards and achievements'],
+}
+
+_HEADING_TO_KIND = {v: kind for kind, variants in SECTION_HEADINGS.items() for v in variants}
+_STRIP_RE = re.compile(r'[^a-z ]+')
+
+
+@dataclass
+class Section:
+    kind:    str          # canonical kind, or 'header' for text before the first heading
+    heading: str          # heading line as written ('' for the header block)
+    text:    str          # heading + body
+    start:   int = 0      # line offsets in the original text
+    end:     int = 0
+
+
+@dataclass
+class ResumeStructure:
+    sections: List[Section] = field(default_factory=list)
+
+    @property
+    def kinds(self) -> List[str]:
+        """Kinds found under a real heading, in document order, de-duplicated."""
+        seen: List[str] = []
+        for s in self.sections:
+            if s.kind != 'header' and s.kind not in seen:
+                seen.append(s.kind)
+        return seen
+
+    def get(self, kind: str) -> List[Section]:
+        return [s for s in self.sections if s.kind == kind]
+
+    def text_of(self, kinds: Iterable[str]) -> str:
+        wanted = set(kinds)
+        return "\n\n".join(s.text for s in self.sections if s.kind in wanted)
+
+
+def _heading_kind(line: str) -> Optional[str]:
+    stripped = line.strip().strip('#*•-_=:|').strip()
+    if not stripped or len(stripped) > 40 or len(stripped.split()) > 5:
+        return None
+    key = _STRIP_RE.sub('', stripped.lower().replace('&', ' and '))
+    key = re.sub(r'\s+', ' ', key).strip()
+    return _HEADING_TO_KIND.get(key)
+
+
+def segment_resume(text: str) -> ResumeStructure:
+    lines = text.split('\n')
+    sections: List[Section] = []
+    kind, heading, start = 'header', '', 0
+
+    def close(end: int):
+        body = "\n".join(lines[start:end]).strip()
+        if body:
+            sections.append(Section(kind=kind, heading=heading, text=body, start=start, end=end))
+
+    for i, line in enumerate(lines):
+        found = _heading_kind(line)
+        if found is not None:
+            close(i)
+            kind, heading, start = found, line.strip(), i
+    close(len(lines))
+    return ResumeStructure(sections=sections)
+
+
+def kinds_for_label(label: str) -> List[str]:
+    """Map a free-form label ('work experience and projects') to section kinds."""
+    ll = label.lower()
+    return [kind for kind, variants in SECTION_HEADINGS.items()
+            if any(re.search(r'\b' + re.escape(v) + r'\b', ll) for v in variants)]
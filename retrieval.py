@@ -0,0 +1,167 @@
+# retrieval.py
+# Retrieval helpers used alongside the dense (Chroma) index
+#
+# BM25Index        : compact in-process inverted index over the same chunks
+#                    that go into Chroma, for exact keyword hits (tool names,
+#                    acronyms, dates) that dense embeddings tend to blur.
+# reciprocal_rank_fusion : merges ranked lists without needing comparable scores.
+# mmr_select       : maximal marginal relevance over candidate embeddings
+#                    (numpy, imported on use), so near-duplicate chunks do not
+#                    fill the prompt context.
+# overlap_length / unique_token_ratio : merging overlapping neighbours and
+#                    measuring how repetitive a context is.
+
+import re
+import math
+from array import array
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+# Keeps tokens like "c++", "c#", "node.js", "2021" intact; trailing dots are
+# stripped so "PostgreSQL." matches "postgresql".
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#.]*")
+
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it of on or that the "
+    "this to was were will with your you i my me we our".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    out = []
+    for tok in _TOKEN_RE.findall(text.lower()):
+        tok = tok.rstrip(".")
+        if tok and tok not in _STOPWORDS:
+            out.append(tok)
+    return out
+
+
+class BM25Index:
+    """Okapi BM25 over a fixed list of texts.
+
+    Postings are stored as parallel `array` buffers (doc ids as uint32, term
+    frequencies as uint16) rather than per-document dicts, which keeps the
+    index to a few bytes per token occurrence.
+    """
+
+    def __init__(self, texts: Sequence[str], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b  = b
+        self.n_docs  = len(texts)
+        self.doc_len = array("I")
+        self._postings: Dict[str, Tuple[array, array]] = {}
+
+        for doc_id, text in enumerate(texts):
+            counts: Dict[str, int] = {}
+            for tok in tokenize(text):
+                counts[tok] = counts.get(tok, 0) + 1
+            self.doc_len.append(sum(counts.values()))
+            for tok, tf in counts.items():
+                ids, tfs = self._postings.setdefault(tok, (array("I"), array("H")))
+                ids.append(doc_id)
+                tfs.append(min(tf, 0xFFFF))
+
+        self.avg_len = (sum(self.doc_len) / self.n_docs) if self.n_docs else 0.0
+        self._idf = {
+            tok: math.log(1.0 + (self.n_docs - len(ids) + 0.5) / (len(ids) + 0.5))
+            for tok, (ids, _) in self._postings.items()
+        }
+
+    def __len__(self) -> int:
+        return self.n_docs
+
+    def approx_bytes(self) -> int:
+        postings = sum(ids.itemsize * len(ids) + tfs.itemsize * len(tfs)
+                       for ids, tfs in self._postings.values())
+        return postings + self.doc_len.itemsize * len(self.doc_len) + 64 * len(self._postings)
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[int, float]]:
+        """Top-k (doc_id, score), best first; documents scoring 0 are omitted."""
+        if not self.n_docs:
+            return []
+        scores: Dict[int, float] = {}
+        k1, b, avg = self.k1, self.b, self.avg_len or 1.0
+        for tok in set(tokenize(query)):
+            posting = self._postings.get(tok)
+            if posting is None:
+                continue
+            idf = self._idf[tok]
+            for doc_id, tf in zip(*posting):
+                norm = k1 * (1.0 - b + b * self.doc_len[doc_id] / avg)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (k1 + 1.0) / (tf + norm)
+        ranked = sorted(scores.items(), key=lambda kv: (-kv[1], kv[0]))
+        return ranked[:k]
+
+
+def reciprocal_rank_fusion(
+    rankings: Iterable[Sequence[int]], k: int = 60, weights: Sequence[float] = ()
+) -> List[Tuple[int, float]]:
+    """Fuse ranked id lists: score(d) = Σ w_i / (k + rank_i(d)), rank from 1."""
+    fused: Dict[int, float] = {}
+    for i, ranking in enumerate(rankings):
+        w = weights[i] if i < len(weights) else 1.0
+        for rank, doc_id in enumerate(ranking, start=1):
+            fused[doc_id] = fused.get(doc_id, 0.0) + w / (k + rank)
+    return sorted(fused.items(), key=lambda kv: (-kv[1], kv[0]))
+
+
+def mmr_select(
+    relevance: Sequence[float],
+    vectors,
+    k: int,
+    lambda_mult: float = 0.7,
+    dup_threshold: float = 1.0,
+) -> List[int]:
+    """Pick up to k candidates by maximal marginal relevance.
+
+    Each step takes argmax(λ·relevance − (1−λ)·max cosine to those already
+    picked). `vectors` are the candidates' L2-normalised embeddings (n × d);
+    one n × n similarity matrix is computed up front and the redundancy of
+    every candidate is updated with a single vector max per step. Candidates
+    at least `dup_threshold` similar to a picked one are dropped outright, so
+    fewer than k may be returned. Returns positions into the candidate list,
+    in pick order.
+    """
+    import numpy as np
+    rel = np.asarray(relevance, dtype=np.float32)
+    n   = min(len(rel), len(vectors))
+    if n == 0 or k <= 0:
+        return []
+    rel  = rel[:n]
+    vecs = np.asarray(vectors, dtype=np.float32)[:n]
+    sim  = vecs @ vecs.T
+
+    first  = int(np.argmax(rel))
+    picked = [first]
+    redundancy = sim[first].copy()
+    alive = redundancy < dup_threshold
+    alive[first] = False
+    while len(picked) < k and alive.any():
+        score = lambda_mult * rel - (1.0 - lambda_mult) * redundancy
+        score[~alive] = -np.inf
+        j = int(np.argmax(score))
+        picked.append(j)
+        np.maximum(redundancy, sim[j], out=redundancy)
+        alive &= redundancy < dup_threshold
+        alive[j] = False
+    return picked
+
+
+def overlap_length(a: str, b: str, min_chars: int = 16) -> int:
+    """Length of the longest suffix of `a` that is also a prefix of `b`, as
+    left by a splitter's chunk_overlap; 0 if shorter than `min_chars`."""
+    if len(a) < min_chars or len(b) < min_chars:
+        return 0
+    head  = b[:min_chars]
+    start = a.find(head, max(0, len(a) - len(b)))
+    while start != -1:
+        if b.startswith(a[start:]):
+            return len(a) - start
+        start = a.find(head, start + 1)
+    return 0
+
+
+def unique_token_ratio(texts: Iterable[str]) -> float:
+    """Distinct / total tokens (stopwords excluded) across `texts`; 1.0 means
+    no token is repeated, lower means more of the context is repetition."""
+    tokens = [t for text in texts for t in tokenize(text)]
+    return len(set(tokens)) / len(tokens) if tokens else 1.0
@@ -0,0 +1,227 @@
+# session_store.py
+# Bounded in-process store for per-user ResumeRAGEngine instances
+#
+# /upload builds a ResumeRAGEngine (chunks + embeddings + Chroma collection).
+# Keeping it keyed by session id lets /chat answer follow-up questions with
+# one query embedding and one LLM call instead of re-indexing the resume.
+#
+# BoundedStore is the generic part. Eviction:
+#   LRU     — at most `max_entries` values
+#   TTL     — values idle longer than `ttl_seconds` are dropped
+#   Memory  — total approx_bytes() of all values stays under `max_bytes`
+# Every evicted value has cleanup() called (a RAG engine deletes its Chroma
+# collection).
+#
+# Four instances, each with its own name (log lines) and unit (the count key
+# in stats()):
+#   RAGSessionStore        — "chat sessions",  unit "sessions"
+#   text_store_from_env    — StoredText handles: the extracted resume/JD text
+#                            keyed by an opaque text_id, unit "handles"
+#   extract_cache_from_env — an upload's content hash → its extracted text,
+#                            so re-uploading the same file skips parsing,
+#                            unit "entries"
+#   memo_store_from_env    — the last AnalysisMemo per user (incremental.py),
+#                            unit "users"
+
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class BoundedStore:
+
+    def __init__(
+        self,
+        name: str = "store",
+        unit: str = "entries",
+        max_entries: int = 32,
+        ttl_seconds: float = 1800.0,
+        max_bytes: int = 512 * 1024 * 1024,
+    ):
+        self.name         = name
+        self.unit         = unit
+        self.max_entries  = max_entries
+        self.ttl_seconds  = ttl_seconds
+        self.max_bytes    = max_bytes
+        self._lock    = threading.Lock()
+        # key -> (value, approx_bytes, last_used)
+        self._entries: "OrderedDict[str, Tuple[Any, int, float]]" = OrderedDict()
+        self._bytes   = 0
+        self._stats   = {"hits": 0, "misses": 0, "puts": 0,
+                         "evicted_lru": 0, "evicted_ttl": 0, "evicted_memory": 0}
+
+    # ── public API ────────────────────────────────────────────────────────────
+    def put(self, key: str, value: Any):
+        size = _approx_bytes(value)
+        with self._lock:
+            evicted = self._pop_locked(key)
+            self._entries[key] = (value, size, time.monotonic())
+            self._bytes += size
+            self._stats["puts"] += 1
+            evicted += self._evict_locked(keep=key)
+        self._cleanup(evicted)
+
+    def get(self, key: Optional[str]) -> Optional[Any]:
+        if not key:
+            return None
+        with self._lock:
+            evicted = self._expire_locked()
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+            else:
+                value, size, _ = entry
+                self._entries[key] = (value, size, time.monotonic())
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+        self._cleanup(evicted)
+        return entry[0] if entry else None
+
+    def discard(self, key: str):
+        with self._lock:
+            evicted = self._pop_locked(key)
+        self._cleanup(evicted)
+
+    def sweep(self) -> int:
+        """Drop expired values now; returns how many were evicted."""
+        with self._lock:
+            evicted = self._expire_locked()
+        self._cleanup(evicted)
+        return len(evicted)
+
+    def clear(self):
+        with self._lock:
+            evicted = [e for e, _, _ in self._entries.values()]
+            self._entries.clear()
+            self._bytes = 0
+        self._cleanup(evicted)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats, **{self.unit: len(self._entries)}, approx_bytes=self._bytes)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # ── internals (caller holds the lock) ─────────────────────────────────────
+    def _pop_locked(self, key: str) -> List[Any]:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return []
+        self._bytes -= entry[1]
+        return [entry[0]]
+
+    def _expire_locked(self) -> List[Any]:
+        if self.ttl_seconds <= 0:
+            return []
+        cutoff  = time.monotonic() - self.ttl_seconds
+        expired = [k for k, (_, _, last) in self._entries.items() if last < cutoff]
+        evicted = []
+        for k in expired:
+            evicted += self._pop_locked(k)
+        self._stats["evicted_ttl"] += len(expired)
+        return evicted
+
+    def _evict_locked(self, keep: str) -> List[Any]:
+        evicted = self._expire_locked()
+        while len(self._entries) > self.max_entries:
+            evicted += self._pop_oldest_locked(keep, "evicted_lru")
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            evicted += self._pop_oldest_locked(keep, "evicted_memory")
+        return evicted
+
+    def _pop_oldest_locked(self, keep: str, reason: str) -> List[Any]:
+        k = next(iter(self._entries))
+        if k == keep:
+            # the entry just inserted is the only one left — never evict it
+            self._entries.move_to_end(k)
+            k = next(iter(self._entries))
+        self._stats[reason] += 1
+        return self._pop_locked(k)
+
+    def _cleanup(self, values: List[Any]):
+        # Runs outside the lock: Chroma collection deletion touches disk.
+        for value in values:
+            try:
+                value.cleanup()
+            except Exception as e:
+                logger.warning(f"BoundedStore({self.name}): cleanup failed — {e}")
+
+
+class RAGSessionStore(BoundedStore):
+    """Per-user ResumeRAGEngine instances keyed by session id."""
+
+    def __init__(
+        self,
+        max_sessions: int = 32,
+        ttl_seconds: float = 1800.0,
+        max_bytes: int = 512 * 1024 * 1024,
+    ):
+        super().__init__("chat sessions", "sessions", max_sessions, ttl_seconds, max_bytes)
+
+    @classmethod
+    def from_env(cls) -> "RAGSessionStore":
+        return cls(
+            max_sessions=int(os.getenv("CHAT_MAX_SESSIONS", "32")),
+            ttl_seconds=float(os.getenv("CHAT_SESSION_TTL", "1800")),
+            max_bytes=int(float(os.getenv("CHAT_MAX_MEMORY_MB", "512")) * 1024 * 1024),
+        )
+
+
+# ─── Extracted-text handles ───────────────────────────────────────────────────
+# /generate-cover-letter resolves a text_id against a second store of these
+# instead of the browser posting the whole resume back.
+@dataclass
+class StoredText:
+    __slots__ = ("resume_text", "jd_text")
+    resume_text: str
+    jd_text:     Optional[str]
+
+    def approx_bytes(self) -> int:
+        return len(self.resume_text) + len(self.jd_text or "")
+
+    def cleanup(self):
+        pass
+
+
+def text_store_from_env() -> BoundedStore:
+    return BoundedStore(
+        name="text handles",
+        unit="handles",
+        max_entries=int(os.getenv("TEXT_HANDLE_MAX", "1024")),
+        ttl_seconds=float(os.getenv("TEXT_HANDLE_TTL", "3600")),
+        max_bytes=int(float(os.getenv("TEXT_HANDLE_MAX_MEMORY_MB", "64")) * 1024 * 1024),
+    )
+
+
+def extract_cache_from_env() -> BoundedStore:
+    return BoundedStore(
+        name="extract cache",
+        unit="entries",
+        max_entries=int(os.getenv("EXTRACT_CACHE_MAX", "512")),
+        ttl_seconds=float(os.getenv("EXTRACT_CACHE_TTL", "3600")),
+        max_bytes=int(float(os.getenv("EXTRACT_CACHE_MAX_MEMORY_MB", "32")) * 1024 * 1024),
+    )
+
+
+def memo_store_from_env() -> BoundedStore:
+    return BoundedStore(
+        name="incremental memos",
+        unit="users",
+        max_entries=int(os.getenv("INCREMENTAL_MAX_USERS", "256")),
+        ttl_seconds=float(os.getenv("INCREMENTAL_TTL", "3600")),
+        max_bytes=int(float(os.getenv("INCREMENTAL_MAX_MEMORY_MB", "128")) * 1024 * 1024),
+    )
+
+
+def _approx_bytes(value: Any) -> int:
+    try:
+        return int(value.approx_bytes())
+    except Exception:
+        return 0
@@ -0,0 +1,282 @@
+# skill_matcher.py
+# Semantic skill matching over a precomputed skill-embedding matrix
+#
+# Exact set intersection treats "k8s" vs "kubernetes" or "Postgres" vs
+# "PostgreSQL" as gaps. Here:
+#   1. the taxonomy (built-in terms + aliases, or SKILL_TAXONOMY_PATH with one
+#      term per line, e.g. 50k terms) is embedded ONCE into a contiguous
+#      float32 matrix saved as .npy under SKILL_INDEX_DIR;
+#   2. workers open it with np.load(mmap_mode="r"), so the pages are shared
+#      through the OS page cache instead of copied per process;
+#   3. skills are found in text by n-gram dictionary lookup (cost grows with
+#      text length, not taxonomy size) and aliases are canonicalised;
+#   4. JD skills are matched to resume skills with one matrix multiply over
+#      the found rows and a cosine-similarity threshold.
+#
+#   python -m skill_matcher build     # precompute the matrix (needs the model)
+
+import os
+import re
+import sys
+import time
+import hashlib
+import logging
+import threading
+from typing import Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+# alias → canonical term. Exact alias hits are canonicalised before the
+# semantic step so common abbreviations never depend on embedding quality.
+# Two-letter abbreviations ("js", "ts", "ml", "ai") are left out: as bare
+# tokens in JD prose they match far more often than they name a skill.
+ALIASES: Dict[str, str] = {
+    'k8s': 'kubernetes', 'kube': 'kubernetes',
+    'postgres': 'postgresql', 'psql': 'postgresql',
+    'ecmascript': 'javascript',
+    'nodejs': 'node.js',
+    'reactjs': 'react', 'react.js': 'react',
+    'vue': 'vue.js', 'vuejs': 'vue.js',
+    'angularjs': 'angular',
+    'genai': 'generative ai', 'gen ai': 'generative ai',
+    'large language models': 'llm', 'llms': 'llm',
+    'amazon web services': 'aws', 'microsoft azure': 'azure',
+    'google cloud': 'gcp', 'google cloud platform': 'gcp',
+    'mongo': 'mongodb',
+    'torch': 'pytorch',
+    'huggingface': 'hugging face',
+    'restful': 'rest', 'rest api': 'rest', 'restful api': 'rest',
+    'ci/cd': 'devops', 'cicd': 'devops',
+    'apache spark': 'spark', 'pyspark': 'spark', 'apache kafka': 'kafka',
+    'dotnet': '.net', 'asp.net': '.net',
+    'cpp': 'c++', 'csharp': 'c#',
+    'retrieval-augmented generation': 'retrieval augmented generation',
+    'vector db': 'vector database', 'vector store': 'vector database',
+    'sklearn': 'scikit-learn', 'scikit learn': 'scikit-learn',
+    'gke': 'kubernetes', 'eks': 'kubernetes',
+}
+
+EXTRA_TERMS = ['typescript', 'gcp', 'scikit-learn', 'pandas', 'numpy', 'mariadb',
+               'sqlite', 'oracle', 'bigquery', 'snowflake', 'airflow', 'dbt',
+               'fastapi', 'next.js', 'svelte', 'openshift', 'helm',
+               'prometheus', 'grafana', 'rabbitmq', 'celery', 'nginx', 'deep learning']
+
+_TOKEN_RE = re.compile(r'[a-z0-9+#./-]+')
+_JOIN_RE  = re.compile(r'[/-]+')
+_MAX_NGRAM = 4
+
+
+def _clean(token: str) -> str:
+    # keep a leading dot (".net") but drop sentence punctuation and bullet dashes
+    return token.strip('-/').rstrip('.') or token
+
+
+def normalise(term: str) -> str:
+    return " ".join(_clean(t) for t in _TOKEN_RE.findall(term.lower()))
+
+
+class SkillMatcher:
+
+    MATRIX_DIR = os.getenv("SKILL_INDEX_DIR", "./skill_index")
+    THRESHOLD  = float(os.getenv("SKILL_MATCH_THRESHOLD", "0.75"))
+    RECHECK_S  = 60.0      # how often a request re-checks for a missing matrix
+
+    def __init__(self, terms: Sequence[str], aliases: Optional[Dict[str, str]] = None):
+        self.aliases = {normalise(a): normalise(c) for a, c in (aliases or {}).items()}
+        seen: Dict[str, int] = {}
+        for t in list(terms) + list(self.aliases.values()):
+            n = normalise(t)
+            if n and n not in seen:
+                seen[n] = len(seen)
+        self.terms: List[str] = list(seen)
+        self._ids = seen
+        self._max_n = min(_MAX_NGRAM, max((len(t.split()) for t in
+                                            list(self.terms) + list(self.aliases)), default=1))
+        self._matrix = None
+        self._next_check = 0.0     # monotonic time of the next look for the .npy
+        self._logged_missing = False
+        self._lock   = threading.Lock()
+
+    @classmethod
+    def default(cls, base_terms: Sequence[str]) -> "SkillMatcher":
+        path = os.getenv("SKILL_TAXONOMY_PATH")
+        terms = list(base_terms) + EXTRA_TERMS
+        if path:
+            with open(path, encoding="utf-8") as f:
+                terms += [line.strip() for line in f if line.strip() and not line.startswith("#")]
+        return cls(terms, ALIASES)
+
+    # ── lookup ────────────────────────────────────────────────────────────────
+    def _tokens(self, text: str) -> List[str]:
+        # "python/django", "java-based", "aws/gcp" are split into their parts;
+        # known terms that contain the separators ("ci/cd", "scikit-learn")
+        # stay whole.
+        tokens = []
+        for raw in _TOKEN_RE.findall(text.lower()):
+            token = _clean(raw)
+            if token in self._ids or token in self.aliases or not _JOIN_RE.search(token):
+                tokens.append(token)
+            else:
+                tokens.extend(_clean(t) for t in _JOIN_RE.split(token) if t.strip('.'))
+        return tokens
+
+    def find(self, text: str) -> List[int]:
+        """Taxonomy ids mentioned in text (aliases canonicalised), sorted."""
+        tokens = self._tokens(text)
+        found = set()
+        for n in range(1, self._max_n + 1):
+            for i in range(len(tokens) - n + 1):
+                gram = " ".join(tokens[i:i + n])
+                gram = self.aliases.get(gram, gram)
+                tid  = self._ids.get(gram)
+                if tid is not None:
+                    found.add(tid)
+        return sorted(found)
+
+    def canonical(self, term: str) -> str:
+        """Normalised term with aliases resolved ("k8s" → "kubernetes")."""
+        n = normalise(term)
+        return self.aliases.get(n, n)
+
+    def ids_for(self, terms: Sequence[str]) -> List[int]:
+        out = []
+        for t in terms:
+            n = normalise(t)
+            tid = self._ids.get(self.aliases.get(n, n))
+            if tid is not None:
+                out.append(tid)
+        return sorted(set(out))
+
+    # ── matrix ────────────────────────────────────────────────────────────────
+    @property
+    def fingerprint(self) -> str:
+        from rag_engine import STEmbeddings
+        h = hashlib.sha256(STEmbeddings.MODEL_NAME.encode())
+        for t in self.terms:
+            h.update(b"\0" + t.encode())
+        return h.hexdigest()[:16]
+
+    @property
+    def matrix_path(self) -> str:
+        return os.path.join(self.MATRIX_DIR, f"skills-{self.fingerprint}.npy")
+
+    def build_matrix(self, embeddings) -> str:
+        """Embed all terms once and write an L2-normalised float32 .npy."""
+        import numpy as np
+        vecs = np.ascontiguousarray(np.asarray(embeddings.embed_documents(self.terms), dtype=np.float32))
+        norms = np.linalg.norm(vecs, axis=1, keepdims=True)
+        vecs /= np.where(norms == 0, 1.0, norms)
+        os.makedirs(self.MATRIX_DIR, exist_ok=True)
+        path = self.matrix_path
+        tmp  = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            np.save(f, vecs)
+        os.replace(tmp, path)   # atomic: concurrent workers never see a partial file
+        logger.info(f"SkillMatcher: wrote {vecs.shape} matrix to {path}")
+        return path
+
+    def matrix(self, build_if_missing: bool = False):
+        """Memory-mapped (n_terms, dim) matrix, or None if unavailable.
+
+        Only warm_up() and the CLI pass build_if_missing: embedding the whole
+        taxonomy takes far too long for a request, which falls back to exact
+        matching until the file exists. A miss is re-checked at most every
+        RECHECK_S seconds, so a matrix written later by the CLI or another
+        worker's warm_up() is picked up without a restart.
+        """
+        if self._matrix is not None or (time.monotonic() < self._next_check and not build_if_missing):
+            return self._matrix
+        with self._lock:
+            if self._matrix is not None or (time.monotonic() < self._next_check and not build_if_missing):
+                return self._matrix
+            self._next_check = time.monotonic() + self.RECHECK_S
+            try:
+                import numpy as np
+            except ImportError:
+                self._next_check = float("inf")
+                return None
+            path = self.matrix_path
+            if not os.path.exists(path) and build_if_missing:
+                from rag_engine import STEmbeddings
+                from incremental import suspended
+                emb = STEmbeddings()
+                if emb.ready:
+                    with suspended():   # shared matrix, not per-user work
+                        self.build_matrix(emb)
+            if os.path.exists(path):
+                self._matrix = np.load(path, mmap_mode="r")
+                logger.info(f"SkillMatcher: mapped {self._matrix.shape} skill matrix")
+            elif not self._logged_missing:
+                self._logged_missing = True
+                logger.info("SkillMatcher: no skill matrix — exact matching only "
+                            "(build it with `python -m skill_matcher build`)")
+        return self._matrix
+
+    @property
+    def semantic_ready(self) -> bool:
+        return self._matrix is not None
+
+    # ── matching ──────────────────────────────────────────────────────────────
+    def match(
+        self, resume_ids: Sequence[int], jd_ids: Sequence[int], threshold: Optional[float] = None
+    ) -> Dict[str, List]:
+        """Split JD skills into matching/missing against the resume skills.
+
+        Exact id hits always match; with the matrix available, a JD skill also
+        matches when its best cosine similarity to any resume skill reaches
+        `threshold` — one (|jd| × dim) @ (dim × |resume|) multiply.
+        """
+        threshold = self.THRESHOLD if threshold is None else threshold
+        resume_set = set(resume_ids)
+        matching, missing, semantic = [], [], []
+        M = self.matrix()
+        best = best_idx = None
+        jd_only = [j for j in jd_ids if j not in resume_set]
+        if M is not None and jd_only and resume_ids:
+            import numpy as np
+            R = M[np.asarray(resume_ids)]
+            J = M[np.asarray(jd_only)]
+            sims = J @ R.T
+            best_idx = sims.argmax(axis=1)
+            best     = sims[np.arange(len(jd_only)), best_idx]
+
+        pos = {j: n for n, j in enumerate(jd_only)}
+        for j in jd_ids:
+            term = self.terms[j]
+            if j in resume_set:
+                matching.append(term)
+            elif best is not None and best[pos[j]] >= threshold:
+                matching.append(term)
+                semantic.append({
+                    "jd_skill":     term,
+                    "resume_skill": self.terms[resume_ids[int(best_idx[pos[j]])]],
+                    "similarity":   round(float(best[pos[j]]), 3),
+                })
+            else:
+                missing.append(term)
+        return {"matching": sorted(matching), "missing": sorted(missing), "semantic_matches": semantic}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+    p = argparse.ArgumentParser(description="Skill-embedding matrix tools")
+    p.add_argument("command", choices=["build", "info"])
+    args = p.parse_args(argv)
+
+    from resume_analyzer import ResumeAnalyzer
+    matcher = SkillMatcher.default(ResumeAnalyzer().technical_skills)
+    if args.command == "info":
+        print(f"terms={len(matcher.terms)} path={matcher.matrix_path} "
+              f"exists={os.path.exists(matcher.matrix_path)}")
+        return 0
+    from rag_engine import STEmbeddings
+    emb = STEmbeddings()
+    if not emb.ready:
+        print("embedding model unavailable — pip install sentence-transformers torch")
+        return 1
+    print(matcher.build_matrix(emb))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())